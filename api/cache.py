@@ -0,0 +1,73 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+PRODUCT_CACHE_TIMEOUT = getattr(settings, "PRODUCT_CACHE_TIMEOUT", 60 * 60)
+
+HITS_KEY = "product_cache:hits"
+MISSES_KEY = "product_cache:misses"
+
+
+def product_cache_key(pk, staff):
+    """
+    Staff can see hidden products, so they get their own copy.
+    """
+    return f"product:{pk}:{'staff' if staff else 'public'}"
+
+
+def _incr(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        # The counter does not exist yet (or was evicted)
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def get_cached_product(pk, staff):
+    """
+    Return the cached ProductSerializer data for a product, or None on a miss.
+    """
+    data = cache.get(product_cache_key(pk, staff))
+    _incr(HITS_KEY if data is not None else MISSES_KEY)
+    return data
+
+
+def set_cached_product(pk, staff, data):
+    cache.set(product_cache_key(pk, staff), data, PRODUCT_CACHE_TIMEOUT)
+
+
+def invalidate_products(product_ids):
+    """
+    Drop the cached data of the given products.
+
+    The keys are deleted right away and once more after the surrounding
+    transaction commits, so a request that read the old rows in between
+    cannot leave a stale entry behind.
+    """
+    keys = [
+        product_cache_key(pk, staff)
+        for pk in set(product_ids)
+        if pk is not None
+        for staff in (True, False)
+    ]
+    if not keys:
+        return
+
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def get_product_cache_stats():
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / total, 4) if total else None,
+    }
+
+
+def reset_product_cache_stats():
+    cache.delete_many([HITS_KEY, MISSES_KEY])
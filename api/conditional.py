@@ -0,0 +1,50 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+# Conditional GET support for the catalog endpoints.
+#
+# Validators are computed from max(updated_at) and row counts, without
+# serializing anything. Product.updated_at is bumped whenever one of its
+# images, meshes, colors, reviews, sizes or its category changes (see
+# api/signals.py), so it covers the whole nested product representation.
+
+
+def make_etag(*parts):
+    """
+    Build a strong ETag out of the given parts (counts, timestamps, params...).
+    """
+    value = ":".join("" if part is None else str(part) for part in parts)
+    return quote_etag(hashlib.md5(value.encode()).hexdigest())
+
+
+def timestamp(value):
+    return value.timestamp() if value is not None else None
+
+
+def get_not_modified_response(request, etag, last_modified=None):
+    """
+    Return a 304 response when the client's copy is still current, else None.
+
+    Args:
+        request: The DRF request object.
+        etag: The ETag of the current representation.
+        last_modified: The datetime of the last change, if known.
+    """
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(timestamp(last_modified)) if last_modified else None
+    )
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified=None):
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(timestamp(last_modified))
+    # Staff and shoppers see different products, make caches revalidate every time
+    patch_vary_headers(response, ["Authorization"])
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
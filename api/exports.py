@@ -0,0 +1,128 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+
+from api.models import OrderItem
+
+# Streaming order exports for finance.
+#
+# Orders are read with iterator(chunk_size=...), which prefetches the items of
+# each chunk separately, and every line is yielded as soon as it is built, so
+# memory stays flat whatever the size of the table.
+
+EXPORT_OUTPUTS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+EXPORT_CHUNK_SIZE = 500
+
+ORDER_COLUMNS = [
+    "order_id", "user_id", "email", "payment_method", "tax_price", "shipping_price", "total_price",
+    "is_paid", "paid_at", "is_shipped", "shipped_at", "is_delivered", "delivered_at", "created_at",
+    "address", "city", "postal_code", "country",
+]
+ITEM_COLUMNS = ["item_id", "product_id", "name", "price", "size", "colors"]
+
+
+class _Echo:
+    # csv.writer only needs an object with write(), return the line instead of buffering it
+    def write(self, value):
+        return value
+
+
+def _iter_orders(queryset, chunk_size):
+    items = Prefetch("order_items", queryset=OrderItem.objects.select_related("size").order_by("id"))
+    return (
+        queryset.select_related("user", "shipping_address")
+        .prefetch_related(items)
+        .order_by("id")
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def _order_row(order):
+    address = getattr(order, "shipping_address", None)
+    return {
+        "order_id": order.id,
+        "user_id": order.user_id,
+        "email": order.user.email if order.user else None,
+        "payment_method": order.payment_method,
+        "tax_price": order.tax_price,
+        "shipping_price": order.shipping_price,
+        "total_price": order.total_price,
+        "is_paid": order.is_paid,
+        "paid_at": order.paid_at,
+        "is_shipped": order.is_shipped,
+        "shipped_at": order.shipped_at,
+        "is_delivered": order.is_delivered,
+        "delivered_at": order.delivered_at,
+        "created_at": order.created_at,
+        "address": address.address if address else None,
+        "city": address.city if address else None,
+        "postal_code": address.postal_code if address else None,
+        "country": address.country if address else None,
+    }
+
+
+def _item_row(item):
+    return {
+        "item_id": item.id,
+        "product_id": item.product_id,
+        "name": item.name,
+        "price": item.price,
+        "size": item.size.size if item.size else None,
+        "colors": item.colors,
+    }
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, cls=DjangoJSONEncoder)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def export_orders_csv(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield the orders as CSV lines, one line per item (one with empty item
+    columns for orders without items).
+    """
+    writer = csv.writer(_Echo())
+    yield writer.writerow(ORDER_COLUMNS + ITEM_COLUMNS)
+    empty_item = [""] * len(ITEM_COLUMNS)
+    for order in _iter_orders(queryset, chunk_size):
+        row = [_csv_value(value) for value in _order_row(order).values()]
+        items = order.order_items.all()
+        if not items:
+            yield writer.writerow(row + empty_item)
+        for item in items:
+            yield writer.writerow(row + [_csv_value(value) for value in _item_row(item).values()])
+
+
+def export_orders_ndjson(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield the orders as newline delimited JSON, one order with its items per line.
+    """
+    for order in _iter_orders(queryset, chunk_size):
+        row = _order_row(order)
+        row["items"] = [_item_row(item) for item in order.order_items.all()]
+        yield json.dumps(row, cls=DjangoJSONEncoder) + "\n"
+
+
+def export_orders(queryset, output, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Stream an order queryset in one of EXPORT_OUTPUTS.
+
+    Raises:
+        ValueError: If the output is not supported.
+    """
+    if output == "csv":
+        return export_orders_csv(queryset, chunk_size)
+    if output == "ndjson":
+        return export_orders_ndjson(queryset, chunk_size)
+    raise ValueError(f"output must be one of {', '.join(EXPORT_OUTPUTS)}")
@@ -0,0 +1,133 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Count, Q
+
+from api.models import Product, Mesh, Color
+
+# Catalog filters and facet counts for getProducts.
+#
+# Filters on multi-valued relations (sizes, colors) are applied as `id IN
+# (subquery)` so the product query never needs a DISTINCT. Facet counts are
+# computed by the database over the filtered product ids, one aggregate query
+# per facet, whatever the number of matching products.
+
+PRICE_BUCKETS = [(0, 50), (50, 100), (100, 150), (150, 200), (200, None)]
+
+
+def _get_list(params, name):
+    value = params.get(name)
+    if not value:
+        return []
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _get_decimal(params, name):
+    value = params.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        value = Decimal(value)
+        if not value.is_finite():
+            raise InvalidOperation
+        return value
+    except InvalidOperation:
+        raise ValueError(f"{name} must be a number")
+
+
+def apply_product_filters(queryset, params):
+    """
+    Narrow a product queryset with the catalog filters.
+
+    Args:
+        queryset: The product queryset.
+        params: The request query params, supported keys are
+            price_min, price_max, rating_min, sizes (ShoeSize ids) and
+            colors (color names), lists are comma separated.
+
+    Raises:
+        ValueError: If a filter value is invalid.
+    """
+    price_min = _get_decimal(params, "price_min")
+    if price_min is not None:
+        queryset = queryset.filter(price__gte=price_min)
+
+    price_max = _get_decimal(params, "price_max")
+    if price_max is not None:
+        queryset = queryset.filter(price__lte=price_max)
+
+    rating_min = _get_decimal(params, "rating_min")
+    if rating_min is not None:
+        queryset = queryset.filter(rating__gte=rating_min)
+
+    sizes = _get_list(params, "sizes")
+    if sizes:
+        try:
+            sizes = [int(size) for size in sizes]
+        except ValueError:
+            raise ValueError("sizes must be a list of size ids")
+        queryset = queryset.filter(
+            id__in=Product.sizes.through.objects.filter(shoesize_id__in=sizes).values("product_id")
+        )
+
+    colors = _get_list(params, "colors")
+    if colors:
+        queryset = queryset.filter(
+            id__in=Mesh.objects.filter(colors__color_name__in=colors).values("product_id")
+        )
+
+    return queryset
+
+
+def get_product_facets(queryset):
+    """
+    Count the products of a (filtered) queryset per size, color, category and
+    price bucket, in four aggregate queries.
+    """
+    matching = queryset.order_by().values("id")
+
+    sizes = (
+        Product.sizes.through.objects.filter(product_id__in=matching)
+        .values("shoesize_id", "shoesize__size")
+        .annotate(count=Count("product_id"))
+        .order_by("shoesize__size")
+    )
+
+    colors = (
+        Color.objects.filter(mesh__product_id__in=matching)
+        .values("color_name")
+        .annotate(count=Count("mesh__product_id", distinct=True))
+        .order_by("color_name")
+    )
+
+    categories = (
+        Product.objects.filter(id__in=matching)
+        .values("category_id", "category__name")
+        .annotate(count=Count("id"))
+        .order_by("category__name")
+    )
+
+    buckets = {}
+    for index, (low, high) in enumerate(PRICE_BUCKETS):
+        condition = Q(price__gte=low)
+        if high is not None:
+            condition &= Q(price__lt=high)
+        buckets[f"bucket_{index}"] = Count("id", filter=condition)
+    prices = Product.objects.filter(id__in=matching).aggregate(**buckets)
+
+    return {
+        "sizes": [
+            {"id": row["shoesize_id"], "size": row["shoesize__size"], "count": row["count"]}
+            for row in sizes
+        ],
+        "colors": [
+            {"color_name": row["color_name"], "count": row["count"]} for row in colors
+        ],
+        "categories": [
+            {"id": row["category_id"], "name": row["category__name"], "count": row["count"]}
+            for row in categories
+        ],
+        "prices": [
+            {"min": low, "max": high, "count": prices[f"bucket_{index}"]}
+            for index, (low, high) in enumerate(PRICE_BUCKETS)
+        ],
+    }
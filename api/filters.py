@@ -0,0 +1,114 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+# Order filters of getMyOrders, getOrders, exportOrders and the export_orders
+# command, read from query params (or any dict of strings).
+
+ORDER_STATUS_FILTERS = {
+    "paid": "is_paid",
+    "shipped": "is_shipped",
+    "delivered": "is_delivered",
+}
+
+# <param>_from and <param>_to filter on these fields
+ORDER_DATE_FILTERS = {
+    "created": "created_at",
+    "paid": "paid_at",
+}
+
+# Filters of getOrders only, case insensitive. Backed by the UPPER() indexes
+# of migration 0021, the name matches the start of the customer's name.
+ORDER_SEARCH_FILTERS = {
+    "email": "user__email__iexact",
+    "name": "user__first_name__istartswith",
+    "city": "shipping_address__city__iexact",
+    "country": "shipping_address__country__iexact",
+}
+
+
+def _parse_moment(params, name):
+    """
+    Read a date or datetime query param.
+
+    Returns:
+        A (moment, whole_day) tuple, moment is None when the param is missing
+        and whole_day tells whether a date was given.
+
+    Raises:
+        ValueError: If the value is neither a date nor a datetime.
+    """
+    value = params.get(name)
+    if not value:
+        return None, False
+    try:
+        day = parse_date(value)
+        whole_day = day is not None
+        moment = datetime.combine(day, time.min) if whole_day else parse_datetime(value)
+        if moment is None:
+            raise ValueError
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO 8601 date or datetime")
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment, whole_day
+
+
+def apply_order_filters(queryset, params):
+    """
+    Narrow an order queryset with the status and date filters of getMyOrders.
+
+    Raises:
+        ValueError: If a filter value is invalid.
+    """
+    for param, field in ORDER_STATUS_FILTERS.items():
+        value = params.get(param)
+        if value is None:
+            continue
+        if value not in ("true", "false"):
+            raise ValueError(f"{param} must be true or false")
+        queryset = queryset.filter(**{field: value == "true"})
+
+    for param, field in ORDER_DATE_FILTERS.items():
+        moment_from, whole_day = _parse_moment(params, f"{param}_from")
+        if moment_from is not None:
+            queryset = queryset.filter(**{f"{field}__gte": moment_from})
+
+        moment_to, whole_day = _parse_moment(params, f"{param}_to")
+        if moment_to is not None:
+            if whole_day:
+                queryset = queryset.filter(**{f"{field}__lt": moment_to + timedelta(days=1)})
+            else:
+                queryset = queryset.filter(**{f"{field}__lte": moment_to})
+
+    return queryset
+
+
+def apply_all_order_filters(queryset, params):
+    """
+    Narrow an order queryset with the customer, address and total filters of
+    getOrders, on top of the getMyOrders ones.
+
+    Raises:
+        ValueError: If a filter value is invalid.
+    """
+    queryset = apply_order_filters(queryset, params)
+
+    for param, lookup in ORDER_SEARCH_FILTERS.items():
+        value = params.get(param, "").strip()
+        if value:
+            queryset = queryset.filter(**{lookup: value})
+
+    min_total = params.get("min_total")
+    if min_total is not None:
+        try:
+            min_total = Decimal(min_total)
+            if not min_total.is_finite():
+                raise InvalidOperation
+        except InvalidOperation:
+            raise ValueError("min_total must be a number")
+        queryset = queryset.filter(total_price__gte=min_total)
+
+    return queryset
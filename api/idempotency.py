@@ -0,0 +1,101 @@
+import functools
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from api.models import IdempotencyKey
+
+# Idempotency-Key support for the checkout and payment endpoints.
+#
+# The key is inserted before the view runs, in the same transaction. A retry
+# sent while the first request is still running blocks on the unique index
+# until it commits, then replays the stored status and body without running
+# the view again. Server errors are rolled back with the key, so they can be
+# retried for real.
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_KEY_TTL = getattr(settings, "IDEMPOTENCY_KEY_TTL", 24 * 60 * 60)
+
+
+class _NotStored(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+def _request_hash(request):
+    digest = hashlib.sha256()
+    for part in (request.method, request.path, request.body):
+        digest.update(part if isinstance(part, bytes) else part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _replay(record, request_hash):
+    if record.request_hash != request_hash:
+        return Response(
+            {"error": f"{IDEMPOTENCY_HEADER} was already used for another request"},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    return Response(record.response, status=record.status_code, headers={"Idempotent-Replayed": "true"})
+
+
+def idempotent(view):
+    """
+    Make a function view replay its first response to requests sent again
+    with the same Idempotency-Key header by the same user.
+
+    Goes below @permission_classes, the view must require authentication.
+    Requests without the header are not affected.
+    """
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view(request, *args, **kwargs)
+        if len(key) > IdempotencyKey._meta.get_field("key").max_length:
+            return Response(
+                {"error": f"{IDEMPOTENCY_HEADER} is too long"}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        request_hash = _request_hash(request)
+        now = timezone.now()
+        keys = IdempotencyKey.objects.filter(user=request.user, key=key)
+        keys.filter(expires_at__lte=now).delete()
+
+        try:
+            with transaction.atomic():
+                try:
+                    with transaction.atomic():
+                        IdempotencyKey.objects.create(
+                            user=request.user,
+                            key=key,
+                            request_hash=request_hash,
+                            expires_at=now + timedelta(seconds=IDEMPOTENCY_KEY_TTL),
+                        )
+                except IntegrityError:
+                    # The first request has committed, its response is stored
+                    return _replay(keys.get(), request_hash)
+
+                response = view(request, *args, **kwargs)
+                if response.status_code >= 500:
+                    raise _NotStored(response)
+                keys.update(status_code=response.status_code, response=response.data)
+                return response
+        except _NotStored as e:
+            return e.response
+
+    return wrapper
+
+
+def purge_idempotency_keys():
+    """
+    Delete the expired keys, returns how many were deleted.
+    """
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
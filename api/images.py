@@ -0,0 +1,180 @@
+import hashlib
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+# Product image processing.
+#
+# Uploads are stored as received, then re-encoded as JPEG by an image job (see
+# api/jobs.py), which also stores width-bounded variants next to the original
+# (products/<name>_<width>w.jpg) so catalog grids and srcset attributes don't
+# download the full resolution image. Every size also gets a WebP encoding
+# (products/<name>.webp, products/<name>_<width>w.webp), smaller and keeping
+# the transparency JPEG loses.
+#
+# Uploads are stored under the SHA-256 of their content (see ImageBlob), the
+# same photo uploaded for several products is stored and processed once.
+
+# Widths of the variants, originals narrower than a width don't get it
+IMAGE_VARIANT_WIDTHS = (160, 480, 1024, 2048)
+JPEG_QUALITY = 85
+# About the perceived quality of JPEG_QUALITY, method trades encode time for size (0-6)
+WEBP_QUALITY = 80
+WEBP_METHOD = 4
+
+IMAGE_FORMATS = {
+    "jpeg": "image/jpeg",
+    "webp": "image/webp",
+}
+
+
+def content_hash(file):
+    """
+    SHA-256 of a file, read in chunks so large uploads are never fully in memory.
+    """
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def blob_name(digest):
+    return f"products/{digest}.jpg"
+
+
+def variant_name(name, width=None, ext="jpg"):
+    stem, _ = os.path.splitext(name)
+    return f"{stem}_{width}w.{ext}" if width else f"{stem}.{ext}"
+
+
+def has_alpha(img):
+    return img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+
+
+def normalize(img):
+    """
+    Convert a decoded image to RGB, or RGBA when it has transparency.
+    """
+    return img.convert("RGBA" if has_alpha(img) else "RGB")
+
+
+def to_rgb(img):
+    """
+    Flatten an image for JPEG, transparent areas become white.
+    """
+    if has_alpha(img):
+        img = img.convert("RGBA")
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel("A"))
+        return background
+    return img.convert("RGB")
+
+
+def encode_jpeg(img):
+    buffer = BytesIO()
+    to_rgb(img).save(buffer, format="JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return ContentFile(buffer.getvalue())
+
+
+def encode_webp(img):
+    buffer = BytesIO()
+    normalize(img).save(buffer, format="WEBP", quality=WEBP_QUALITY, method=WEBP_METHOD)
+    return ContentFile(buffer.getvalue())
+
+
+def store_file(storage, name, content):
+    """
+    Store `content` under exactly `name`, replacing the file already there.
+    """
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, content)
+
+
+def save_variants(img, name, storage=default_storage):
+    """
+    Resize an image to IMAGE_VARIANT_WIDTHS and store the results next to `name`,
+    as JPEG and WebP. The WebP encodings include one of the original size.
+
+    Args:
+        img: The decoded original.
+        name: The storage name of the original.
+        storage: Where to store the variants.
+
+    Returns:
+        A (variants, webp_variants) tuple, dicts of storage names by width
+        (as a string, like JSON keys).
+    """
+    img = normalize(img)
+    variants = {}
+    webp_variants = {str(img.width): store_file(storage, variant_name(name, ext="webp"), encode_webp(img))}
+    for width in IMAGE_VARIANT_WIDTHS:
+        if width >= img.width:
+            break
+        height = max(1, round(img.height * width / img.width))
+        resized = img.resize((width, height), Image.LANCZOS)
+        variants[str(width)] = store_file(storage, variant_name(name, width), encode_jpeg(resized))
+        webp_variants[str(width)] = store_file(storage, variant_name(name, width, "webp"), encode_webp(resized))
+    return variants, webp_variants
+
+
+def build_variants(name, storage=default_storage):
+    """
+    Process a stored original: re-encode it as JPEG in place if it is in
+    another format, then generate its variants.
+
+    Returns:
+        A (width, height, variants, webp_variants) tuple, see save_variants().
+    """
+    with storage.open(name) as f:
+        img = Image.open(f)
+        img.load()
+
+    if img.format != "JPEG":
+        storage.delete(name)
+        storage.save(name, encode_jpeg(img))
+
+    return (img.width, img.height, *save_variants(img, name, storage))
+
+
+def delete_variants(variants, storage=default_storage):
+    for name in (variants or {}).values():
+        storage.delete(name)
+
+
+def pick_width(widths, wanted=None):
+    """
+    The smallest of `widths` at least `wanted` wide, the largest one when
+    none is or nothing is wanted.
+    """
+    widths = sorted(int(width) for width in widths)
+    if wanted is not None:
+        for width in widths:
+            if width >= wanted:
+                return str(width)
+    return str(widths[-1])
+
+
+def accepts_webp(request):
+    """
+    Whether the Accept header of a request lists WebP (explicitly, browsers
+    that support it do) with a non zero quality.
+    """
+    for part in request.headers.get("Accept", "").split(","):
+        media_type, *params = [piece.strip() for piece in part.split(";")]
+        if media_type.lower() != IMAGE_FORMATS["webp"]:
+            continue
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    return float(value) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
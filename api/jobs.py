@@ -0,0 +1,158 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from api.models import ImageJob, MeshJob, Product, ProductImage
+
+logger = logging.getLogger(__name__)
+
+# Database backed queues of image processing and mesh extraction jobs.
+#
+# ProductImage.save() queues a job for every new upload, finalizeUpload one
+# for every 3D model, and the process_image_jobs command runs them, outside
+# of the API workers. Jobs are
+# claimed with SELECT ... FOR UPDATE SKIP LOCKED so any number of workers can
+# pull from the table, and leased for IMAGE_JOB_LEASE seconds so the job of a
+# worker that died is picked again. Failed jobs are retried with an
+# exponential backoff, up to IMAGE_JOB_MAX_ATTEMPTS times.
+
+IMAGE_JOB_MAX_ATTEMPTS = getattr(settings, "IMAGE_JOB_MAX_ATTEMPTS", 5)
+IMAGE_JOB_LEASE = getattr(settings, "IMAGE_JOB_LEASE", 5 * 60)
+# Delay before the first retry, doubled for every attempt after it
+IMAGE_JOB_RETRY_DELAY = 30
+
+
+def claim_job(model):
+    """
+    Take the next runnable job of a queue (a Job model), if any, and mark it
+    running.
+
+    Returns:
+        The claimed job, or None when there is nothing to do.
+    """
+    now = timezone.now()
+    runnable = Q(status=model.PENDING, run_after__lte=now) | Q(
+        status=model.RUNNING, locked_until__lte=now
+    )
+    with transaction.atomic():
+        job = (
+            model.objects.select_for_update(skip_locked=True)
+            .filter(runnable)
+            .order_by("run_after", "id")
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = model.RUNNING
+        job.attempts += 1
+        job.locked_until = now + timedelta(seconds=IMAGE_JOB_LEASE)
+        job.save(update_fields=["status", "attempts", "locked_until", "updated_at"])
+    return job
+
+
+def claim_image_job():
+    return claim_job(ImageJob)
+
+
+def run_image_job(job):
+    """
+    Process the image of a claimed job.
+
+    Returns:
+        True if the image was processed, False if the job failed and was
+        rescheduled or given up.
+    """
+    return _run(job, lambda: ProductImage.objects.get(id=job.image_id).process())
+
+
+def run_mesh_job(job):
+    """
+    Extract the meshes of the 3D model of a claimed job.
+
+    Returns:
+        True if the meshes were extracted, False if the job failed and was
+        rescheduled or given up.
+    """
+    return _run(job, lambda: Product.objects.get(id=job.product_id).extract_meshes())
+
+
+def _run(job, work):
+    try:
+        work()
+    except Exception as e:
+        logger.error(f"{job} failed: {e}")
+        _fail(job, e)
+        return False
+
+    # The job has done its work, for images their status tells the outcome
+    _still_claimed(job).delete()
+    return True
+
+
+def _still_claimed(job):
+    # Not requeued by a new upload or taken over after the lease expired
+    return type(job).objects.filter(id=job.id, status=job.RUNNING, attempts=job.attempts)
+
+
+def _fail(job, error):
+    changes = {"last_error": str(error), "locked_until": None, "updated_at": timezone.now()}
+    if job.attempts >= IMAGE_JOB_MAX_ATTEMPTS:
+        with transaction.atomic():
+            if _still_claimed(job).update(status=job.FAILED, **changes) and isinstance(job, ImageJob):
+                # Saved rather than updated, the signals refresh the product's
+                # cache and validators
+                image = ProductImage.objects.filter(id=job.image_id).first()
+                if image is not None:
+                    image.status = ProductImage.FAILED
+                    image.save(update_fields=["status", "updated_at"])
+        return
+
+    delay = IMAGE_JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+    _still_claimed(job).update(
+        status=job.PENDING, run_after=timezone.now() + timedelta(seconds=delay), **changes
+    )
+
+
+def run_jobs(model, run, limit=None):
+    """
+    Run the jobs of a queue until it is empty, or `limit` jobs were run.
+
+    Returns:
+        A (processed, failed) tuple.
+    """
+    processed = failed = 0
+    while limit is None or processed + failed < limit:
+        job = claim_job(model)
+        if job is None:
+            break
+        if run(job):
+            processed += 1
+        else:
+            failed += 1
+    return processed, failed
+
+
+def run_image_jobs(limit=None):
+    return run_jobs(ImageJob, run_image_job, limit)
+
+
+def run_mesh_jobs(limit=None):
+    return run_jobs(MeshJob, run_mesh_job, limit)
+
+
+def requeue_images(images):
+    """
+    Queue jobs for existing images, e.g. to generate missing variants.
+
+    Returns:
+        The number of jobs queued.
+    """
+    queued = 0
+    for image_id in images.values_list("id", flat=True).iterator():
+        ImageJob.enqueue(image_id)
+        queued += 1
+    return queued
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from api.models import Order
+from api.reports import backfill_sales
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily sales rollups from the orders, one chunk of days per transaction"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="day_from", help="First day (YYYY-MM-DD), defaults to the first order")
+        parser.add_argument("--to", dest="day_to", help="Last day (YYYY-MM-DD), defaults to today")
+        parser.add_argument("--chunk-days", type=int, default=31)
+
+    def handle(self, *args, **options):
+        if options["chunk_days"] < 1:
+            raise CommandError("--chunk-days must be at least 1")
+
+        day_from = self.parse_day(options["day_from"], "--from")
+        day_to = self.parse_day(options["day_to"], "--to") or timezone.localdate()
+        if day_from is None:
+            first = Order.objects.aggregate(first=Min("created_at"))["first"]
+            if first is None:
+                self.stdout.write(self.style.SUCCESS("No orders to backfill"))
+                return
+            day_from = timezone.localdate(first)
+
+        chunks = backfill_sales(day_from, day_to, chunk_days=options["chunk_days"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Backfilled sales from {day_from} to {day_to} in {chunks} chunks")
+        )
+
+    def parse_day(self, value, option):
+        if value is None:
+            return None
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f"{option} must be a date (YYYY-MM-DD)")
+        return day
@@ -0,0 +1,66 @@
+import glob
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image
+
+from api.images import IMAGE_VARIANT_WIDTHS, encode_jpeg, encode_webp, normalize
+
+DEFAULT_SAMPLES = os.path.join(settings.BASE_DIR, "api", "tests", "test_files", "*.jpg")
+
+
+class Command(BaseCommand):
+    help = "Compare the size and encode time of the JPEG and WebP encodings of sample images"
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="*", help=f"Images or globs, defaults to {DEFAULT_SAMPLES}")
+        parser.add_argument("--repeat", type=int, default=3, help="Encodings timed per size, the best is kept")
+
+    def handle(self, *args, **options):
+        paths = sorted({path for pattern in options["paths"] or [DEFAULT_SAMPLES] for path in glob.glob(pattern)})
+        if not paths:
+            raise CommandError("No sample images found")
+
+        self.stdout.write(f"{'image':<32} {'width':>6} {'jpeg B':>10} {'webp B':>10} {'saved':>7} {'jpeg ms':>8} {'webp ms':>8}")
+        totals = {"jpeg": 0, "webp": 0, "jpeg_time": 0.0, "webp_time": 0.0}
+        for path in paths:
+            with Image.open(path) as img:
+                img.load()
+                original = normalize(img)
+
+            # The sizes an upload is stored at, see api/images.py
+            widths = [width for width in IMAGE_VARIANT_WIDTHS if width < original.width] + [original.width]
+            for width in widths:
+                resized = original.resize(
+                    (width, max(1, round(original.height * width / original.width))), Image.LANCZOS
+                )
+                jpeg, jpeg_time = self.encode(encode_jpeg, resized, options["repeat"])
+                webp, webp_time = self.encode(encode_webp, resized, options["repeat"])
+                totals["jpeg"] += jpeg
+                totals["webp"] += webp
+                totals["jpeg_time"] += jpeg_time
+                totals["webp_time"] += webp_time
+                self.stdout.write(
+                    f"{os.path.basename(path)[:32]:<32} {width:>6} {jpeg:>10} {webp:>10} "
+                    f"{1 - webp / jpeg:>7.1%} {jpeg_time * 1000:>8.1f} {webp_time * 1000:>8.1f}"
+                )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"WebP saves {1 - totals['webp'] / totals['jpeg']:.1%} of the bytes "
+                f"({totals['jpeg']} => {totals['webp']}) for "
+                f"{totals['webp_time'] / totals['jpeg_time']:.2f}x the encode time "
+                f"({totals['jpeg_time'] * 1000:.0f} ms => {totals['webp_time'] * 1000:.0f} ms)"
+            )
+        )
+
+    def encode(self, encoder, img, repeat):
+        best = None
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            size = encoder(img).size
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return size, best
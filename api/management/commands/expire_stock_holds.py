@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import StockHold
+
+
+class Command(BaseCommand):
+    help = "Delete expired stock holds, in batches so the table is never locked for long"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        total = 0
+        while True:
+            batch = list(
+                StockHold.objects.filter(expires_at__lte=now)
+                .order_by("expires_at")
+                .values_list("id", flat=True)[: options["batch_size"]]
+            )
+            if not batch:
+                break
+            deleted, _ = StockHold.objects.filter(id__in=batch).delete()
+            total += deleted
+        self.stdout.write(self.style.SUCCESS(f"Expired {total} stock holds"))
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.exports import EXPORT_CHUNK_SIZE, EXPORT_OUTPUTS, export_orders
+from api.filters import ORDER_DATE_FILTERS, ORDER_SEARCH_FILTERS, ORDER_STATUS_FILTERS, apply_all_order_filters
+from api.models import Order
+
+
+class Command(BaseCommand):
+    help = "Stream all orders with their items and shipping address as CSV or NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", choices=list(EXPORT_OUTPUTS), default="csv")
+        parser.add_argument("--file", help="Write to this file instead of stdout")
+        parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+        for name in ORDER_DATE_FILTERS:
+            parser.add_argument(f"--{name}-from", help="ISO 8601 date or datetime")
+            parser.add_argument(f"--{name}-to", help="ISO 8601 date or datetime, a date includes the whole day")
+        for name in ORDER_STATUS_FILTERS:
+            parser.add_argument(f"--{name}", choices=["true", "false"])
+        for name in ORDER_SEARCH_FILTERS:
+            parser.add_argument(f"--{name}")
+        parser.add_argument("--min-total")
+
+    def handle(self, *args, **options):
+        names = [
+            *(f"{name}_{end}" for name in ORDER_DATE_FILTERS for end in ("from", "to")),
+            *ORDER_STATUS_FILTERS,
+            *ORDER_SEARCH_FILTERS,
+            "min_total",
+        ]
+        params = {name: options[name] for name in names if options[name] is not None}
+        try:
+            orders = apply_all_order_filters(Order.objects.all(), params)
+        except ValueError as e:
+            raise CommandError(e)
+
+        lines = export_orders(orders, options["output"], chunk_size=options["chunk_size"])
+        if options["file"]:
+            with open(options["file"], "w", newline="") as f:
+                f.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending="")
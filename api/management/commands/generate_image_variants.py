@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from api.jobs import requeue_images
+from api.models import ImageBlob, ProductImage
+
+
+class Command(BaseCommand):
+    help = "Queue the product images without resized or WebP variants, process_image_jobs generates them"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Regenerate the variants of every image")
+
+    def handle(self, *args, **options):
+        images = ProductImage.objects.exclude(image="")
+        if options["all"]:
+            # Shared files are processed again by the first job of each blob
+            ImageBlob.objects.update(status=ImageBlob.PENDING)
+        else:
+            missing = Q(width__isnull=True) | Q(webp_variants={})
+            images = images.filter(missing, job__isnull=True)
+        queued = requeue_images(images)
+        self.stdout.write(self.style.SUCCESS(f"Queued {queued} images"))
@@ -0,0 +1,43 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from api.jobs import run_image_jobs, run_mesh_jobs
+
+
+class Command(BaseCommand):
+    help = "Process the queued product images and 3D models, run as many instances as needed"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=1, help="Jobs processed in parallel by this process")
+        parser.add_argument("--once", action="store_true", help="Exit once the queue is empty")
+        parser.add_argument("--poll-interval", type=float, default=5, help="Seconds to wait when the queue is empty")
+
+    def handle(self, *args, **options):
+        workers = max(1, options["workers"])
+        if workers == 1:
+            processed, failed = self.work(options)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(self.work_in_thread, [options] * workers))
+            processed, failed = (sum(counts) for counts in zip(*results))
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} jobs, {failed} failed"))
+
+    def work(self, options):
+        processed = failed = 0
+        while True:
+            for run in (run_image_jobs, run_mesh_jobs):
+                done, errors = run()
+                processed += done
+                failed += errors
+            if options["once"]:
+                return processed, failed
+            time.sleep(options["poll_interval"])
+
+    def work_in_thread(self, options):
+        try:
+            return self.work(options)
+        finally:
+            connection.close()
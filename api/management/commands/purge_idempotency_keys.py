@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.idempotency import purge_idempotency_keys
+
+
+class Command(BaseCommand):
+    help = "Delete the expired Idempotency-Key responses"
+
+    def handle(self, *args, **options):
+        count = purge_idempotency_keys()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {count} expired idempotency keys"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.models import Product
+
+
+class Command(BaseCommand):
+    help = "Rebuild the product rating aggregates (count, sum, average, stars) from the reviews"
+
+    def handle(self, *args, **options):
+        count = Product.objects.recompute_ratings()
+        self.stdout.write(self.style.SUCCESS(f"Recomputed ratings of {count} products"))
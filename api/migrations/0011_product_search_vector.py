@@ -0,0 +1,53 @@
+# Generated by Django 4.2.5 on 2026-10-18 06:52
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE INDEX api_product_search_vector_gin ON api_product USING gin (search_vector)"
+        )
+        schema_editor.execute(
+            "UPDATE api_product AS p SET search_vector = "
+            "setweight(to_tsvector('simple', coalesce(p.name, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce("
+            "(SELECT c.name FROM api_category AS c WHERE c.id = p.category_id), '')), 'B') || "
+            "setweight(to_tsvector('simple', coalesce(p.description, '')), 'C')"
+        )
+    elif vendor == "sqlite":
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE api_product_fts USING fts5(name, category, description)"
+        )
+        schema_editor.execute(
+            "INSERT INTO api_product_fts (rowid, name, category, description) "
+            "SELECT p.id, p.name, coalesce(c.name, ''), coalesce(p.description, '') "
+            "FROM api_product AS p LEFT JOIN api_category AS c ON c.id = p.category_id"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS api_product_search_vector_gin")
+    elif vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS api_product_fts")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0010_alter_order_user"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                blank=True, editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.5 on 2026-10-18 06:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0011_product_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="color",
+            index=models.Index(
+                fields=["color_name", "mesh"], name="api_color_color_n_e56476_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["visible", "category", "price"],
+                name="api_product_visible_455b7c_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["visible", "price"], name="api_product_visible_4847bd_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["visible", "rating"], name="api_product_visible_7f70da_idx"
+            ),
+        ),
+    ]
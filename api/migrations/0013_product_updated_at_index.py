@@ -0,0 +1,18 @@
+# Generated by Django 4.2.5 on 2026-10-18 06:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0012_catalog_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["visible", "updated_at"], name="api_product_visible_56ea01_idx"
+            ),
+        ),
+    ]
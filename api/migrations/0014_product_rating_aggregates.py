@@ -0,0 +1,114 @@
+# Generated by Django 4.2.5 on 2026-10-18 07:02
+
+from django.db import migrations, models
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+
+def update_rating_aggregates(apps, products):
+    Review = apps.get_model("api", "Review")
+    reviews = (
+        Review.objects.filter(product=models.OuterRef("pk"))
+        .order_by()
+        .values("product")
+    )
+
+    def aggregate(expression):
+        return Coalesce(
+            models.Subquery(reviews.annotate(value=expression).values("value")), 0
+        )
+
+    changes = {
+        "num_reviews": aggregate(models.Count("id")),
+        "rating_sum": aggregate(models.Sum("rating")),
+    }
+    for star in range(1, 6):
+        changes[f"stars_{star}"] = aggregate(
+            models.Count("id", filter=models.Q(rating=star))
+        )
+    products.update(**changes)
+    products.update(
+        rating=Coalesce(
+            Cast(models.F("rating_sum"), models.FloatField())
+            / NullIf(models.F("num_reviews"), 0),
+            0,
+            output_field=models.FloatField(),
+        )
+    )
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    Product = apps.get_model("api", "Product")
+    update_rating_aggregates(apps, Product.objects.all())
+
+
+def remove_duplicate_reviews(apps, schema_editor):
+    # The unique constraint below replaces the racy exists() check that let a
+    # user review a product several times. This deletes data: only the newest
+    # review of each (product, user) pair is kept, the older ones are removed
+    # and the aggregates of the affected products are recomputed.
+    Product = apps.get_model("api", "Product")
+    Review = apps.get_model("api", "Review")
+    duplicates = (
+        Review.objects.filter(user__isnull=False)
+        .values("product", "user")
+        .annotate(reviews=models.Count("id"))
+        .filter(reviews__gt=1)
+        .order_by()
+    )
+
+    affected = set()
+    for pair in duplicates.iterator():
+        reviews = Review.objects.filter(product=pair["product"], user=pair["user"])
+        newest = reviews.order_by("-created_at", "-id").values_list("id", flat=True)[0]
+        reviews.exclude(id=newest).delete()
+        affected.add(pair["product"])
+
+    if affected:
+        update_rating_aggregates(apps, Product.objects.filter(id__in=affected))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0013_product_updated_at_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="rating_sum",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="stars_1",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="stars_2",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="stars_3",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="stars_4",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="stars_5",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+        migrations.RunPython(remove_duplicate_reviews, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="review",
+            constraint=models.UniqueConstraint(
+                fields=("product", "user"), name="unique_product_review"
+            ),
+        ),
+    ]
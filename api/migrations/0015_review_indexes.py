@@ -0,0 +1,25 @@
+# Generated by Django 4.2.5 on 2026-10-18 07:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0014_product_rating_aggregates"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                fields=["product", "created_at"], name="api_review_product_f88e7a_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                fields=["product", "rating", "created_at"],
+                name="api_review_product_12d0ad_idx",
+            ),
+        ),
+    ]
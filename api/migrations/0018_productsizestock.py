@@ -0,0 +1,58 @@
+# Generated by Django 4.2.5 on 2026-10-18 07:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0017_stockhold"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductSizeStock",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("count_in_stock", models.IntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="size_stock",
+                        to="api.product",
+                    ),
+                ),
+                (
+                    "size",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="product_stock",
+                        to="api.shoesize",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="productsizestock",
+            constraint=models.UniqueConstraint(
+                fields=("product", "size"), name="unique_product_size_stock"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="productsizestock",
+            constraint=models.CheckConstraint(
+                check=models.Q(("count_in_stock__gte", 0)),
+                name="product_size_stock_not_negative",
+            ),
+        ),
+    ]
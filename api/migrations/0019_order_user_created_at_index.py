@@ -0,0 +1,18 @@
+# Generated by Django 4.2.5 on 2026-10-18 07:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0018_productsizestock"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["user", "-created_at"], name="api_order_user_id_7ee290_idx"
+            ),
+        ),
+    ]
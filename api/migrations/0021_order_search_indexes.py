@@ -0,0 +1,72 @@
+# Generated by Django 4.2.5 on 2026-10-18 07:37
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+# auth_user is not ours, its indexes for the email and name filters of
+# getOrders are created by hand. iexact and istartswith compare UPPER() values
+# on PostgreSQL, pattern ops let the prefix match use the index too.
+USER_INDEXES = {
+    "api_user_upper_email_idx": "UPPER(email)",
+    "api_user_upper_first_name_idx": "UPPER(first_name) text_pattern_ops",
+}
+
+
+def create_user_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, expression in USER_INDEXES.items():
+        schema_editor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON auth_user ({expression})")
+
+
+def drop_user_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name in USER_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0020_sales_rollups"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(fields=["created_at"], name="api_order_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["is_paid", "paid_at"], name="api_order_paid_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["is_shipped", "is_delivered", "created_at"],
+                name="api_order_status_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(fields=["total_price"], name="api_order_total_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="shippingaddress",
+            index=models.Index(
+                django.db.models.functions.text.Upper("country"),
+                django.db.models.functions.text.Upper("city"),
+                name="api_shipping_country_city_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="shippingaddress",
+            index=models.Index(
+                django.db.models.functions.text.Upper("city"),
+                name="api_shipping_city_idx",
+            ),
+        ),
+        migrations.RunPython(create_user_indexes, drop_user_indexes),
+    ]
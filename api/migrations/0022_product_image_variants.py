@@ -0,0 +1,27 @@
+# Generated by Django 4.2.5 on 2026-10-18 07:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0021_order_search_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="productimage",
+            name="height",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="productimage",
+            name="variants",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name="productimage",
+            name="width",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.5 on 2026-10-18 07:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0023_image_jobs"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="productimage",
+            name="webp_variants",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.5 on 2026-10-18 08:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0025_image_blobs"),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name="stockhold",
+            name="unique_stock_hold",
+        ),
+        migrations.RemoveIndex(
+            model_name="stockhold",
+            name="api_stockho_product_653aa2_idx",
+        ),
+        migrations.AddField(
+            model_name="stockhold",
+            name="size",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="holds",
+                to="api.shoesize",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="stockhold",
+            index=models.Index(
+                fields=["product", "size", "expires_at"],
+                name="api_stockho_product_75c808_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="stockhold",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("size__isnull", False)),
+                fields=("user", "product", "size"),
+                name="unique_stock_hold_size",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="stockhold",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("size__isnull", True)),
+                fields=("user", "product"),
+                name="unique_stock_hold",
+            ),
+        ),
+    ]
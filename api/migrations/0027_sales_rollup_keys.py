@@ -0,0 +1,102 @@
+# Generated by Django 4.2.5 on 2026-10-18 08:26
+
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def rebuild_category_and_size_sales(apps, schema_editor):
+    # The old rows may hold duplicates of the NULL keys, rebuild both rollups
+    # from the paid orders instead of converting them
+    OrderItem = apps.get_model("api", "OrderItem")
+    DailyCategorySales = apps.get_model("api", "DailyCategorySales")
+    DailySizeSales = apps.get_model("api", "DailySizeSales")
+    DailyCategorySales.objects.all().delete()
+    DailySizeSales.objects.all().delete()
+
+    items = OrderItem.objects.filter(
+        order__is_paid=True, order__paid_at__isnull=False
+    ).annotate(day=TruncDate("order__paid_at", tzinfo=timezone.get_current_timezone()))
+    totals = {"units": models.Count("id"), "revenue": models.Sum("price")}
+    DailyCategorySales.objects.bulk_create(
+        DailyCategorySales(
+            day=row["day"],
+            category_id=row["product__category_id"] or 0,
+            category_name=row["product__category__name"] or "",
+            units=row["units"],
+            revenue=row["revenue"] or 0,
+        )
+        for row in items.values(
+            "day", "product__category_id", "product__category__name"
+        ).annotate(**totals)
+    )
+    DailySizeSales.objects.bulk_create(
+        DailySizeSales(
+            day=row["day"],
+            size_id=row["size_id"] or 0,
+            size=row["size__size"],
+            units=row["units"],
+            revenue=row["revenue"] or 0,
+        )
+        for row in items.values("day", "size_id", "size__size").annotate(**totals)
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0026_stock_hold_sizes"),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name="dailycategorysales",
+            name="unique_daily_category_sales",
+        ),
+        migrations.RemoveConstraint(
+            model_name="dailysizesales",
+            name="unique_daily_size_sales",
+        ),
+        migrations.RemoveField(
+            model_name="dailycategorysales",
+            name="category",
+        ),
+        migrations.RemoveField(
+            model_name="dailysizesales",
+            name="size",
+        ),
+        migrations.AddField(
+            model_name="dailycategorysales",
+            name="category_id",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="dailycategorysales",
+            name="category_name",
+            field=models.CharField(blank=True, default="", max_length=200),
+        ),
+        migrations.AddField(
+            model_name="dailysizesales",
+            name="size_id",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="dailysizesales",
+            name="size",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(
+            rebuild_category_and_size_sales, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name="dailycategorysales",
+            constraint=models.UniqueConstraint(
+                fields=("day", "category_id"), name="unique_daily_category_sales"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="dailysizesales",
+            constraint=models.UniqueConstraint(
+                fields=("day", "size_id"), name="unique_daily_size_sales"
+            ),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.5 on 2026-10-18 08:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0027_sales_rollup_keys"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="imageblob",
+            name="sha256",
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.5 on 2026-10-18 09:12
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def copy_product_keys(apps, schema_editor):
+    DailyProductSales = apps.get_model("api", "DailyProductSales")
+    Product = apps.get_model("api", "Product")
+    names = Product.objects.filter(pk=models.OuterRef("product_id")).values("name")
+    DailyProductSales.objects.update(
+        sold_product_id=models.F("product_id"),
+        product_name=Coalesce(models.Subquery(names[:1]), models.Value("")),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0028_direct_upload_blobs"),
+    ]
+
+    operations = [
+        # The existing rows are kept: the product ids move to a plain integer
+        # column along with the current product names
+        migrations.AddField(
+            model_name="dailyproductsales",
+            name="sold_product_id",
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name="dailyproductsales",
+            name="product_name",
+            field=models.CharField(blank=True, default="", max_length=200),
+        ),
+        migrations.RunPython(copy_product_keys, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name="dailyproductsales",
+            name="unique_daily_product_sales",
+        ),
+        migrations.RemoveField(
+            model_name="dailyproductsales",
+            name="product",
+        ),
+        migrations.RenameField(
+            model_name="dailyproductsales",
+            old_name="sold_product_id",
+            new_name="product_id",
+        ),
+        migrations.AlterField(
+            model_name="dailyproductsales",
+            name="product_id",
+            field=models.IntegerField(),
+        ),
+        migrations.AddConstraint(
+            model_name="dailyproductsales",
+            constraint=models.UniqueConstraint(
+                fields=("day", "product_id"), name="unique_daily_product_sales"
+            ),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.5 on 2026-10-18 08:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0029_product_sales_keys"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="review",
+            name="api_review_product_f88e7a_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="review",
+            name="api_review_product_12d0ad_idx",
+        ),
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                fields=["product", "created_at", "id"],
+                name="api_review_product_3b6631_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                fields=["product", "rating", "created_at", "id"],
+                name="api_review_product_af8957_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 4.2.5 on 2026-10-18 08:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0030_review_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="imageblob",
+            name="name",
+            field=models.CharField(max_length=255, unique=True),
+        ),
+        migrations.CreateModel(
+            name="MeshJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("running", "Running"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=10,
+                    ),
+                ),
+                ("attempts", models.IntegerField(default=0)),
+                ("run_after", models.DateTimeField(default=django.utils.timezone.now)),
+                ("locked_until", models.DateTimeField(blank=True, null=True)),
+                ("last_error", models.TextField(blank=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "product",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="mesh_job",
+                        to="api.product",
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+                "indexes": [
+                    models.Index(
+                        fields=["status", "run_after"],
+                        name="api_meshjob_status_3af34d_idx",
+                    ),
+                    models.Index(
+                        fields=["status", "locked_until"],
+                        name="api_meshjob_status_a67935_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
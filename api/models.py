@@ -1,5 +1,9 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Cast, Coalesce, NullIf, Upper
+from django.utils import timezone
 from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.contrib.postgres.search import SearchVectorField
 import uuid
 from PIL import Image
 import os
@@ -8,6 +12,8 @@ from django.conf import settings
 from io import BytesIO
 from django.core.files.storage import default_storage
 import traceback
+from api.images import blob_name, build_variants, content_hash, delete_variants, store_file
+from api.uploads import copy_object
 
 
 # Helper functions
@@ -37,6 +43,208 @@ class ShoeSize(models.Model):
         return str(self.size)
 
 
+def average_rating(rating_sum, num_reviews):
+    """
+    SQL expression for the average rating, 0 when there are no reviews.
+    """
+    return Coalesce(
+        Cast(rating_sum, models.FloatField()) / NullIf(num_reviews, 0),
+        0,
+        output_field=models.FloatField(),
+    )
+
+
+class InsufficientStock(Exception):
+    """
+    Raised when an order asks for more items than there are in stock.
+    """
+
+
+# Product QuerySet
+class ProductQuerySet(models.QuerySet):
+    def with_details(self, fields=None):
+        """
+        Load everything ProductSerializer touches in a fixed number of queries:
+        one for the products (with their category) and one per prefetched relation,
+        no matter how many products, meshes or colors there are.
+
+        When `fields` is given only those columns are loaded and relations that
+        are not requested are skipped entirely.
+        """
+        def wanted(name):
+            return fields is None or name in fields
+
+        queryset = self
+        if fields is not None:
+            concrete = {f.name for f in self.model._meta.concrete_fields}
+            queryset = queryset.only("id", *(f for f in fields if f in concrete))
+
+        if wanted("category"):
+            queryset = queryset.select_related("category")
+
+        lookups = []
+        if wanted("images"):
+            lookups.append("images")
+        if wanted("meshes"):
+            lookups.append(
+                models.Prefetch("meshes", queryset=Mesh.objects.prefetch_related("colors"))
+            )
+        if wanted("sizes"):
+            lookups.append("sizes")
+        if wanted("reviews"):
+            # Only the latest reviews are embedded, the rest is paginated
+            lookups.append(
+                models.Prefetch(
+                    "reviews",
+                    queryset=Review.objects.order_by(*Review.NEWEST_FIRST)[: Product.EMBEDDED_REVIEWS],
+                    to_attr="latest_reviews",
+                )
+            )
+        return queryset.prefetch_related(*lookups)
+
+    def touch(self):
+        """
+        Bump updated_at without sending signals, used when a related row changes
+        so the product's validators (ETag/Last-Modified) change with it.
+        """
+        return self.update(updated_at=timezone.now())
+
+    def in_id_order(self, ids):
+        """
+        Fetch the products with the given ids in a single query.
+
+        Returns:
+            A (products, missing) tuple: the products found, in the order of
+            `ids`, and the ids that were not found.
+        """
+        found = self.in_bulk(ids)
+        products = [found[pk] for pk in ids if pk in found]
+        missing = [pk for pk in ids if pk not in found]
+        return products, missing
+
+    def with_available(self, user=None):
+        """
+        Annotate `available`: the stock minus the live holds of other users
+        (all users when `user` is None), see StockHold.
+        """
+        return self.annotate(
+            available=models.F("count_in_stock") - StockHold.held_quantity(exclude_user=user)
+        )
+
+    def decrement_stock(self, quantities, user=None):
+        """
+        Take the given quantities out of stock with a single conditional UPDATE.
+
+        Every product must have enough stock not held by other users, the check
+        and the decrement are one statement so concurrent checkouts cannot
+        oversell. Must run inside a transaction, which the caller rolls back on
+        failure.
+
+        Args:
+            quantities: A {product id: quantity} dict.
+            user: The user checking out, their own holds count as available.
+
+        Raises:
+            InsufficientStock: If one of the products does not have enough stock.
+        """
+        if not quantities:
+            return
+        held = StockHold.held_quantity(exclude_user=user)
+        enough = models.Q()
+        decrements = []
+        for product_id, quantity in quantities.items():
+            enough |= models.Q(id=product_id, count_in_stock__gte=held + quantity)
+            decrements.append(
+                models.When(id=product_id, then=models.F("count_in_stock") - quantity)
+            )
+        updated = self.filter(enough).update(
+            count_in_stock=models.Case(*decrements, default=models.F("count_in_stock")),
+            updated_at=timezone.now(),
+        )
+        if updated != len(quantities):
+            raise InsufficientStock()
+
+    def sync_size_stock(self):
+        """
+        Set the stock of products stocked per size to the sum of their sizes,
+        in a single UPDATE.
+        """
+        totals = (
+            ProductSizeStock.objects.filter(product=models.OuterRef("pk"))
+            .order_by()
+            .values("product")
+            .annotate(total=models.Sum("count_in_stock"))
+            .values("total")
+        )
+        return self.update(
+            count_in_stock=Coalesce(models.Subquery(totals), 0), updated_at=timezone.now()
+        )
+
+    def add_rating(self, rating, count=1):
+        """
+        Add (count=1) or remove (count=-1) one review rating to the stored
+        aggregates: count, sum, star histogram and average, in a single UPDATE
+        so concurrent reviews never overwrite each other.
+        """
+        num_reviews = Coalesce(models.F("num_reviews"), 0) + count
+        rating_sum = models.F("rating_sum") + rating * count
+        changes = {
+            "num_reviews": num_reviews,
+            "rating_sum": rating_sum,
+            # Computed from the old column values, like every expression of the UPDATE
+            "rating": average_rating(rating_sum, num_reviews),
+            "updated_at": timezone.now(),
+        }
+        if rating in Product.RATING_STARS:
+            changes[f"stars_{rating}"] = models.F(f"stars_{rating}") + count
+        return self.update(**changes)
+
+    def recompute_ratings(self):
+        """
+        Rebuild the rating aggregates from the reviews table, two set-based
+        UPDATEs for however many products.
+        """
+        reviews = Review.objects.filter(product=models.OuterRef("pk")).order_by().values("product")
+
+        def aggregate(expression):
+            return Coalesce(
+                models.Subquery(reviews.annotate(value=expression).values("value")), 0
+            )
+
+        changes = {
+            "num_reviews": aggregate(models.Count("id")),
+            "rating_sum": aggregate(models.Sum("rating")),
+        }
+        for star in Product.RATING_STARS:
+            changes[f"stars_{star}"] = aggregate(
+                models.Count("id", filter=models.Q(rating=star))
+            )
+        updated = self.update(updated_at=timezone.now(), **changes)
+        self.update(rating=average_rating(models.F("rating_sum"), models.F("num_reviews")))
+        return updated
+
+    def summary(self):
+        """
+        Load only what ProductSummarySerializer needs: a handful of product
+        columns, the category name and the images used to pick the primary one.
+        """
+        return (
+            self.select_related("category")
+            .only(
+                "id", "name", "price", "rating", "num_reviews",
+                "category__id", "category__name",
+            )
+            .prefetch_related(
+                models.Prefetch(
+                    "images",
+                    queryset=ProductImage.objects.only(
+                        "id", "product_id", "image", "width", "variants", "webp_variants"
+                    ).order_by("id"),
+                )
+            )
+        )
+
+
 # Product Model
 class Product(models.Model):
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
@@ -56,30 +264,59 @@ class Product(models.Model):
         upload_to=product_model_upload_path, null=True, blank=True
     )
     visible = models.BooleanField(default=False)
+    # Full-text search document on PostgreSQL (GIN indexed), see api/search.py
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
+    # Rating aggregates, maintained by ProductQuerySet.add_rating
+    rating_sum = models.IntegerField(default=0, editable=False)
+    stars_1 = models.IntegerField(default=0, editable=False)
+    stars_2 = models.IntegerField(default=0, editable=False)
+    stars_3 = models.IntegerField(default=0, editable=False)
+    stars_4 = models.IntegerField(default=0, editable=False)
+    stars_5 = models.IntegerField(default=0, editable=False)
 
-    def save(self, *args, **kwargs):
+    RATING_STARS = range(1, 6)
+    # Number of reviews embedded in the product representation
+    EMBEDDED_REVIEWS = 5
+
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        # Catalog filters, see api/facets.py
+        indexes = [
+            models.Index(fields=["visible", "category", "price"]),
+            models.Index(fields=["visible", "price"]),
+            models.Index(fields=["visible", "rating"]),
+            # max(updated_at) for the catalog validators, see api/conditional.py
+            models.Index(fields=["visible", "updated_at"]),
+        ]
+
+    def save(self, *args, extract_meshes=True, **kwargs):
+        # Direct uploads leave the extraction to a MeshJob (extract_meshes=False)
         super().save(*args, **kwargs)
 
-        if self.model_3d:
+        if self.model_3d and extract_meshes:
             try:
-                file_type = "glb"
-                if not settings.USE_LOCAL:
-                    with default_storage.open(self.model_3d.name) as file:
-                        file_content = BytesIO(file.read())
-                    mesh = trimesh.load_mesh(file_content, file_type=file_type)
-
-                    for name, geometry in mesh.geometry.items():
-                        if "exclude" not in name:
-                            Mesh.objects.get_or_create(product=self, name=name)
-                else:
-                    mesh = trimesh.load_mesh(self.model_3d.path)
-                    for name, geometry in mesh.geometry.items():
-                        if "exclude" not in name:
-                            Mesh.objects.get_or_create(product=self, name=name)
+                self.extract_meshes()
             except Exception as e:
                 print("Error:", e)
                 traceback.print_exc()
 
+    def extract_meshes(self):
+        """
+        Create a Mesh for every geometry of the 3D model, but the excluded ones.
+        """
+        file_type = "glb"
+        if not settings.USE_LOCAL:
+            with default_storage.open(self.model_3d.name) as file:
+                file_content = BytesIO(file.read())
+            mesh = trimesh.load_mesh(file_content, file_type=file_type)
+        else:
+            mesh = trimesh.load_mesh(self.model_3d.path)
+
+        for name, geometry in mesh.geometry.items():
+            if "exclude" not in name:
+                Mesh.objects.get_or_create(product=self, name=name)
+
     def delete(self, *args, **kwargs):
         if self.model_3d:
             if not settings.USE_LOCAL:
@@ -101,62 +338,395 @@ class Product(models.Model):
         return self.name
 
 
+# ImageBlob Model, an uploaded image file shared by every ProductImage of the
+# same content, see api/images.py
+class ImageBlob(models.Model):
+    PENDING = "pending"
+    READY = "ready"
+    STATUSES = [(PENDING, "Pending"), (READY, "Ready")]
+
+    # Null until the image job of a direct upload (see api/uploads.py) hashed it
+    sha256 = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    # Storage name of the original, its variants are stored next to it. The
+    # upload key of a direct upload until it is hashed, unique so an upload
+    # is only finalized once.
+    name = models.CharField(max_length=255, unique=True)
+    # ProductImages using the blob. Released blobs are kept with 0 until
+    # sweep() deleted their files, so a new upload of the same content can't
+    # have its file deleted by the sweep.
+    ref_count = models.PositiveIntegerField(default=0)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    variants = models.JSONField(default=dict, blank=True)
+    webp_variants = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def acquire(cls, upload, storage=default_storage):
+        """
+        Take a reference to the blob of an upload, storing the upload if its
+        content is new.
+
+        Returns:
+            The ImageBlob, its ref_count includes the new reference.
+        """
+        digest = content_hash(upload)
+        with transaction.atomic():
+            blob = cls._lock_by_content(digest)
+            if blob is None:
+                name = store_file(storage, blob_name(digest), upload)
+                try:
+                    with transaction.atomic():
+                        return cls.objects.create(sha256=digest, name=name, ref_count=1)
+                except IntegrityError:
+                    # Stored by a concurrent upload of the same content
+                    blob = cls.objects.select_for_update().get(sha256=digest)
+
+            cls.objects.filter(id=blob.id).update(ref_count=models.F("ref_count") + 1)
+            blob.ref_count += 1
+            return blob
+
+    def store_by_content(self, storage=default_storage):
+        """
+        Give a direct upload its content addressed name: hash it and copy it
+        there inside the storage, or hand its images over to the blob that
+        already holds the same content. Must run in a transaction, with this
+        blob locked.
+
+        Returns:
+            The blob the images of this one now use.
+        """
+        upload = self.name
+        with storage.open(upload) as f:
+            digest = content_hash(f)
+        try:
+            with transaction.atomic():
+                existing = ImageBlob._lock_by_content(digest)
+                if existing is None:
+                    self.sha256, self.name = digest, blob_name(digest)
+                    self.save(update_fields=["sha256", "name", "updated_at"])
+                    copy_object(upload, self.name, storage)
+                    transaction.on_commit(lambda: storage.delete(upload))
+                    return self
+        except IntegrityError:
+            # Hashed by the job of a concurrent upload of the same content
+            self.sha256, self.name = None, upload
+            existing = ImageBlob.objects.select_for_update().get(sha256=digest)
+
+        ProductImage.objects.filter(blob=self).update(blob=existing)
+        ImageBlob.objects.filter(id=existing.id).update(
+            ref_count=models.F("ref_count") + self.ref_count
+        )
+        self.delete()
+        transaction.on_commit(lambda: storage.delete(upload))
+        existing.refresh_from_db()
+        return existing
+
+    @classmethod
+    def _lock_by_content(cls, digest):
+        """
+        Lock the blob of a content, if any. A released one is dropped, its
+        files may be gone already, the content is stored again in its place.
+        """
+        blob = cls.objects.select_for_update().filter(sha256=digest).first()
+        if blob is not None and blob.ref_count == 0:
+            blob.delete()
+            return None
+        return blob
+
+    @classmethod
+    def release(cls, blob_id):
+        """
+        Drop a reference to a blob, deleting it and its files with the last one.
+        """
+        with transaction.atomic():
+            blob = cls.objects.select_for_update().filter(id=blob_id).first()
+            if blob is None or blob.ref_count == 0:
+                return
+            cls.objects.filter(id=blob.id).update(ref_count=models.F("ref_count") - 1)
+            if blob.ref_count == 1:
+                transaction.on_commit(lambda: cls.sweep(blob.id))
+
+    @classmethod
+    def sweep(cls, blob_id):
+        """
+        Delete a released blob and its files, unless its content was uploaded
+        again since. The files are deleted with the row locked.
+        """
+        with transaction.atomic():
+            blob = cls.objects.select_for_update().filter(id=blob_id, ref_count=0).first()
+            if blob is None:
+                return
+            blob.delete()
+            blob.delete_files()
+
+    def delete_files(self, storage=default_storage):
+        storage.delete(self.name)
+        delete_variants(self.variants, storage)
+        delete_variants(self.webp_variants, storage)
+
+    def __str__(self):
+        return f"Image blob {self.sha256}"
+
+
 # ProductImage Model
 class ProductImage(models.Model):
     product = models.ForeignKey(
         Product, related_name="images", on_delete=models.CASCADE
     )
     image = models.ImageField(upload_to=product_image_upload_path)
+    # The stored file, shared with the other images of the same content. Null
+    # for images uploaded before content addressing, which own their files.
+    blob = models.ForeignKey(
+        ImageBlob, null=True, blank=True, related_name="images", on_delete=models.PROTECT, editable=False
+    )
+    # Size of the original and its resized copies by width, see api/images.py
+    width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    variants = models.JSONField(default=dict, blank=True, editable=False)
+    # The WebP encodings by width, the original's included
+    webp_variants = models.JSONField(default=dict, blank=True, editable=False)
+    # New uploads are pending until an image job has processed them
+    PENDING = "pending"
+    READY = "ready"
+    FAILED = "failed"
+    STATUSES = [(PENDING, "Pending"), (READY, "Ready"), (FAILED, "Failed")]
+    status = models.CharField(max_length=10, choices=STATUSES, default=READY, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def save(self, *args, **kwargs):
-        # Process and save the image only once
-        if not settings.USE_LOCAL:
-            # Process image for S3
-            if self.image and not self._state.adding:
-                # Open the image using its URL
-                img = Image.open(self.image)
-
-                # Convert to JPG if it's not
-                if img.format != "JPEG":
-                    img = img.convert("RGB")
-                    buffer = BytesIO()
-                    img.save(buffer, format="JPEG")
-                    buffer.seek(0)
-
-                    # Save the processed image back to S3
-                    self.image.save(self.image.name, buffer, save=False)
-                    buffer.close()
-        else:
-            # Local storage logic
-            if self.image and not os.path.exists(self.image.path):
-                img = Image.open(self.image.path)
-                if img.format != "JPEG":
-                    img = img.convert("RGB")
-                    img.save(self.image.path, "JPEG")
-
-        # Call the parent class's save method
-        super().save(*args, **kwargs)
+        # A newly uploaded file is stored (once per content) as is, decoding it
+        # is left to a worker unless the same content was processed already
+        if not (self.image and not self.image._committed):
+            return super().save(*args, **kwargs)
 
-    def delete(self, *args, **kwargs):
-        if not settings.USE_LOCAL:
-            # Delete image from S3
-            if self.image:
-                default_storage.delete(self.image.name)
-        else:
-            # Local storage logic
-            if self.image:
-                file_path = os.path.join(settings.MEDIA_ROOT, self.image.path)
-                if os.path.exists(file_path):
-                    os.remove(file_path)
+        previous_blob_id = self.blob_id
+        with transaction.atomic():
+            self.blob = ImageBlob.acquire(self.image.file, self.image.storage)
+            self.image = self.blob.name
+            self.copy_blob()
+            super().save(*args, **kwargs)
 
-        super().delete(*args, **kwargs)
+            if self.status == self.PENDING:
+                ImageJob.enqueue(self.id)
+            if previous_blob_id is not None:
+                ImageBlob.release(previous_blob_id)
+
+    def copy_blob(self):
+        blob = self.blob
+        self.image = blob.name
+        self.width, self.height = blob.width, blob.height
+        self.variants, self.webp_variants = blob.variants, blob.webp_variants
+        self.status = self.READY if blob.status == ImageBlob.READY else self.PENDING
+
+    def process(self):
+        """
+        Re-encode the stored original as JPEG and generate its variants, once
+        per blob.
+        """
+        update_fields = ["width", "height", "variants", "webp_variants", "status", "updated_at"]
+        if self.blob_id is None:
+            self.width, self.height, self.variants, self.webp_variants = build_variants(
+                self.image.name, self.image.storage
+            )
+            self.status = self.READY
+            self.save(update_fields=update_fields)
+            return
+
+        if self.blob.sha256 is None:
+            # Committed on its own, so a failed conversion doesn't undo the copy
+            with transaction.atomic():
+                blob = ImageBlob.objects.select_for_update().get(id=self.blob_id)
+                if blob.sha256 is None:
+                    blob = blob.store_by_content(self.image.storage)
+                self.blob_id = blob.id
+            update_fields += ["image", "blob"]
+
+        with transaction.atomic():
+            # Jobs of images sharing the blob wait for the lock, the first one
+            # converts it and the others find it ready
+            blob = ImageBlob.objects.select_for_update().get(id=self.blob_id)
+            if blob.status != ImageBlob.READY:
+                blob.width, blob.height, blob.variants, blob.webp_variants = build_variants(
+                    blob.name, self.image.storage
+                )
+                blob.status = ImageBlob.READY
+                blob.save()
+            self.blob = blob
+            self.copy_blob()
+            self.save(update_fields=update_fields)
+
+    def release_files(self):
+        """
+        Give up the files of a deleted image: its reference to the blob, or the
+        files themselves for images without one.
+        """
+        if self.blob_id is not None:
+            ImageBlob.release(self.blob_id)
+        elif self.image:
+            storage, name = self.image.storage, self.image.name
+            variants = [self.variants, self.webp_variants]
+
+            def delete_files():
+                storage.delete(name)
+                for names in variants:
+                    delete_variants(names, storage)
+
+            transaction.on_commit(delete_files)
 
     def __str__(self):
         return f"Image for {self.product.name}"
 
 
+# Jobs, the database backed queues of work done outside of the API workers,
+# see api/jobs.py
+class Job(models.Model):
+    PENDING = "pending"
+    RUNNING = "running"
+    FAILED = "failed"
+    STATUSES = [(PENDING, "Pending"), (RUNNING, "Running"), (FAILED, "Failed")]
+
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    attempts = models.IntegerField(default=0)
+    # Not picked before this time, pushed back after a failed attempt
+    run_after = models.DateTimeField(default=timezone.now)
+    # A running job whose worker died is picked again after this time
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+        indexes = [
+            # The next jobs to run
+            models.Index(fields=["status", "run_after"]),
+            models.Index(fields=["status", "locked_until"]),
+        ]
+
+    @classmethod
+    def queue(cls, **target):
+        """
+        Queue the job of `target`, resetting it if it has one.
+        """
+        cls.objects.update_or_create(
+            **target,
+            defaults={
+                "status": cls.PENDING,
+                "attempts": 0,
+                "run_after": timezone.now(),
+                "locked_until": None,
+                "last_error": "",
+            },
+        )
+
+
+# ImageJob Model, the queue of ProductImages to process
+class ImageJob(Job):
+    image = models.OneToOneField(ProductImage, related_name="job", on_delete=models.CASCADE)
+
+    @classmethod
+    def enqueue(cls, image_id):
+        """
+        Queue the processing of an image, resetting its job if it has one.
+        """
+        cls.queue(image_id=image_id)
+
+    def __str__(self):
+        return f"Job for image {self.image_id} ({self.status})"
+
+
+# MeshJob Model, the queue of 3D models to extract the meshes of
+class MeshJob(Job):
+    product = models.OneToOneField(Product, related_name="mesh_job", on_delete=models.CASCADE)
+
+    @classmethod
+    def enqueue(cls, product_id):
+        """
+        Queue the mesh extraction of a product's model, resetting its job if
+        it has one.
+        """
+        cls.queue(product_id=product_id)
+
+    def __str__(self):
+        return f"Mesh job for product {self.product_id} ({self.status})"
+
+
+# ProductSizeStock QuerySet
+class ProductSizeStockQuerySet(models.QuerySet):
+    def with_available(self, user=None):
+        """
+        Annotate `available`: the stock of the size minus the live holds of
+        other users on it (all users when `user` is None), see StockHold.
+        """
+        return self.annotate(
+            available=models.F("count_in_stock")
+            - StockHold.held_quantity(exclude_user=user, per_size=True)
+        )
+
+    def decrement(self, quantities, user=None):
+        """
+        Take the given quantities out of the size stock with a single
+        conditional UPDATE, see ProductQuerySet.decrement_stock.
+
+        Args:
+            quantities: A {(product id, size id): quantity} dict.
+            user: The user checking out, their own holds count as available.
+
+        Raises:
+            InsufficientStock: If one of the sizes does not have enough stock.
+        """
+        if not quantities:
+            return
+        held = StockHold.held_quantity(exclude_user=user, per_size=True)
+        enough = models.Q()
+        decrements = []
+        for (product_id, size_id), quantity in quantities.items():
+            enough |= models.Q(
+                product_id=product_id, size_id=size_id, count_in_stock__gte=held + quantity
+            )
+            decrements.append(
+                models.When(
+                    product_id=product_id,
+                    size_id=size_id,
+                    then=models.F("count_in_stock") - quantity,
+                )
+            )
+        updated = self.filter(enough).update(
+            count_in_stock=models.Case(*decrements, default=models.F("count_in_stock")),
+            updated_at=timezone.now(),
+        )
+        if updated != len(quantities):
+            raise InsufficientStock()
+
+
+# ProductSizeStock Model
+class ProductSizeStock(models.Model):
+    # Stock of one size of a product. Products without rows here are only
+    # stocked per product (Product.count_in_stock), for the others
+    # count_in_stock is the sum of their sizes.
+    product = models.ForeignKey(Product, related_name="size_stock", on_delete=models.CASCADE)
+    size = models.ForeignKey(ShoeSize, related_name="product_stock", on_delete=models.CASCADE)
+    count_in_stock = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ProductSizeStockQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["product", "size"], name="unique_product_size_stock"),
+            models.CheckConstraint(
+                check=models.Q(count_in_stock__gte=0), name="product_size_stock_not_negative"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.count_in_stock} of {self.product.name} in size {self.size.size}"
+
+
 # Mesh Model
 class Mesh(models.Model):
     product = models.ForeignKey(
@@ -180,6 +750,10 @@ class Color(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # Color filter and facet: color name -> meshes -> products
+        indexes = [models.Index(fields=["color_name", "mesh"])]
+
     def __str__(self):
         return f"Color {self.color_name} ({self.hex_code}) for {self.mesh.name}"
 
@@ -196,10 +770,45 @@ class Review(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Sort orders of the product reviews endpoint
+    NEWEST_FIRST = ("-created_at", "-id")
+    SORT_ORDERS = {
+        "newest": NEWEST_FIRST,
+        "highest": ("-rating", "-created_at", "-id"),
+        "lowest": ("rating", "-created_at", "-id"),
+    }
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["product", "user"], name="unique_product_review")
+        ]
+        indexes = [
+            # The SORT_ORDERS of a product's reviews, down to the id the
+            # keyset cursor ends with
+            models.Index(fields=["product", "created_at", "id"]),
+            models.Index(fields=["product", "rating", "created_at", "id"]),
+        ]
+
     def __str__(self):
         return f"Review for {self.product.name} by {self.user.username}"
 
 
+# Order QuerySet
+class OrderQuerySet(models.QuerySet):
+    def with_details(self):
+        """
+        Load everything OrderSerializer touches: the user and the shipping
+        address with the orders, the items in one more query.
+        """
+        return self.select_related("user", "shipping_address").prefetch_related("order_items")
+
+    def summary(self):
+        """
+        What OrderSummarySerializer needs: the order columns and an item count.
+        """
+        return self.annotate(num_items=models.Count("order_items"))
+
+
 # Order
 class Order(models.Model):
     user = models.ForeignKey(
@@ -224,6 +833,19 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # A user's orders, newest first
+            models.Index(fields=["user", "-created_at"]),
+            # The getOrders filters, see api/filters.py for the customer ones
+            models.Index(fields=["created_at"], name="api_order_created_idx"),
+            models.Index(fields=["is_paid", "paid_at"], name="api_order_paid_idx"),
+            models.Index(fields=["is_shipped", "is_delivered", "created_at"], name="api_order_status_idx"),
+            models.Index(fields=["total_price"], name="api_order_total_idx"),
+        ]
+
     def __str__(self):
         return f"Order {self.id} for {self.user.username}"
 
@@ -260,6 +882,13 @@ class ShippingAddress(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Case insensitive lookups of getOrders
+            models.Index(Upper("country"), Upper("city"), name="api_shipping_country_city_idx"),
+            models.Index(Upper("city"), name="api_shipping_city_idx"),
+        ]
+
     def __str__(self):
         return f"ShippingAddress for {self.order.id}"
 
@@ -272,3 +901,162 @@ class ActionLog(models.Model):
 
     def __str__(self):
         return f"Log: {self.user.username} - {self.action} - {self.created_at}"
+
+
+# IdempotencyKey
+class IdempotencyKey(models.Model):
+    # Response of the first request sent with an Idempotency-Key header,
+    # replayed to the retries, see api/idempotency.py
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="idempotency_keys")
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "key"], name="unique_idempotency_key")
+        ]
+        indexes = [models.Index(fields=["expires_at"])]
+
+    def __str__(self):
+        return f"Idempotency key {self.key} for {self.user.username}"
+
+
+# StockHold
+class StockHold(models.Model):
+    # Stock reserved for a user's cart until expires_at, converted into an
+    # order by addOrder. Expired holds are ignored and deleted in batches by
+    # `manage.py expire_stock_holds`. Holds of products stocked per size are
+    # per size (and checked against that ProductSizeStock row), the others
+    # have no size.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="stock_holds")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="holds")
+    size = models.ForeignKey(
+        ShoeSize, on_delete=models.CASCADE, null=True, blank=True, related_name="holds"
+    )
+    quantity = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            # NULLs never collide, product level holds need their own constraint
+            models.UniqueConstraint(
+                fields=["user", "product", "size"],
+                condition=models.Q(size__isnull=False),
+                name="unique_stock_hold_size",
+            ),
+            models.UniqueConstraint(
+                fields=["user", "product"],
+                condition=models.Q(size__isnull=True),
+                name="unique_stock_hold",
+            ),
+        ]
+        indexes = [
+            # Live holds of a product or one of its sizes, and the sweeper
+            models.Index(fields=["product", "size", "expires_at"]),
+            models.Index(fields=["expires_at"]),
+        ]
+
+    @classmethod
+    def held_quantity(cls, exclude_user=None, per_size=False):
+        """
+        SQL expression for the quantity held by live holds, optionally leaving
+        out one user's holds: of a product (OuterRef("pk")), or with
+        `per_size` of a ProductSizeStock row (OuterRef("product"), OuterRef("size")).
+        """
+        if per_size:
+            holds = cls.objects.filter(
+                product=models.OuterRef("product"), size=models.OuterRef("size")
+            )
+        else:
+            holds = cls.objects.filter(product=models.OuterRef("pk"))
+        holds = holds.filter(expires_at__gt=timezone.now())
+        if exclude_user is not None:
+            holds = holds.exclude(user=exclude_user)
+        total = holds.order_by().values("product").annotate(total=models.Sum("quantity")).values("total")
+        return Coalesce(models.Subquery(total), 0)
+
+    def __str__(self):
+        return f"Hold of {self.quantity} {self.product.name} for {self.user.username}"
+
+
+# Sales rollups
+#
+# One row per day (and product, category or size) with the totals of that
+# day, kept up to date by api/reports.py when orders are placed and paid so
+# the sales report never scans Order or OrderItem.
+
+
+class DailySales(models.Model):
+    day = models.DateField(unique=True)
+    # Orders placed that day
+    orders = models.IntegerField(default=0)
+    # Orders paid that day, their revenue and number of items
+    paid_orders = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    units = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"Sales of {self.day}"
+
+
+class DailyProductSales(models.Model):
+    day = models.DateField()
+    # Not a foreign key, like DailyCategorySales.category_id: deleting a
+    # product keeps its sales. The name is the one at the time of the sale.
+    product_id = models.IntegerField()
+    product_name = models.CharField(max_length=200, blank=True, default="")
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["day", "product_id"], name="unique_daily_product_sales")
+        ]
+
+    def __str__(self):
+        return f"Sales of {self.product_name} on {self.day}"
+
+
+class DailyCategorySales(models.Model):
+    day = models.DateField()
+    # Not a foreign key: rows of deleted categories stay apart, and the key is
+    # never NULL so the unique constraint holds (NO_CATEGORY for products
+    # without a category). The name is the one at the time of the sale.
+    category_id = models.IntegerField(default=0)
+    category_name = models.CharField(max_length=200, blank=True, default="")
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    NO_CATEGORY = 0
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["day", "category_id"], name="unique_daily_category_sales")
+        ]
+
+    def __str__(self):
+        return f"Sales of category {self.category_id} on {self.day}"
+
+
+class DailySizeSales(models.Model):
+    day = models.DateField()
+    # Like DailyCategorySales.category_id, NO_SIZE for items bought without a size
+    size_id = models.IntegerField(default=0)
+    size = models.IntegerField(null=True, blank=True)
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    NO_SIZE = 0
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["day", "size_id"], name="unique_daily_size_sales")
+        ]
+
+    def __str__(self):
+        return f"Sales of size {self.size_id} on {self.day}"
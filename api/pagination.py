@@ -0,0 +1,143 @@
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor (keyset) pagination used when a client opts in with `?cursor=`.
+
+    Pages are fetched with `WHERE id > last_seen ORDER BY id LIMIT n` instead of
+    COUNT(*) + OFFSET, so deep pages cost the same as the first one.
+
+    Unlike DRF's CursorPagination, which only keys on the first ordering field
+    and falls back to an OFFSET among the rows sharing its value, the cursor
+    holds the values of every ordering field: with ("-rating", "-created_at",
+    "-id") the next page is the rows after (rating, created_at, id) of the last
+    one. The ordering must end with a unique field and its fields must not be
+    NULL.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if current_position is not None:
+            queryset = queryset.filter(self._after(ordering, current_position))
+
+        # One extra item tells whether there is a page after this one. The
+        # offset is only set by DRF for positions shared by several rows,
+        # which a unique ordering never has.
+        try:
+            results = list(queryset[offset:offset + self.page_size + 1])
+        except (ValidationError, ValueError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+        self.page = results[:self.page_size]
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        return self.page
+
+    def _after(self, ordering, position):
+        """
+        The rows after `position` in `ordering`: (a > x) OR (a = x AND b > y) ...
+        with < for descending fields, and the bound on the first field repeated
+        so the database can range scan the index.
+        """
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        fields = [(order.lstrip("-"), "lt" if order.startswith("-") else "gt") for order in ordering]
+        after = Q()
+        for i, (field, lookup) in enumerate(fields):
+            equal = {name: value for (name, _), value in zip(fields[:i], values)}
+            after |= Q(**equal, **{f"{field}__{lookup}": values[i]})
+        field, lookup = fields[0]
+        return Q(**{f"{field}__{lookup}e": values[0]}) & after
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for order in ordering:
+            field_name = order.lstrip("-")
+            if isinstance(instance, dict):
+                attr = instance[field_name]
+            else:
+                attr = getattr(instance, field_name)
+            values.append(str(attr))
+        return json.dumps(values)
+
+
+def is_cursor_request(request):
+    """
+    Cursor mode is opt-in: an empty `?cursor=` asks for the first page.
+    """
+    return KeysetPagination.cursor_query_param in request.query_params
+
+
+def paginate_by_cursor(request, queryset, ordering, page_size):
+    """
+    Paginate a queryset with an opaque cursor.
+
+    Args:
+        request: The DRF request object.
+        queryset: The queryset to paginate.
+        ordering: A unique ordering, e.g. "id", "-id" or ("-created_at", "-id").
+        page_size: The default number of items per page, the client can change it
+            with `?page_size=` up to `KeysetPagination.max_page_size`.
+
+    Returns:
+        A (items, next_link, prev_link) tuple.
+
+    Raises:
+        NotFound: If the cursor is invalid.
+    """
+    paginator = KeysetPagination()
+    paginator.ordering = ordering
+    paginator.page_size = page_size
+
+    items = paginator.paginate_queryset(queryset, request)
+    return items, paginator.get_next_link(), paginator.get_previous_link()
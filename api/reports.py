@@ -0,0 +1,228 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from api.models import (
+    Order,
+    OrderItem,
+    DailySales,
+    DailyProductSales,
+    DailyCategorySales,
+    DailySizeSales,
+)
+
+# Daily sales rollups and the sales report built from them.
+#
+# record_order_placed() and record_order_paid() add one order to the rollups
+# of its day, in the transaction that places or pays it. The paid transition
+# is guarded by a conditional UPDATE (see updateOrderToPaid) so an order is
+# only counted once. backfill_sales() rebuilds a date range from the orders.
+
+
+def _increment(model, lookup, amounts, defaults=None):
+    """
+    Add `amounts` to the rollup row matching `lookup`, creating it (with
+    `defaults`) if needed.
+    """
+    changes = {field: F(field) + amount for field, amount in amounts.items()}
+    if model.objects.filter(**lookup).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **amounts, **(defaults or {}))
+    except IntegrityError:
+        # Created by a concurrent order in the meantime
+        model.objects.filter(**lookup).update(**changes)
+
+
+def record_order_placed(order):
+    _increment(DailySales, {"day": timezone.localdate(order.created_at)}, {"orders": 1})
+
+
+def record_order_paid(order):
+    """
+    Add a paid order (revenue and items) to the rollups of its payment day.
+    """
+    day = timezone.localdate(order.paid_at)
+    items = OrderItem.objects.filter(order=order).values_list(
+        "product_id",
+        "product__name",
+        "product__category_id",
+        "product__category__name",
+        "size_id",
+        "size__size",
+        "price",
+    )
+
+    products = defaultdict(lambda: [0, Decimal(0)])
+    categories = defaultdict(lambda: [0, Decimal(0)])
+    sizes = defaultdict(lambda: [0, Decimal(0)])
+    names = {DailyProductSales: {}, DailyCategorySales: {}, DailySizeSales: {}}
+    for product_id, product_name, category_id, category_name, size_id, size, price in items:
+        category_id = category_id or DailyCategorySales.NO_CATEGORY
+        size_id = size_id or DailySizeSales.NO_SIZE
+        names[DailyProductSales][product_id] = {"product_name": product_name or ""}
+        names[DailyCategorySales][category_id] = {"category_name": category_name or ""}
+        names[DailySizeSales][size_id] = {"size": size}
+        for totals in (products[product_id], categories[category_id], sizes[size_id]):
+            totals[0] += 1
+            totals[1] += price or 0
+
+    _increment(
+        DailySales,
+        {"day": day},
+        {"paid_orders": 1, "revenue": order.total_price or 0, "units": len(items)},
+    )
+    for model, field, rows in (
+        (DailyProductSales, "product_id", products),
+        (DailyCategorySales, "category_id", categories),
+        (DailySizeSales, "size_id", sizes),
+    ):
+        for key, (units, revenue) in rows.items():
+            _increment(
+                model,
+                {"day": day, field: key},
+                {"units": units, "revenue": revenue},
+                names[model][key],
+            )
+
+
+def _day_bounds(day_from, day_to):
+    start = timezone.make_aware(datetime.combine(day_from, time.min))
+    end = timezone.make_aware(datetime.combine(day_to + timedelta(days=1), time.min))
+    return start, end
+
+
+def _backfill_chunk(day_from, day_to):
+    start, end = _day_bounds(day_from, day_to)
+    tz = timezone.get_current_timezone()
+
+    days = defaultdict(lambda: {"orders": 0, "paid_orders": 0, "revenue": 0, "units": 0})
+    placed = (
+        Order.objects.filter(created_at__gte=start, created_at__lt=end)
+        .annotate(day=TruncDate("created_at", tzinfo=tz))
+        .values("day")
+        .annotate(orders=Count("id"))
+    )
+    for row in placed:
+        days[row["day"]]["orders"] = row["orders"]
+
+    paid = (
+        Order.objects.filter(is_paid=True, paid_at__gte=start, paid_at__lt=end)
+        .annotate(day=TruncDate("paid_at", tzinfo=tz))
+        .values("day")
+        .annotate(paid_orders=Count("id"), revenue=Sum("total_price"))
+    )
+    for row in paid:
+        days[row["day"]].update(paid_orders=row["paid_orders"], revenue=row["revenue"] or 0)
+
+    items = (
+        OrderItem.objects.filter(order__is_paid=True, order__paid_at__gte=start, order__paid_at__lt=end)
+        .annotate(day=TruncDate("order__paid_at", tzinfo=tz))
+    )
+    for row in items.values("day").annotate(units=Count("id")):
+        days[row["day"]]["units"] = row["units"]
+    DailySales.objects.bulk_create([DailySales(day=day, **totals) for day, totals in days.items()])
+
+    for model, group, extra in (
+        (DailyProductSales, {"product_id": "product_id"}, {"product_name": "product__name"}),
+        (
+            DailyCategorySales,
+            {"category_id": "product__category_id"},
+            {"category_name": "product__category__name"},
+        ),
+        (DailySizeSales, {"size_id": "size_id"}, {"size": "size__size"}),
+    ):
+        rows = items.values("day", *group.values(), *extra.values()).annotate(
+            units=Count("id"), revenue=Sum("price")
+        )
+        model.objects.bulk_create(
+            [
+                model(
+                    day=row["day"],
+                    units=row["units"],
+                    revenue=row["revenue"] or 0,
+                    # NULL category or size ids become the 0 key
+                    **{field: row[lookup] or 0 for field, lookup in group.items()},
+                    **{field: row[lookup] for field, lookup in extra.items() if row[lookup] is not None},
+                )
+                for row in rows
+            ]
+        )
+
+
+def backfill_sales(day_from, day_to, chunk_days=31):
+    """
+    Rebuild the rollups of a date range from the orders, `chunk_days` days
+    per transaction.
+
+    Returns:
+        The number of chunks processed.
+    """
+    chunks = 0
+    while day_from <= day_to:
+        chunk_to = min(day_from + timedelta(days=chunk_days - 1), day_to)
+        with transaction.atomic():
+            for model in (DailySales, DailyProductSales, DailyCategorySales, DailySizeSales):
+                model.objects.filter(day__gte=day_from, day__lte=chunk_to).delete()
+            _backfill_chunk(day_from, chunk_to)
+        chunks += 1
+        day_from = chunk_to + timedelta(days=1)
+    return chunks
+
+
+def _money(value):
+    # Rendered like the serializers' DecimalFields
+    return str(Decimal(value or 0).quantize(Decimal("0.01")))
+
+
+def get_sales_report(day_from, day_to, top=10):
+    """
+    Sales of a date range (both days included), read from the rollups only.
+
+    Returns:
+        A dict with the daily totals, the totals of the range and the
+        best selling products, categories and sizes.
+    """
+    in_range = {"day__gte": day_from, "day__lte": day_to}
+
+    days = [
+        {**row, "revenue": _money(row["revenue"])}
+        for row in DailySales.objects.filter(**in_range)
+        .order_by("day")
+        .values("day", "orders", "paid_orders", "revenue", "units")
+    ]
+    totals = DailySales.objects.filter(**in_range).aggregate(
+        orders=Sum("orders"), paid_orders=Sum("paid_orders"), revenue=Sum("revenue"), units=Sum("units")
+    )
+    totals = {key: value or 0 for key, value in totals.items()}
+    totals["revenue"] = _money(totals["revenue"])
+
+    def best(model, field, name):
+        # Max() picks one name when a product or category was renamed within the range,
+        # the 0 key (no category or size) has none
+        return [
+            {
+                "id": row[field] or None,
+                "name": row["name"] if row[field] else None,
+                "units": row["units"],
+                "revenue": _money(row["revenue"]),
+            }
+            for row in model.objects.filter(**in_range)
+            .values(field)
+            .annotate(name=Max(name), units=Sum("units"), revenue=Sum("revenue"))
+            .order_by("-revenue", "-units")[:top]
+        ]
+
+    return {
+        "days": days,
+        "totals": totals,
+        "products": best(DailyProductSales, "product_id", "product_name"),
+        "categories": best(DailyCategorySales, "category_id", "category_name"),
+        "sizes": best(DailySizeSales, "size_id", "size"),
+    }
@@ -0,0 +1,128 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F, FloatField, Value
+from django.db.models.expressions import RawSQL
+
+from api.models import Product
+
+# Full-text product search.
+#
+# PostgreSQL: Product.search_vector (tsvector, GIN indexed) holds the weighted
+#   name (A), category name (B) and description (C).
+# SQLite (USE_LOCAL): the FTS5 table below holds the same three columns with the
+#   product id as rowid.
+#
+# Both are kept up to date by the signals in api/signals.py and can be rebuilt
+# with `python manage.py rebuild_search_index`.
+
+FTS_TABLE = "api_product_fts"
+
+# bm25 weights for the FTS5 columns (name, category, description)
+FTS_WEIGHTS = (10.0, 5.0, 2.0)
+
+
+def _get_terms(keyword):
+    return re.findall(r"\w+", keyword.lower())
+
+
+def search_products(queryset, keyword):
+    """
+    Filter a product queryset by a keyword.
+
+    Every word of the keyword has to match (as a prefix) the name, the
+    description or the category name. Matches are annotated with `rank`,
+    higher is more relevant.
+    """
+    terms = _get_terms(keyword)
+    if not terms:
+        return queryset.none()
+
+    if connection.vendor == "postgresql":
+        query = SearchQuery(
+            " & ".join(f"{term}:*" for term in terms), search_type="raw", config="simple"
+        )
+        return queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F("search_vector"), query)
+        )
+
+    if connection.vendor == "sqlite":
+        match = " ".join('"%s"*' % term.replace('"', '""') for term in terms)
+        table = Product._meta.db_table
+        weights = ", ".join(str(weight) for weight in FTS_WEIGHTS)
+        return queryset.filter(
+            id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", (match,))
+        ).annotate(
+            # bm25() is lower for better matches
+            rank=RawSQL(
+                f"SELECT -bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s AND rowid = {table}.id",
+                (match,),
+                output_field=FloatField(),
+            )
+        )
+
+    return queryset.filter(name__icontains=keyword).annotate(
+        rank=Value(0.0, output_field=FloatField())
+    )
+
+
+def _id_filter(column, product_ids):
+    if product_ids is None:
+        return "", []
+    product_ids = list(product_ids)
+    return f" WHERE {column} IN ({', '.join(['%s'] * len(product_ids))})", product_ids
+
+
+def index_products(product_ids=None):
+    """
+    (Re)build the search entries of the given products, or of all products.
+    """
+    if product_ids is not None:
+        product_ids = [pk for pk in set(product_ids) if pk is not None]
+        if not product_ids:
+            return
+
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            where, params = _id_filter("p.id", product_ids)
+            cursor.execute(
+                "UPDATE api_product AS p SET search_vector = "
+                "setweight(to_tsvector('simple', coalesce(p.name, '')), 'A') || "
+                "setweight(to_tsvector('simple', coalesce("
+                "(SELECT c.name FROM api_category AS c WHERE c.id = p.category_id), '')), 'B') || "
+                "setweight(to_tsvector('simple', coalesce(p.description, '')), 'C')" + where,
+                params,
+            )
+        elif connection.vendor == "sqlite":
+            where, params = _id_filter("rowid", product_ids)
+            cursor.execute(f"DELETE FROM {FTS_TABLE}" + where, params)
+            where, params = _id_filter("p.id", product_ids)
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, name, category, description) "
+                "SELECT p.id, p.name, coalesce(c.name, ''), coalesce(p.description, '') "
+                "FROM api_product AS p LEFT JOIN api_category AS c ON c.id = p.category_id" + where,
+                params,
+            )
+
+
+def unindex_products(product_ids):
+    """
+    Remove deleted products from the index. The tsvector goes away with the row.
+    """
+    product_ids = [pk for pk in set(product_ids) if pk is not None]
+    if not product_ids or connection.vendor != "sqlite":
+        return
+
+    where, params = _id_filter("rowid", product_ids)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}" + where, params)
+
+
+def rebuild_search_index():
+    """
+    Rebuild the whole index, returns the number of indexed products.
+    """
+    index_products()
+    return Product.objects.count()
@@ -13,8 +13,20 @@ from .models import (
     ShippingAddress,
     Review,
     ActionLog,
+    StockHold,
 )
 
+# Base serializer that lets the caller pick a subset of fields
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+
 # Serializer for Review
 class ReviewSerializer(serializers.ModelSerializer):
     class Meta:
@@ -74,11 +86,37 @@ class MeshSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
+def image_srcset(image):
+    """
+    The URLs of an image by width: its variants and the original, when its
+    width is known.
+    """
+    storage = image.image.storage
+    srcset = {width: storage.url(name) for width, name in image.variants.items()}
+    if image.image and image.width:
+        srcset[str(image.width)] = image.image.url
+    return srcset
+
+
+def image_webp_srcset(image):
+    storage = image.image.storage
+    return {width: storage.url(name) for width, name in image.webp_variants.items()}
+
+
 # Serializer for ProductImage
 class ProductImageSerializer(serializers.ModelSerializer):
+    srcset = serializers.SerializerMethodField(read_only=True)
+    webp_srcset = serializers.SerializerMethodField(read_only=True)
+
     class Meta:
         model = ProductImage
-        fields = "__all__"
+        exclude = ["variants", "webp_variants"]
+
+    def get_srcset(self, obj):
+        return image_srcset(obj)
+
+    def get_webp_srcset(self, obj):
+        return image_webp_srcset(obj)
 
 
 # Serializer for Category
@@ -101,16 +139,59 @@ class ShoeSizeSerializer(serializers.ModelSerializer):
 
 
 # Serializer for Product
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(DynamicFieldsModelSerializer):
     images = ProductImageSerializer(many=True, read_only=True)
     meshes = MeshSerializer(many=True, read_only=True)
     category = CategorySerializer(read_only=True)
     sizes = ShoeSizeSerializer(many=True, read_only=True)
-    reviews = ReviewSerializer(many=True, read_only=True)
+    reviews = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = Product
-        fields = "__all__"
+        exclude = ["search_vector"]
+
+    def get_reviews(self, obj):
+        # The latest reviews only, num_reviews is the total
+        reviews = getattr(obj, "latest_reviews", None)
+        if reviews is None:
+            reviews = obj.reviews.order_by(*Review.NEWEST_FIRST)[: Product.EMBEDDED_REVIEWS]
+        return ReviewSerializer(reviews, many=True).data
+
+
+class CategorySummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Category
+        fields = ["id", "name"]
+
+
+# Slim Serializer for Product, enough to render a catalog grid
+class ProductSummarySerializer(DynamicFieldsModelSerializer):
+    image = serializers.SerializerMethodField(read_only=True)
+    srcset = serializers.SerializerMethodField(read_only=True)
+    webp_srcset = serializers.SerializerMethodField(read_only=True)
+    category = CategorySummarySerializer(read_only=True)
+
+    class Meta:
+        model = Product
+        fields = ["id", "name", "price", "rating", "num_reviews", "image", "srcset", "webp_srcset", "category"]
+
+    def get_image(self, obj):
+        images = obj.images.all()
+        if not images:
+            return None
+        return images[0].image.url
+
+    def get_srcset(self, obj):
+        images = obj.images.all()
+        if not images:
+            return {}
+        return image_srcset(images[0])
+
+    def get_webp_srcset(self, obj):
+        images = obj.images.all()
+        if not images:
+            return {}
+        return image_webp_srcset(images[0])
 
 
 
@@ -141,18 +222,46 @@ class OrderSerializer(serializers.ModelSerializer):
         return serializer.data
 
     def get_shippingAddress(self, obj):
-        address = obj.shipping_address
-        if address:
-            return ShippingAddressSerializer(address, many=False).data
-        else:
+        try:
+            address = obj.shipping_address
+        except ShippingAddress.DoesNotExist:
             return None
+        return ShippingAddressSerializer(address, many=False).data
 
     def get_user(self, obj):
         user = obj.user
         serializer = UserSerializer(user, many=False)
         return serializer.data
 
+# Slim Serializer for Order, without the items, address and user
+class OrderSummarySerializer(serializers.ModelSerializer):
+    num_items = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Order
+        fields = [
+            "id",
+            "total_price",
+            "payment_method",
+            "is_paid",
+            "paid_at",
+            "is_shipped",
+            "shipped_at",
+            "is_delivered",
+            "delivered_at",
+            "created_at",
+            "num_items",
+        ]
+
+
 class ActionLogSerializer(serializers.ModelSerializer):
     class Meta:
         model = ActionLog
-        fields = "__all__"
\ No newline at end of file
+        fields = "__all__"
+
+
+# Serializer for StockHold
+class StockHoldSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StockHold
+        fields = ["id", "product", "size", "quantity", "created_at", "expires_at"]
@@ -7,3 +7,109 @@
 #         user.username = user.email
 
 # pre_save.connect(updateUser, sender=User)
+
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+
+from api.models import Product, ProductImage, Mesh, Color, Review, Category, ShoeSize
+from api.cache import invalidate_products
+from api.search import index_products, unindex_products
+
+
+# Product cache and validators
+#
+# A change to a product invalidates its cached representation. A change to one
+# of its related rows also bumps Product.updated_at, which the ETag and
+# Last-Modified validators are built from (see api/conditional.py).
+
+
+def productsChanged(product_ids):
+    product_ids = [pk for pk in set(product_ids) if pk is not None]
+    if not product_ids:
+        return
+    Product.objects.filter(id__in=product_ids).touch()
+    invalidate_products(product_ids)
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidateProduct(sender, instance, **kwargs):
+    invalidate_products([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=ProductImage)
+@receiver([post_save, post_delete], sender=Mesh)
+@receiver([post_save, post_delete], sender=Review)
+def productChildChanged(sender, instance, **kwargs):
+    productsChanged([instance.product_id])
+
+
+@receiver([post_save, post_delete], sender=Color)
+def colorChanged(sender, instance, **kwargs):
+    productsChanged(Mesh.objects.filter(id=instance.mesh_id).values_list("product_id", flat=True))
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def categoryChanged(sender, instance, **kwargs):
+    # pre_delete: the products still point to the category at this point
+    productsChanged(instance.product_set.values_list("id", flat=True))
+
+
+@receiver(post_save, sender=ShoeSize)
+@receiver(pre_delete, sender=ShoeSize)
+def sizeChanged(sender, instance, **kwargs):
+    productsChanged(instance.products.values_list("id", flat=True))
+
+
+@receiver(m2m_changed, sender=Product.sizes.through)
+def productSizesChanged(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+
+    if not reverse:
+        productsChanged([instance.pk])
+    elif action == "pre_clear":
+        productsChanged(instance.products.values_list("id", flat=True))
+    else:
+        productsChanged(pk_set)
+
+
+# Image files
+#
+# Also sent for the images deleted with their product, the blob reference
+# counts stay exact.
+
+
+@receiver(post_delete, sender=ProductImage)
+def releaseImageFiles(sender, instance, **kwargs):
+    instance.release_files()
+
+
+# Search index maintenance
+
+
+@receiver(post_save, sender=Product)
+def indexProduct(sender, instance, **kwargs):
+    index_products([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def unindexProduct(sender, instance, **kwargs):
+    unindex_products([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def indexCategoryProducts(sender, instance, created, **kwargs):
+    if not created:
+        index_products(instance.product_set.values_list("id", flat=True))
+
+
+@receiver(pre_delete, sender=Category)
+def rememberCategoryProducts(sender, instance, **kwargs):
+    # The products lose their category before post_delete is sent
+    instance._search_product_ids = list(instance.product_set.values_list("id", flat=True))
+
+
+@receiver(post_delete, sender=Category)
+def reindexCategoryProducts(sender, instance, **kwargs):
+    index_products(getattr(instance, "_search_product_ids", []))
@@ -0,0 +1,46 @@
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from api.models import User, ActionLog
+import colorama
+
+
+class GetActionLogsTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.superuser = User.objects.create_superuser('admin', 'admin@example.com', 'admin123')
+        self.staff_user = User.objects.create_user('staff', 'staff@example.com', 'staff123', is_staff=True)
+
+        ActionLog.objects.bulk_create(
+            [ActionLog(user=self.superuser, action=f"Action {i}") for i in range(25)]
+        )
+
+    def test_get_action_logs(self):
+        self.client.force_authenticate(user=self.superuser)
+        response = self.client.get(reverse('actionlogs'), {'page': 2})
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()['actionLogs']), 10)
+        self.assertEqual(response.json()['pages'], 3)
+
+    def test_get_action_logs_not_superuser(self):
+        self.client.force_authenticate(user=self.staff_user)
+        response = self.client.get(reverse('actionlogs'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_cursor_pagination(self):
+        self.client.force_authenticate(user=self.superuser)
+
+        # A single query per page, no COUNT(*) and no OFFSET
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('actionlogs'), {'cursor': '', 'page_size': 20})
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(len(data['actionLogs']), 20)
+        self.assertEqual(data['actionLogs'][0]['action'], 'Action 24')
+
+        data = self.client.get(data['next']).json()
+        self.assertEqual([log['action'] for log in data['actionLogs']], [f'Action {i}' for i in range(4, -1, -1)])
+        self.assertIsNone(data['next'])
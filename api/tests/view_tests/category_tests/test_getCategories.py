@@ -39,4 +39,16 @@ class GetCategoriesTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data, [])  # Expecting an empty list
 
-    
\ No newline at end of file
+    def test_conditional_get(self):
+        response = self.client.get(reverse('categories'))
+        etag = response['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('categories'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        category = Category.objects.get(name="Boots")
+        category.name = "Hiking Boots"
+        category.save()
+        response = self.client.get(reverse('categories'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
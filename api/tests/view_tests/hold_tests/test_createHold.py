@@ -0,0 +1,130 @@
+from datetime import timedelta
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from api.models import User, Product, ProductSizeStock, ShoeSize, Order, StockHold
+import colorama
+import os
+
+class CreateHoldTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user('shopper', 'shopper@example.com', 'password123')
+        self.other_user = User.objects.create_user('other', 'other@example.com', 'password123')
+        self.product = Product.objects.create(name="Drop Sneaker", price=100.00, count_in_stock=5, visible=True)
+
+    def _hold(self, user, quantity, product=None):
+        self.client.force_authenticate(user=user)
+        return self.client.post(reverse('hold-create'), {'product': (product or self.product).id, 'quantity': quantity})
+
+    def _checkout(self, user, quantity):
+        self.client.force_authenticate(user=user)
+        order_data = {
+            "orderItems": [{"product": self.product.id, "name": self.product.name, "price": 100.00, "image": "image_url", "colors": {}}] * quantity,
+            "paymentMethod": "PayPal",
+            "taxPrice": 0,
+            "shippingPrice": 0,
+            "totalPrice": 100.00 * quantity,
+            "shippingAddress": {"address": "1 St", "city": "City", "postalCode": "1", "country": "Land"},
+        }
+        return self.client.post(reverse('orders-add'), order_data, format='json')
+
+    def test_create_hold(self):
+        response = self._hold(self.user, 2)
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['quantity'], 2)
+
+        # Holding again replaces the quantity
+        response = self._hold(self.user, 3)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(StockHold.objects.get().quantity, 3)
+
+    def test_hold_more_than_available(self):
+        self._hold(self.other_user, 4)
+        response = self._hold(self.user, 2)
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(StockHold.objects.filter(user=self.user).exists())
+
+    def test_hold_invalid_requests(self):
+        self.assertEqual(self._hold(self.user, 0).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self._hold(self.user, 'many').status_code, status.HTTP_400_BAD_REQUEST)
+        hidden = Product.objects.create(name="Hidden", price=10.00, count_in_stock=5, visible=False)
+        self.assertEqual(self._hold(self.user, 1, hidden).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_hold_unauthenticated(self):
+        response = self.client.post(reverse('hold-create'), {'product': self.product.id, 'quantity': 1})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_held_stock_is_reserved_at_checkout(self):
+        self._hold(self.other_user, 4)
+
+        response = self._checkout(self.user, 2)
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # The holder checks out their hold, which is converted into the order
+        response = self._checkout(self.other_user, 4)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(StockHold.objects.exists())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.count_in_stock, 1)
+
+        self.assertEqual(self._checkout(self.user, 1).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_expired_holds_are_ignored_and_swept(self):
+        self._hold(self.other_user, 5)
+        StockHold.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(self._hold(self.user, 2).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self._checkout(self.user, 2).status_code, status.HTTP_201_CREATED)
+
+        call_command('expire_stock_holds', '--batch-size', '1', stdout=open(os.devnull, 'w'))
+        self.assertFalse(StockHold.objects.exists())
+
+
+class CreateSizeHoldTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user('shopper', 'shopper@example.com', 'password123')
+        self.other_user = User.objects.create_user('other', 'other@example.com', 'password123')
+        self.product = Product.objects.create(name="Sized Drop", price=100.00, count_in_stock=3, visible=True)
+        self.size_40, created = ShoeSize.objects.get_or_create(size=40)
+        self.size_42, created = ShoeSize.objects.get_or_create(size=42)
+        ProductSizeStock.objects.create(product=self.product, size=self.size_40, count_in_stock=1)
+        ProductSizeStock.objects.create(product=self.product, size=self.size_42, count_in_stock=2)
+
+    def _hold(self, user, quantity, size=None):
+        self.client.force_authenticate(user=user)
+        data = {'product': self.product.id, 'quantity': quantity}
+        if size is not None:
+            data['size'] = size.id
+        return self.client.post(reverse('hold-create'), data)
+
+    def test_hold_per_size(self):
+        response = self._hold(self.user, 2, self.size_42)
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['size'], self.size_42.id)
+
+        # The held size is gone for others, the other size is not
+        self.assertEqual(self._hold(self.other_user, 1, self.size_42).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self._hold(self.other_user, 1, self.size_40).status_code, status.HTTP_201_CREATED)
+
+        # Holds of the same user on two sizes are separate
+        self.assertEqual(self._hold(self.user, 1, self.size_40).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(StockHold.objects.filter(user=self.user).count(), 1)
+
+    def test_hold_needs_a_stocked_size(self):
+        response = self._hold(self.user, 1)
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        size_44, created = ShoeSize.objects.get_or_create(size=44)
+        self.assertEqual(self._hold(self.user, 1, size_44).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(StockHold.objects.exists())
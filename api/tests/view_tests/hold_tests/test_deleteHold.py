@@ -0,0 +1,31 @@
+from datetime import timedelta
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from api.models import User, Product, StockHold
+import colorama
+
+class DeleteHoldTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user('shopper', 'shopper@example.com', 'password123')
+        self.other_user = User.objects.create_user('other', 'other@example.com', 'password123')
+        product = Product.objects.create(name="Drop Sneaker", price=100.00, count_in_stock=5, visible=True)
+        self.hold = StockHold.objects.create(
+            user=self.user, product=product, quantity=2, expires_at=timezone.now() + timedelta(minutes=10)
+        )
+
+    def test_delete_hold(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.delete(reverse('hold-delete', kwargs={'pk': self.hold.id}))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(StockHold.objects.exists())
+
+    def test_delete_hold_of_another_user(self):
+        self.client.force_authenticate(user=self.other_user)
+        response = self.client.delete(reverse('hold-delete', kwargs={'pk': self.hold.id}))
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertTrue(StockHold.objects.exists())
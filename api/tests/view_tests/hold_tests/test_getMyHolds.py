@@ -0,0 +1,31 @@
+from datetime import timedelta
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from api.models import User, Product, StockHold
+import colorama
+
+class GetMyHoldsTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user('shopper', 'shopper@example.com', 'password123')
+        self.other_user = User.objects.create_user('other', 'other@example.com', 'password123')
+        product = Product.objects.create(name="Drop Sneaker", price=100.00, count_in_stock=5, visible=True)
+        later = timezone.now() + timedelta(minutes=10)
+        self.hold = StockHold.objects.create(user=self.user, product=product, quantity=1, expires_at=later)
+        StockHold.objects.create(user=self.other_user, product=product, quantity=1, expires_at=later)
+        expired_product = Product.objects.create(name="Old Sneaker", price=100.00, count_in_stock=5, visible=True)
+        StockHold.objects.create(user=self.user, product=expired_product, quantity=1, expires_at=timezone.now())
+
+    def test_get_my_live_holds(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('holds'))
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([hold['id'] for hold in response.json()], [self.hold.id])
+
+    def test_get_holds_unauthenticated(self):
+        response = self.client.get(reverse('holds'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
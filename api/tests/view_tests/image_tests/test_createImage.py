@@ -5,7 +5,14 @@ from rest_framework import status
 from api.models import Product, ProductImage, User
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import override_settings
+from io import BytesIO, StringIO
+from PIL import Image
 import os
+import shutil
+import tempfile
 import colorama
 
 
@@ -80,3 +87,58 @@ class CreateImageTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
     
 
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class CreateImageVariantsTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin_user = User.objects.create_superuser("admin", "admin@example.com", "admin123")
+        self.client.force_authenticate(user=self.admin_user)
+        self.product = Product.objects.create(name="Test Product", price=10.99)
+
+    def tearDown(self):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+
+    def _png(self, width, height):
+        buffer = BytesIO()
+        Image.new("RGBA", (width, height), (255, 0, 0, 128)).save(buffer, format="PNG")
+        return SimpleUploadedFile(name="test_image.png", content=buffer.getvalue(), content_type="image/png")
+
+    def test_create_image_generates_variants(self):
+        response = self.client.post(reverse('image-create'), {"product_id": self.product.id, "image": self._png(600, 300)}, format='multipart')
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # Processed by a worker, not during the request
+        self.assertEqual(response.json()['status'], 'pending')
+        self.assertEqual(response.json()['srcset'], {})
+
+        call_command('process_image_jobs', '--once', stdout=StringIO())
+
+        image = ProductImage.objects.get(product=self.product)
+        self.assertEqual(image.status, ProductImage.READY)
+        self.assertEqual((image.width, image.height), (600, 300))
+        self.assertEqual(sorted(image.variants, key=int), ['160', '480'])
+        with default_storage.open(image.image.name) as f:
+            self.assertEqual(Image.open(f).format, "JPEG")
+        with default_storage.open(image.variants['160']) as f:
+            self.assertEqual(Image.open(f).size, (160, 80))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            image.delete()
+        self.assertFalse(default_storage.exists(image.image.name))
+        self.assertFalse(default_storage.exists(image.variants['480']))
+
+    def test_generate_missing_variants(self):
+        image = ProductImage(product=self.product, image=self._png(500, 500))
+        image.save()
+        call_command('process_image_jobs', '--once', stdout=StringIO())
+        ProductImage.objects.filter(id=image.id).update(width=None, height=None, variants={})
+
+        call_command('generate_image_variants', stdout=StringIO())
+        call_command('process_image_jobs', '--once', stdout=StringIO())
+
+        image.refresh_from_db()
+        self.assertEqual(image.width, 500)
+        self.assertEqual(list(image.variants), ['160', '480'])
+        self.assertTrue(default_storage.exists(image.variants['480']))
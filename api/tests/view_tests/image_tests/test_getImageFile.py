@@ -0,0 +1,69 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework.test import APIClient
+from rest_framework import status
+from api.jobs import run_image_jobs
+from api.models import Product, ProductImage, User
+from api.serializers import ProductImageSerializer
+from django.conf import settings
+from io import BytesIO
+from PIL import Image
+import shutil
+import tempfile
+import colorama
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class GetImageFileTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.product = Product.objects.create(name="Test Product", price=10.99, visible=True)
+
+        # Half transparent, the WebP encodings keep the alpha channel
+        buffer = BytesIO()
+        Image.new("RGBA", (600, 300), (255, 0, 0, 128)).save(buffer, format="PNG")
+        upload = SimpleUploadedFile(name="test_image.png", content=buffer.getvalue(), content_type="image/png")
+        ProductImage(product=self.product, image=upload).save()
+        run_image_jobs()
+        self.image = ProductImage.objects.get()
+
+    def tearDown(self):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+
+    def _get(self, accept, **params):
+        response = self.client.get(reverse('image-file', kwargs={'pk': self.image.id}), params, HTTP_ACCEPT=accept)
+        print(colorama.Fore.MAGENTA + "Response:", response.status_code, response.get('Location'))
+        return response
+
+    def test_webp_variants(self):
+        self.assertEqual(sorted(self.image.webp_variants, key=int), ['160', '480', '600'])
+        with default_storage.open(self.image.webp_variants['600']) as f:
+            img = Image.open(f)
+            self.assertEqual((img.format, img.mode), ('WEBP', 'RGBA'))
+        data = ProductImageSerializer(self.image).data
+        self.assertTrue(data['webp_srcset']['480'].endswith('_480w.webp'))
+        self.assertTrue(data['srcset']['480'].endswith('_480w.jpg'))
+
+    def test_negotiates_format(self):
+        response = self._get('image/avif,image/webp,*/*', width=300)
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertTrue(response['Location'].endswith('_480w.webp'))
+        self.assertIn('Accept', response['Vary'])
+
+        response = self._get('image/webp;q=0,image/*', width=300)
+        self.assertTrue(response['Location'].endswith('_480w.jpg'))
+
+        # Wider than every variant: the original
+        response = self._get('*/*', width=5000)
+        self.assertEqual(response['Location'], self.image.image.url)
+
+    def test_invalid_requests(self):
+        self.assertEqual(self._get('*/*', width='wide').status_code, status.HTTP_400_BAD_REQUEST)
+
+        Product.objects.filter(id=self.product.id).update(visible=False)
+        self.assertEqual(self._get('*/*').status_code, status.HTTP_404_NOT_FOUND)
+
+        response = self.client.get(reverse('image-file', kwargs={'pk': 999}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
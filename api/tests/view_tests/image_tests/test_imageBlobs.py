@@ -0,0 +1,130 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework.test import APIClient
+from rest_framework import status
+from api import images
+from api.jobs import run_image_jobs
+from api.models import Product, ProductImage, ImageBlob, ImageJob, User
+from django.conf import settings
+from io import BytesIO
+from PIL import Image
+from unittest import mock
+import hashlib
+import shutil
+import tempfile
+import colorama
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ImageBlobsTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin_user = User.objects.create_superuser("admin", "admin@example.com", "admin123")
+        self.client.force_authenticate(user=self.admin_user)
+        self.product1 = Product.objects.create(name="Product 1", price=10.99)
+        self.product2 = Product.objects.create(name="Product 2", price=10.99)
+        self.content = self._png((0, 128, 0))
+
+    def tearDown(self):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+
+    def _png(self, color):
+        buffer = BytesIO()
+        Image.new("RGB", (300, 200), color).save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    def _upload(self, product, content=None):
+        upload = SimpleUploadedFile(name="photo.png", content=content or self.content, content_type="image/png")
+        response = self.client.post(reverse('image-create'), {"product_id": product.id, "image": upload}, format='multipart')
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return ProductImage.objects.get(id=response.json()['id'])
+
+    def test_identical_uploads_share_a_blob(self):
+        image1 = self._upload(self.product1)
+        with mock.patch('api.models.build_variants', wraps=images.build_variants) as build:
+            run_image_jobs()
+        self.assertEqual(build.call_count, 1)
+
+        # Already stored and processed: no upload to the storage, no job
+        with mock.patch.object(default_storage, 'save', wraps=default_storage.save) as save:
+            image2 = self._upload(self.product2)
+        save.assert_not_called()
+        self.assertEqual(image2.status, ProductImage.READY)
+        self.assertFalse(ImageJob.objects.exists())
+
+        blob = ImageBlob.objects.get()
+        self.assertEqual(blob.sha256, hashlib.sha256(self.content).hexdigest())
+        self.assertEqual(blob.ref_count, 2)
+        image1.refresh_from_db()
+        self.assertEqual(image1.image.name, f"products/{blob.sha256}.jpg")
+        self.assertEqual(image2.image.name, image1.image.name)
+        self.assertEqual(image2.variants, image1.variants)
+
+    def test_pending_duplicates_are_processed_once(self):
+        self._upload(self.product1)
+        self._upload(self.product2)
+        with mock.patch('api.models.build_variants', wraps=images.build_variants) as build:
+            self.assertEqual(run_image_jobs(), (2, 0))
+        self.assertEqual(build.call_count, 1)
+        self.assertEqual(ProductImage.objects.filter(status=ProductImage.READY).count(), 2)
+
+    def test_concurrent_jobs_convert_a_blob_once(self):
+        # Both images were loaded while the blob was pending, like two workers
+        # picking the jobs at the same time
+        image1 = self._upload(self.product1)
+        image2 = self._upload(self.product2)
+        image1.blob, image2.blob
+        with mock.patch('api.models.build_variants', wraps=images.build_variants) as build:
+            image1.process()
+            image2.process()
+        self.assertEqual(build.call_count, 1)
+        image2.refresh_from_db()
+        self.assertEqual(image2.status, ProductImage.READY)
+        self.assertEqual(image2.variants, ImageBlob.objects.get().variants)
+
+    def test_delete_keeps_files_until_last_reference(self):
+        image1 = self._upload(self.product1)
+        self._upload(self.product2)
+        run_image_jobs()
+        blob = ImageBlob.objects.get()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(reverse('image-delete', kwargs={'pk': image1.id}))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertTrue(default_storage.exists(blob.name))
+        self.assertEqual(ImageBlob.objects.get().ref_count, 1)
+
+        # The last reference goes with its product
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product2.delete()
+        self.assertFalse(ImageBlob.objects.exists())
+        self.assertFalse(default_storage.exists(blob.name))
+        self.assertFalse(default_storage.exists(blob.webp_variants['300']))
+
+    def test_reupload_before_the_sweep_keeps_its_file(self):
+        image1 = self._upload(self.product1)
+        run_image_jobs()
+        # Deleted, the sweep of its blob has not run yet
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.delete(reverse('image-delete', kwargs={'pk': image1.id}))
+        self.assertEqual(ImageBlob.objects.get().ref_count, 0)
+
+        image2 = self._upload(self.product2)
+        for callback in callbacks:
+            callback()
+        blob = ImageBlob.objects.get()
+        self.assertEqual((blob.id, blob.ref_count), (image2.blob_id, 1))
+        self.assertTrue(default_storage.exists(blob.name))
+
+        # Processed again, the variants of the released blob may be gone
+        self.assertEqual(run_image_jobs(), (1, 0))
+        self.assertTrue(default_storage.exists(ImageBlob.objects.get().webp_variants['300']))
+
+    def test_different_content_gets_own_blob(self):
+        image1 = self._upload(self.product1)
+        image2 = self._upload(self.product1, self._png((0, 0, 128)))
+        self.assertNotEqual(image1.blob_id, image2.blob_id)
+        self.assertEqual(ImageJob.objects.count(), 2)
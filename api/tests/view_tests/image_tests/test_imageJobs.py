@@ -0,0 +1,84 @@
+from django.test import TestCase, override_settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from api.jobs import claim_image_job, run_image_job, run_image_jobs, IMAGE_JOB_MAX_ATTEMPTS
+from api.models import Product, ProductImage, ImageJob
+from datetime import timedelta
+from io import BytesIO
+from PIL import Image
+from unittest import mock
+import shutil
+import tempfile
+from django.conf import settings
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ImageJobsTest(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(name="Test Product", price=10.99)
+        buffer = BytesIO()
+        Image.new("RGB", (300, 200), (0, 0, 255)).save(buffer, format="PNG")
+        self.image = ProductImage(
+            product=self.product,
+            image=SimpleUploadedFile(name="test_image.png", content=buffer.getvalue(), content_type="image/png"),
+        )
+        self.image.save()
+
+    def tearDown(self):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+
+    def test_upload_is_queued(self):
+        self.assertEqual(self.image.status, ProductImage.PENDING)
+        self.assertEqual(ImageJob.objects.get().image_id, self.image.id)
+
+        self.assertEqual(run_image_jobs(), (1, 0))
+        self.image.refresh_from_db()
+        self.assertEqual(self.image.status, ProductImage.READY)
+        self.assertEqual(list(self.image.variants), ['160'])
+        self.assertFalse(ImageJob.objects.exists())
+
+    def test_claimed_job_is_not_claimed_twice(self):
+        job = claim_image_job()
+        self.assertEqual((job.status, job.attempts), (ImageJob.RUNNING, 1))
+        self.assertIsNone(claim_image_job())
+
+        # Until the lease of the worker that took it expires
+        ImageJob.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(claim_image_job().attempts, 2)
+
+    def test_failed_job_is_retried_then_given_up(self):
+        self.product.visible = True
+        self.product.save()
+        client = APIClient()
+        # Cached while the image is pending
+        response = client.get(reverse('product', kwargs={'pk': self.product.id}))
+        self.assertEqual(response.json()['images'][0]['status'], ProductImage.PENDING)
+        updated_at = Product.objects.get(id=self.product.id).updated_at
+
+        with mock.patch.object(ProductImage, 'process', side_effect=OSError("broken image")):
+            self.assertFalse(run_image_job(claim_image_job()))
+            job = ImageJob.objects.get()
+            self.assertEqual((job.status, job.last_error), (ImageJob.PENDING, "broken image"))
+            self.assertGreater(job.run_after, timezone.now())
+            # Backing off
+            self.assertIsNone(claim_image_job())
+
+            for _ in range(IMAGE_JOB_MAX_ATTEMPTS - 1):
+                ImageJob.objects.update(run_after=timezone.now())
+                run_image_job(claim_image_job())
+
+        self.assertEqual(ImageJob.objects.get().status, ImageJob.FAILED)
+        self.image.refresh_from_db()
+        self.assertEqual(self.image.status, ProductImage.FAILED)
+        # The product's cache and validators are refreshed
+        self.assertGreater(Product.objects.get(id=self.product.id).updated_at, updated_at)
+        response = client.get(reverse('product', kwargs={'pk': self.product.id}))
+        self.assertEqual(response.json()['images'][0]['status'], ProductImage.FAILED)
+
+    def test_new_upload_during_processing_is_not_lost(self):
+        job = claim_image_job()
+        ImageJob.enqueue(self.image.id)
+        run_image_job(job)
+        self.assertEqual(ImageJob.objects.get().status, ImageJob.PENDING)
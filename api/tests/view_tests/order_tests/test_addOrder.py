@@ -1,9 +1,14 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest.mock import patch
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APIClient
 from rest_framework import status
-from api.models import User, Product, ShoeSize, Order, ShippingAddress, OrderItem
+from api.models import User, Product, ProductQuerySet, ProductSizeStock, ShoeSize, StockHold, Order, ShippingAddress, OrderItem
 import colorama
+import threading
 
 class AddOrderTest(TestCase):
     def setUp(self):
@@ -118,3 +123,179 @@ class AddOrderTest(TestCase):
 
     
 
+
+    def _order_data(self, *products):
+        return {
+            "orderItems": [
+                {"product": product.id, "name": product.name, "price": product.price, "image": "image_url", "size": {"id": self.shoe_size.id}, "colors": {}}
+                for product in products
+            ],
+            "paymentMethod": "PayPal",
+            "taxPrice": 5.00,
+            "shippingPrice": 2.00,
+            "totalPrice": 37.00,
+            "shippingAddress": {
+                "address": "123 Test St",
+                "city": "Test City",
+                "postalCode": "12345",
+                "country": "Testland"
+            }
+        }
+
+    def test_add_order_decrements_stock(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(reverse('orders-add'), self._order_data(self.product1, self.product1, self.product2), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.product1.refresh_from_db()
+        self.product2.refresh_from_db()
+        self.assertEqual(self.product1.count_in_stock, 3)
+        self.assertEqual(self.product2.count_in_stock, 9)
+        self.assertEqual(OrderItem.objects.filter(order_id=response.json()['id']).count(), 3)
+
+    def test_add_order_nonexistent_size(self):
+        self.client.force_authenticate(user=self.user)
+        order_data = self._order_data(self.product1)
+        order_data["orderItems"][0]["size"] = {"id": 9999}
+        response = self.client.post(reverse('orders-add'), order_data, format='json')
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Order.objects.count(), 0)
+
+    def test_add_order_stock_taken_meanwhile(self):
+        # The stock check passes, then another checkout takes the last items
+        # before the decrement: nothing of the order must be kept
+        self.client.force_authenticate(user=self.user)
+        original_in_bulk = ProductQuerySet.in_bulk
+
+        def in_bulk_then_sell_out(queryset, *args, **kwargs):
+            products = original_in_bulk(queryset, *args, **kwargs)
+            Product.objects.filter(id=self.product2.id).update(count_in_stock=0)
+            return products
+
+        with patch.object(ProductQuerySet, 'in_bulk', in_bulk_then_sell_out):
+            response = self.client.post(reverse('orders-add'), self._order_data(self.product1, self.product2), format='json')
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.product1.refresh_from_db()
+        self.assertEqual(self.product1.count_in_stock, 5)
+        self.assertEqual(Order.objects.count(), 0)
+        self.assertEqual(OrderItem.objects.count(), 0)
+
+
+# SQLite has no row locks and answers parallel writers with "database is
+# locked", the test needs a database that serializes them on the rows
+@skipUnlessDBFeature('has_select_for_update')
+class AddOrderConcurrencyTest(TransactionTestCase):
+    def setUp(self):
+        self.product = Product.objects.create(name="Last Pairs", price=10.00, count_in_stock=3)
+        self.users = [
+            User.objects.create_user(f'buyer{i}', f'buyer{i}@example.com', 'password123') for i in range(8)
+        ]
+
+    def _checkout(self, user, barrier, results):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        order_data = {
+            "orderItems": [{"product": self.product.id, "name": self.product.name, "price": 10.00, "image": "image_url", "colors": {}}],
+            "paymentMethod": "PayPal",
+            "taxPrice": 0,
+            "shippingPrice": 0,
+            "totalPrice": 10.00,
+            "shippingAddress": {"address": "1 St", "city": "City", "postalCode": "1", "country": "Land"},
+        }
+        try:
+            barrier.wait()
+            response = client.post(reverse('orders-add'), order_data, format='json')
+            results.append((response.status_code, response.json()))
+        finally:
+            connection.close()
+
+    def test_parallel_checkouts_do_not_oversell(self):
+        barrier = threading.Barrier(len(self.users))
+        results = []
+        threads = [threading.Thread(target=self._checkout, args=(user, barrier, results)) for user in self.users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        print(colorama.Fore.MAGENTA + "Status codes:", [code for code, data in results])
+        sold = min(3, len(self.users))
+        created = [data for code, data in results if code == status.HTTP_201_CREATED]
+        rejected = [data for code, data in results if code == status.HTTP_400_BAD_REQUEST]
+        self.assertEqual(len(created), sold)
+        self.assertEqual(len(rejected), len(self.users) - sold)
+        for data in rejected:
+            self.assertIn("Insufficient stock", data['error'])
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.count_in_stock, 0)
+        self.assertEqual(OrderItem.objects.count(), sold)
+        self.assertEqual(Order.objects.count(), sold)
+
+
+class AddOrderSizeStockTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user('testuser', 'test@example.com', 'password123')
+        self.product = Product.objects.create(name="Sized Product", price=10.00, count_in_stock=3)
+        self.size_40, created = ShoeSize.objects.get_or_create(size=40)
+        self.size_42, created = ShoeSize.objects.get_or_create(size=42)
+        ProductSizeStock.objects.create(product=self.product, size=self.size_40, count_in_stock=1)
+        ProductSizeStock.objects.create(product=self.product, size=self.size_42, count_in_stock=2)
+
+    def _order(self, *sizes):
+        self.client.force_authenticate(user=self.user)
+        items = []
+        for size in sizes:
+            item = {"product": self.product.id, "name": self.product.name, "price": 10.00, "image": "image_url", "colors": {}}
+            if size is not None:
+                item["size"] = {"id": size.id}
+            items.append(item)
+        order_data = {
+            "orderItems": items,
+            "paymentMethod": "PayPal",
+            "taxPrice": 0,
+            "shippingPrice": 0,
+            "totalPrice": 10.00,
+            "shippingAddress": {"address": "1 St", "city": "City", "postalCode": "1", "country": "Land"},
+        }
+        return self.client.post(reverse('orders-add'), order_data, format='json')
+
+    def test_add_order_decrements_size_stock(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self._order(self.size_42, self.size_42, self.size_40)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            dict(ProductSizeStock.objects.values_list('size__size', 'count_in_stock')), {40: 0, 42: 0}
+        )
+        # The product total is refreshed from the sizes after the commit
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.count_in_stock, 0)
+
+    def test_add_order_respects_size_holds(self):
+        other_user = User.objects.create_user('other', 'other@example.com', 'password123')
+        StockHold.objects.create(
+            user=other_user, product=self.product, size=self.size_42, quantity=2,
+            expires_at=timezone.now() + timedelta(minutes=5),
+        )
+        response = self._order(self.size_42)
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # A hold on one size leaves the other sizes available
+        response = self._order(self.size_40)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_add_order_size_sold_out(self):
+        response = self._order(self.size_40, self.size_40)
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(ProductSizeStock.objects.get(size=self.size_40).count_in_stock, 1)
+
+    def test_add_order_without_size(self):
+        response = self._order(None)
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
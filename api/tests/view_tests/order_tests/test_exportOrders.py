@@ -0,0 +1,77 @@
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from api.models import User, Product, Order, OrderItem, ShippingAddress
+from io import StringIO
+import csv
+import json
+import colorama
+
+
+class ExportOrdersTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.superuser = User.objects.create_superuser('admin', 'admin@example.com', 'admin123')
+        self.user = User.objects.create_user('user', 'user@example.com', 'user123')
+        self.product = Product.objects.create(name='Shoe', price=50, count_in_stock=10)
+
+        self.orders = []
+        for i in range(3):
+            order = Order.objects.create(user=self.user, total_price=100.0, is_paid=i > 0)
+            ShippingAddress.objects.create(order=order, address="1 Test St", city="Test City", postal_code="12345", country="Testland")
+            OrderItem.objects.bulk_create(
+                [OrderItem(order=order, product=self.product, name='Shoe', price=50, colors={'laces': 'red'}) for _ in range(i)]
+            )
+            self.orders.append(order)
+
+    def _export(self, **params):
+        self.client.force_authenticate(user=self.superuser)
+        response = self.client.get(reverse('orders-export'), params)
+        content = b''.join(response.streaming_content).decode() if response.streaming else response.content.decode()
+        print(colorama.Fore.MAGENTA + "Response Data:", content)
+        return response, content
+
+    def test_export_csv(self):
+        response, content = self._export()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(StringIO(content)))
+        # One line for the order without items, then one per item
+        self.assertEqual([row['order_id'] for row in rows], [str(self.orders[0].id)] + [str(self.orders[1].id)] + [str(self.orders[2].id)] * 2)
+        self.assertEqual(rows[0]['item_id'], '')
+        self.assertEqual(rows[1]['email'], 'user@example.com')
+        self.assertEqual(json.loads(rows[1]['colors']), {'laces': 'red'})
+
+    def test_export_ndjson_filtered(self):
+        response, content = self._export(output='ndjson', paid='true')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        orders = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([order['order_id'] for order in orders], [self.orders[1].id, self.orders[2].id])
+        self.assertEqual(len(orders[1]['items']), 2)
+        self.assertEqual(orders[1]['city'], 'Test City')
+
+    def test_export_prefetches_per_chunk(self):
+        self.client.force_authenticate(user=self.superuser)
+        response = self.client.get(reverse('orders-export'), {'output': 'ndjson'})
+        # orders with user and address + items, for each chunk
+        with self.assertNumQueries(2):
+            lines = list(response.streaming_content)
+        self.assertEqual(len(lines), 3)
+
+    def test_export_invalid_params(self):
+        for params in ({'output': 'xml'}, {'paid': 'yes'}, {'created_from': 'yesterday'}):
+            response, content = self._export(**params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_not_superuser(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('orders-export'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_export_command(self):
+        out = StringIO()
+        call_command('export_orders', '--output', 'ndjson', '--paid', 'false', '--chunk-size', '1', stdout=out)
+        orders = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([order['order_id'] for order in orders], [self.orders[0].id])
@@ -1,8 +1,11 @@
+from datetime import datetime
 from django.test import TestCase
+from django.utils import timezone
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
-from api.models import User, Order, ShippingAddress
+from api.models import User, Product, Order, OrderItem, ShippingAddress
+from api.views.order_views import MY_ORDERS_LIMIT
 import colorama
 
 
@@ -66,3 +69,98 @@ class GetMyOrdersTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 1)
         self.assertNotIn(self.order1.id, [order["id"] for order in response.data])
+
+    def test_query_budget_is_constant(self):
+        product = Product.objects.create(name="Test Product", price=10.00)
+        for i in range(5):
+            order = Order.objects.create(user=self.user1, total_price=20.0)
+            ShippingAddress.objects.create(order=order, address=f"{i} Main St", city="City1", postal_code="12345", country="Country1")
+            OrderItem.objects.bulk_create([OrderItem(order=order, product=product, name=product.name, price=10.00) for _ in range(2)])
+
+        self.client.force_authenticate(user=self.user1)
+        # orders with user and shipping address + items
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("myorders"))
+        self.assertEqual(len(response.data), 7)
+
+    def test_get_my_orders_newest_first(self):
+        self.client.force_authenticate(user=self.user1)
+        response = self.client.get(reverse("myorders"))
+        self.assertEqual([order["id"] for order in response.data], [self.order2.id, self.order1.id])
+
+    def test_get_my_orders_cursor_pagination(self):
+        for i in range(12):
+            Order.objects.create(user=self.user1, total_price=10.0 * i)
+
+        self.client.force_authenticate(user=self.user1)
+        response = self.client.get(reverse("myorders"), {"cursor": "", "page_size": 5})
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ids = []
+        data = response.json()
+        while True:
+            self.assertLessEqual(len(data["orders"]), 5)
+            ids += [order["id"] for order in data["orders"]]
+            if data["next"] is None:
+                break
+            data = self.client.get(data["next"]).json()
+        self.assertEqual(ids, list(Order.objects.filter(user=self.user1).order_by("-created_at", "-id").values_list("id", flat=True)))
+
+        response = self.client.get(reverse("myorders"), {"cursor": "garbage"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_get_my_orders_is_capped(self):
+        Order.objects.bulk_create([Order(user=self.user1, total_price=10.0) for _ in range(MY_ORDERS_LIMIT)])
+
+        self.client.force_authenticate(user=self.user1)
+        response = self.client.get(reverse("myorders"), {"view": "summary"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), MY_ORDERS_LIMIT)
+        ids = [order["id"] for order in response.data]
+
+        # The rest is one cursor page away
+        next_link = response["Link"].split(";")[0].strip("<>")
+        data = self.client.get(next_link).json()
+        ids += [order["id"] for order in data["orders"]]
+        self.assertIsNone(data["next"])
+        self.assertEqual(ids, list(Order.objects.filter(user=self.user1).order_by("-created_at", "-id").values_list("id", flat=True)))
+
+        # Short histories have no Link header
+        self.client.force_authenticate(user=self.user2)
+        self.assertNotIn("Link", self.client.get(reverse("myorders")))
+
+    def test_get_my_orders_filters(self):
+        Order.objects.filter(id=self.order1.id).update(is_paid=True, created_at=timezone.make_aware(datetime(2024, 1, 10, 12, 0)))
+        Order.objects.filter(id=self.order2.id).update(created_at=timezone.make_aware(datetime(2024, 2, 10, 12, 0)))
+        self.client.force_authenticate(user=self.user1)
+
+        def ids(**params):
+            response = self.client.get(reverse("myorders"), params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return [order["id"] for order in response.data]
+
+        self.assertEqual(ids(paid="true"), [self.order1.id])
+        self.assertEqual(ids(paid="false"), [self.order2.id])
+        self.assertEqual(ids(shipped="true"), [])
+        self.assertEqual(ids(created_from="2024-02-01"), [self.order2.id])
+        self.assertEqual(ids(created_to="2024-01-10"), [self.order1.id])
+        self.assertEqual(ids(created_to="2024-01-10T11:00:00"), [])
+        self.assertEqual(ids(created_from="2024-01-01", created_to="2024-12-31", paid="false"), [self.order2.id])
+
+        for params in ({"paid": "yes"}, {"created_from": "last week"}, {"view": "compact"}):
+            response = self.client.get(reverse("myorders"), params)
+            print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_get_my_orders_summary(self):
+        product = Product.objects.create(name="Test Product", price=10.00)
+        OrderItem.objects.bulk_create([OrderItem(order=self.order1, product=product, name=product.name, price=10.00) for _ in range(3)])
+
+        self.client.force_authenticate(user=self.user1)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("myorders"), {"view": "summary"})
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        orders = {order["id"]: order for order in response.data}
+        self.assertEqual(orders[self.order1.id]["num_items"], 3)
+        self.assertEqual(orders[self.order2.id]["num_items"], 0)
+        self.assertNotIn("orderItems", orders[self.order1.id])
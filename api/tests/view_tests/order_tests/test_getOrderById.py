@@ -47,3 +47,12 @@ class GetOrderByIdTest(TestCase):
         print(colorama.Fore.MAGENTA + "Response Data:", response.json())
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
+
+    def test_get_order_without_shipping_address(self):
+        order = Order.objects.create(user=self.user1, total_price=50.0)
+        self.client.force_authenticate(user=self.user1)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('user-order', args=[order.id]))
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data['shippingAddress'])
@@ -2,11 +2,14 @@ from django.test import TestCase
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
-from api.models import User, Order, ShippingAddress
+from api.models import User, Product, Order, OrderItem, ShippingAddress
 import colorama
 
 
 class GetOrdersTest(TestCase):
+    # count + orders with user and shipping address + items
+    QUERY_BUDGET = 3
+
     def setUp(self):
         self.client = APIClient()
 
@@ -55,3 +58,74 @@ class GetOrdersTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.json()['orders']), 5)
 
+    def test_cursor_pagination_of_orders(self):
+        for i in range(10):
+            order = Order.objects.create(user=self.user, total_price=10.0 * i)
+            ShippingAddress.objects.create(order=order, address=f"{i} Test St", city="Test City", postal_code="12345", country="Testland")
+
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(reverse('orders'), {'cursor': '', 'page_size': 7})
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        first_page = response.json()
+        self.assertEqual(len(first_page['orders']), 7)
+
+        ids = [order['id'] for order in first_page['orders']]
+        self.assertEqual(ids, sorted(ids, reverse=True))
+
+        second_page = self.client.get(first_page['next']).json()
+        self.assertEqual(len(second_page['orders']), 5)
+        self.assertIsNone(second_page['next'])
+        self.assertIsNotNone(second_page['prev'])
+
+    def test_query_budget_is_constant(self):
+        product = Product.objects.create(name="Test Product", price=10.00)
+        for i in range(10):
+            user = User.objects.create_user(f'user{i}', f'user{i}@example.com', 'password123')
+            order = Order.objects.create(user=user, total_price=20.0)
+            ShippingAddress.objects.create(order=order, address=f"{i} Test St", city="Test City", postal_code="12345", country="Testland")
+            OrderItem.objects.bulk_create([OrderItem(order=order, product=product, name=product.name, price=10.00) for _ in range(2)])
+
+        self.client.force_authenticate(user=self.admin_user)
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            response = self.client.get(reverse('orders'), {'page': 1})
+        self.assertEqual(len(response.json()['orders']), 5)
+        self.assertEqual(len(response.json()['orders'][0]['orderItems']), 2)
+
+        with self.assertNumQueries(self.QUERY_BUDGET - 1):
+            response = self.client.get(reverse('orders'), {'cursor': '', 'page_size': 10})
+        self.assertEqual(len(response.json()['orders']), 10)
+
+    def test_filter_orders(self):
+        User.objects.filter(id=self.user.id).update(first_name='Jane Doe')
+        Order.objects.filter(user=self.user).update(is_paid=True, paid_at='2024-03-01T12:00:00Z')
+
+        self.client.force_authenticate(user=self.admin_user)
+        expected = {
+            'email': ('USER@example.com', 200.0),
+            'name': ('jane', 200.0),
+            'city': ('test city', 100.0),
+            'country': ('TESTLAND', None),
+            'paid': ('false', 100.0),
+            'paid_from': ('2024-03-01', 200.0),
+            'paid_to': ('2024-02-29', 'none'),
+            'min_total': ('150', 200.0),
+        }
+        for param, (value, total) in expected.items():
+            response = self.client.get(reverse('orders'), {param: value})
+            print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            totals = [float(order['total_price']) for order in response.json()['orders']]
+            if total is None:
+                self.assertEqual(len(totals), 2)
+            elif total == 'none':
+                self.assertEqual(totals, [])
+            else:
+                self.assertEqual(totals, [total])
+
+    def test_filter_orders_invalid(self):
+        self.client.force_authenticate(user=self.admin_user)
+        for params in ({'min_total': 'a lot'}, {'min_total': 'NaN'}, {'paid_from': 'March'}, {'shipped': 'yes'}):
+            response = self.client.get(reverse('orders'), params)
+            print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
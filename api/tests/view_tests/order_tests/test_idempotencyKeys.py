@@ -0,0 +1,112 @@
+from datetime import timedelta
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from api.models import User, Product, ShoeSize, Order, OrderItem, ShippingAddress, IdempotencyKey
+import colorama
+import os
+
+class IdempotencyKeysTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user('testuser', 'test@example.com', 'password123')
+        self.other_user = User.objects.create_user('otheruser', 'other@example.com', 'password123')
+        self.product = Product.objects.create(name="Test Product", price=10.00, count_in_stock=5)
+        size, created = ShoeSize.objects.get_or_create(size=42)
+        self.order_data = {
+            "orderItems": [
+                {"product": self.product.id, "name": "Test Product", "price": 10.00, "image": "image_url", "size": {"id": size.id}, "colors": {}}
+            ],
+            "paymentMethod": "PayPal",
+            "taxPrice": 0,
+            "shippingPrice": 0,
+            "totalPrice": 10.00,
+            "shippingAddress": {"address": "123 Test St", "city": "Test City", "postalCode": "12345", "country": "Testland"},
+        }
+
+    def _add_order(self, key, data=None):
+        return self.client.post(reverse('orders-add'), data or self.order_data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retried_checkout_is_replayed(self):
+        self.client.force_authenticate(user=self.user)
+        first = self._add_order('checkout-1')
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+
+        with CaptureQueriesContext(connection) as queries:
+            retry = self._add_order('checkout-1')
+        # The replay only touches the key table
+        self.assertFalse([query for query in queries if 'api_product' in query['sql'] or 'api_order' in query['sql']])
+        print(colorama.Fore.MAGENTA + "Response Data:", retry.json())
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.count_in_stock, 4)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(OrderItem.objects.count(), 1)
+
+    def test_new_key_creates_new_order(self):
+        self.client.force_authenticate(user=self.user)
+        self._add_order('checkout-1')
+        self._add_order('checkout-2')
+        self.client.post(reverse('orders-add'), self.order_data, format='json')
+        self.assertEqual(Order.objects.count(), 3)
+
+    def test_keys_are_per_user(self):
+        self.client.force_authenticate(user=self.user)
+        self._add_order('checkout-1')
+        self.client.force_authenticate(user=self.other_user)
+        response = self._add_order('checkout-1')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['user']['id'], self.other_user.id)
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_key_reused_for_another_request(self):
+        self.client.force_authenticate(user=self.user)
+        self._add_order('checkout-1')
+        data = dict(self.order_data, totalPrice=20.00)
+        response = self._add_order('checkout-1', data)
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_client_errors_are_replayed(self):
+        self.client.force_authenticate(user=self.user)
+        data = dict(self.order_data, orderItems=[])
+        self.assertEqual(self._add_order('checkout-1', data).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self._add_order('checkout-1', data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response['Idempotent-Replayed'], 'true')
+
+    def test_expired_key_runs_again(self):
+        self.client.force_authenticate(user=self.user)
+        self._add_order('checkout-1')
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        response = self._add_order('checkout-1')
+        self.assertFalse(response.has_header('Idempotent-Replayed'))
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_retried_payment_is_replayed(self):
+        order = Order.objects.create(user=self.user, total_price=10.00)
+        ShippingAddress.objects.create(order=order, address="123 Test St", city="Test City", postal_code="12345", country="Testland")
+        self.client.force_authenticate(user=self.user)
+
+        first = self.client.put(reverse('pay', kwargs={'pk': order.id}), HTTP_IDEMPOTENCY_KEY='pay-1')
+        retry = self.client.put(reverse('pay', kwargs={'pk': order.id}), HTTP_IDEMPOTENCY_KEY='pay-1')
+        self.assertEqual(retry.status_code, status.HTTP_200_OK)
+        self.assertEqual(retry.json()['paid_at'], first.json()['paid_at'])
+
+    def test_purge_idempotency_keys(self):
+        self.client.force_authenticate(user=self.user)
+        self._add_order('checkout-1')
+        self._add_order('checkout-2')
+        IdempotencyKey.objects.filter(key='checkout-1').update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        call_command('purge_idempotency_keys', stdout=open(os.devnull, 'w'))
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['checkout-2'])
@@ -0,0 +1,54 @@
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from api.models import User, Order, ActionLog
+import colorama
+
+class UpdateOrdersStatusTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'admin123')
+        self.user = User.objects.create_user('user', 'user@example.com', 'user123')
+        self.orders = [Order.objects.create(user=self.user, total_price=10.0 * i) for i in range(4)]
+        Order.objects.filter(id=self.orders[0].id).update(is_shipped=True)
+
+    def _update(self, ids, state):
+        return self.client.put(reverse('orders-status'), {'ids': ids, 'state': state}, format='json')
+
+    def test_bulk_mark_shipped(self):
+        self.client.force_authenticate(user=self.admin_user)
+        ids = [order.id for order in self.orders] + [999]
+        # lock/read + update + action logs, plus the transaction
+        with self.assertNumQueries(5):
+            response = self._update(ids, 'shipped')
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [result['result'] for result in response.json()['results']],
+            ['unchanged', 'updated', 'updated', 'updated', 'not_found'],
+        )
+
+        self.assertEqual(Order.objects.filter(is_shipped=True, shipped_at__isnull=False).count(), 3)
+        self.assertEqual(Order.objects.filter(is_shipped=True).count(), 4)
+        self.assertEqual(ActionLog.objects.count(), 3)
+
+    def test_bulk_reset_delivered(self):
+        Order.objects.update(is_delivered=True)
+        self.client.force_authenticate(user=self.admin_user)
+        response = self._update([self.orders[1].id, self.orders[2].id], 'undelivered')
+        self.assertEqual([result['result'] for result in response.json()['results']], ['updated', 'updated'])
+        self.assertEqual(Order.objects.filter(is_delivered=False, delivered_at__isnull=True).count(), 2)
+
+    def test_bulk_invalid_requests(self):
+        self.client.force_authenticate(user=self.admin_user)
+        for ids, state in (([self.orders[0].id], 'lost'), ([], 'shipped'), (['a'], 'shipped'), (list(range(1, 202)), 'shipped')):
+            response = self._update(ids, state)
+            print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_not_admin(self):
+        self.client.force_authenticate(user=self.user)
+        response = self._update([self.orders[1].id], 'shipped')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(Order.objects.get(id=self.orders[1].id).is_shipped)
@@ -1,9 +1,11 @@
+from django.core.management import call_command
 from django.test import TestCase
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 from api.models import User, Product, Review
 import colorama
+import os
 
 class CreateProductReviewTest(TestCase):
     def setUp(self):
@@ -53,3 +55,63 @@ class CreateProductReviewTest(TestCase):
         response = self.client.post(reverse('create-review', kwargs={'pk': self.product.id}), data)
         print(colorama.Fore.MAGENTA + "Response Data:", response.json())
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_review_with_out_of_range_rating(self):
+        self.client.force_authenticate(user=self.user)
+        for rating in (6, -1, "abc"):
+            data = {"rating": rating, "comment": "Off the scale"}
+            response = self.client.post(reverse('create-review', kwargs={'pk': self.product.id}), data)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Review.objects.exists())
+
+    def test_review_updates_aggregates(self):
+        other_user = User.objects.create_user('otheruser', 'other@example.com', 'password123')
+        for user, rating in ((self.user, 5), (other_user, 2)):
+            self.client.force_authenticate(user=user)
+            data = {"rating": rating, "comment": "Comment"}
+            response = self.client.post(reverse('create-review', kwargs={'pk': self.product.id}), data)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.json()['num_reviews'], 2)
+        self.assertEqual(response.json()['rating'], "3.50")
+        self.assertEqual(len(response.json()['reviews']), 2)
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.rating_sum, 7)
+        self.assertEqual(
+            [getattr(self.product, f"stars_{star}") for star in Product.RATING_STARS],
+            [0, 1, 0, 0, 1],
+        )
+
+    def test_duplicate_review_keeps_aggregates(self):
+        self.client.force_authenticate(user=self.user)
+        data = {"rating": 4, "comment": "First"}
+        self.client.post(reverse('create-review', kwargs={'pk': self.product.id}), data)
+        data = {"rating": 1, "comment": "Second"}
+        response = self.client.post(reverse('create-review', kwargs={'pk': self.product.id}), data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.num_reviews, 1)
+        self.assertEqual(self.product.rating_sum, 4)
+        self.assertEqual(self.product.stars_1, 0)
+
+    def test_recompute_ratings(self):
+        other_user = User.objects.create_user('otheruser', 'other@example.com', 'password123')
+        # Created without the view, the aggregates are out of date
+        Review.objects.create(user=self.user, product=self.product, rating=3, comment="Ok")
+        Review.objects.create(user=other_user, product=self.product, rating=4, comment="Good")
+        empty_product = Product.objects.create(name="No Reviews", price=10.00, num_reviews=3, rating=2)
+
+        call_command('recompute_ratings', stdout=open(os.devnull, 'w'))
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.num_reviews, 2)
+        self.assertEqual(self.product.rating_sum, 7)
+        self.assertEqual(str(self.product.rating), "3.50")
+        self.assertEqual((self.product.stars_3, self.product.stars_4), (1, 1))
+
+        empty_product.refresh_from_db()
+        self.assertEqual(empty_product.num_reviews, 0)
+        self.assertEqual(empty_product.rating, 0)
@@ -41,3 +41,29 @@ class DeleteProductReviewTest(TestCase):
         response = self.client.delete(reverse('delete-review', kwargs={'pk': 999, 'review_id': self.review.id}))
         print(colorama.Fore.MAGENTA + "Response Data:", response.json())
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_delete_review_updates_aggregates(self):
+        self.review.delete()
+        for user, rating in ((self.user, 4), (self.another_user, 1)):
+            self.client.force_authenticate(user=user)
+            data = {"rating": rating, "comment": "Comment"}
+            self.client.post(reverse('create-review', kwargs={'pk': self.product.id}), data)
+        review = Review.objects.get(user=self.another_user)
+
+        self.client.force_authenticate(user=self.another_user)
+        response = self.client.delete(reverse('delete-review', kwargs={'pk': self.product.id, 'review_id': review.id}))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.num_reviews, 1)
+        self.assertEqual(self.product.rating_sum, 4)
+        self.assertEqual(str(self.product.rating), "4.00")
+        self.assertEqual((self.product.stars_1, self.product.stars_4), (0, 1))
+
+    def test_delete_review_of_another_product(self):
+        other_product = Product.objects.create(name="Other Product", price=10.00)
+        self.client.force_authenticate(user=self.user)
+        response = self.client.delete(reverse('delete-review', kwargs={'pk': other_product.id, 'review_id': self.review.id}))
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertTrue(Review.objects.filter(id=self.review.id).exists())
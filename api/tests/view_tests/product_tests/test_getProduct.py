@@ -2,10 +2,13 @@ from django.test import TestCase
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
-from api.models import User, Product
+from api.models import User, Product, ProductImage, Mesh, Color, ShoeSize, Review
 import colorama
 
 class GetProductTest(TestCase):
+    # validators + product with category + images, meshes, colors, sizes, reviews
+    QUERY_BUDGET = 7
+
     def setUp(self):
         self.client = APIClient()
         self.staff_user = User.objects.create_user('staffuser', 'staff@example.com', 'password123', is_staff=True)
@@ -40,3 +43,68 @@ class GetProductTest(TestCase):
         response = self.client.get(reverse('product', kwargs={'pk': 999}))
         print(colorama.Fore.MAGENTA + "Response Data:", response.json())
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_query_budget_is_constant(self):
+        ProductImage.objects.bulk_create(
+            [ProductImage(product=self.visible_product, image=f"products/{i}.jpg") for i in range(3)]
+        )
+        for m in range(5):
+            mesh = Mesh.objects.create(product=self.visible_product, name=f"mesh {m}")
+            Color.objects.bulk_create(
+                [Color(mesh=mesh, color_name=f"color {c}", hex_code="#000000") for c in range(5)]
+            )
+        size, created = ShoeSize.objects.get_or_create(size=42)
+        self.visible_product.sizes.add(size)
+        Review.objects.create(product=self.visible_product, user=self.regular_user, rating=5, comment="Great")
+
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            response = self.client.get(reverse('product', kwargs={'pk': self.visible_product.id}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()['meshes']), 5)
+
+    def test_get_product_summary_and_fields(self):
+        response = self.client.get(reverse('product', kwargs={'pk': self.visible_product.id}), {'view': 'summary'})
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.json()['image'])
+        self.assertNotIn('meshes', response.json())
+
+        response = self.client.get(reverse('product', kwargs={'pk': self.visible_product.id}), {'fields': 'name,count_in_stock'})
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.json(), {'name': 'Visible Product', 'count_in_stock': 10})
+
+        response = self.client.get(reverse('product', kwargs={'pk': self.hidden_product.id}), {'view': 'summary'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_conditional_get(self):
+        url = reverse('product', kwargs={'pk': self.visible_product.id})
+        response = self.client.get(url)
+        etag = response['ETag']
+        last_modified = response['Last-Modified']
+
+        # Served from the validators alone
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # A related change bumps the product's validators
+        Review.objects.create(product=self.visible_product, user=self.regular_user, rating=3, comment="Ok")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.json()['reviews']), 1)
+
+    def test_conditional_get_varies_by_staff(self):
+        url = reverse('product', kwargs={'pk': self.visible_product.id})
+        etag = self.client.get(url)['ETag']
+
+        self.client.force_authenticate(user=self.staff_user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(reverse('product', kwargs={'pk': self.hidden_product.id}), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
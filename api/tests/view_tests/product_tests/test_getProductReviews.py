@@ -0,0 +1,109 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from api.models import User, Product, Review
+import colorama
+
+class GetProductReviewsTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.staff_user = User.objects.create_user('staffuser', 'staff@example.com', 'password123', is_staff=True)
+        self.product = Product.objects.create(name="Reviewed Product", price=30.00, visible=True)
+        self.hidden_product = Product.objects.create(name="Hidden Product", price=40.00, visible=False)
+
+        self.ratings = [3, 5, 1, 4, 2, 5, 3]
+        for i, rating in enumerate(self.ratings):
+            user = User.objects.create_user(f'user{i}', f'user{i}@example.com', 'password123')
+            Review.objects.create(product=self.product, user=user, rating=rating, comment=f"Review {i}")
+        Product.objects.recompute_ratings()
+
+    def _get_all(self, **params):
+        url = reverse('product-reviews', kwargs={'pk': self.product.id})
+        response = self.client.get(url, {'page_size': 3, **params})
+        reviews = []
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            data = response.json()
+            self.assertLessEqual(len(data['reviews']), 3)
+            reviews += data['reviews']
+            if data['next'] is None:
+                return reviews, data
+            response = self.client.get(data['next'])
+
+    def test_get_reviews_newest_first(self):
+        reviews, data = self._get_all()
+        print(colorama.Fore.MAGENTA + "Response Data:", data)
+        self.assertEqual(data['count'], len(self.ratings))
+        self.assertEqual([review['comment'] for review in reviews], [f"Review {i}" for i in reversed(range(len(self.ratings)))])
+
+    def test_get_reviews_sorted_by_rating(self):
+        reviews, data = self._get_all(sort='highest')
+        self.assertEqual([review['rating'] for review in reviews], sorted(self.ratings, reverse=True))
+
+        reviews, data = self._get_all(sort='lowest')
+        self.assertEqual([review['rating'] for review in reviews], sorted(self.ratings))
+        self.assertEqual(len({review['id'] for review in reviews}), len(self.ratings))
+
+    def test_get_reviews_path(self):
+        response = self.client.get(f'/api/products/{self.product.id}/reviews/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['count'], len(self.ratings))
+
+    def test_get_reviews_pages_by_keyset(self):
+        # Every review has the same rating, the cursor keys on (rating, created_at, id)
+        Review.objects.filter(product=self.product).update(rating=5)
+        url = reverse('product-reviews', kwargs={'pk': self.product.id})
+        first = self.client.get(url, {'sort': 'highest', 'page_size': 3}).json()
+
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(first['next']).json()
+        sql = queries.captured_queries[-1]['sql']
+        self.assertNotIn('OFFSET', sql)
+        self.assertIn('"api_review"."id" <', sql)
+
+        third = self.client.get(second['next']).json()
+        ids = [review['id'] for page in (first, second, third) for review in page['reviews']]
+        self.assertEqual(len(ids), len(self.ratings))
+        self.assertEqual(len(set(ids)), len(self.ratings))
+        self.assertIsNone(third['next'])
+
+        # And back
+        previous = self.client.get(third['prev']).json()
+        self.assertEqual(previous['reviews'], second['reviews'])
+        previous = self.client.get(previous['prev']).json()
+        self.assertEqual(previous['reviews'], first['reviews'])
+        self.assertIsNone(previous['prev'])
+
+    def test_get_reviews_invalid_sort(self):
+        response = self.client.get(reverse('product-reviews', kwargs={'pk': self.product.id}), {'sort': 'oldest'})
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_get_reviews_invalid_cursor(self):
+        response = self.client.get(reverse('product-reviews', kwargs={'pk': self.product.id}), {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_get_reviews_hidden_or_missing_product(self):
+        response = self.client.get(reverse('product-reviews', kwargs={'pk': self.hidden_product.id}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(reverse('product-reviews', kwargs={'pk': 999}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        self.client.force_authenticate(user=self.staff_user)
+        response = self.client.get(reverse('product-reviews', kwargs={'pk': self.hidden_product.id}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['reviews'], [])
+
+    def test_product_embeds_latest_reviews_only(self):
+        response = self.client.get(reverse('product', kwargs={'pk': self.product.id}))
+        data = response.json()
+        self.assertEqual(data['num_reviews'], len(self.ratings))
+        self.assertEqual(len(data['reviews']), Product.EMBEDDED_REVIEWS)
+        self.assertEqual(data['reviews'][0]['comment'], f"Review {len(self.ratings) - 1}")
+
+        response = self.client.get(reverse('products'))
+        product = response.json()['products'][0]
+        self.assertEqual(len(product['reviews']), Product.EMBEDDED_REVIEWS)
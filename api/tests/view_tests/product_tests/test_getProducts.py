@@ -1,11 +1,16 @@
+from django.core.management import call_command
 from django.test import TestCase
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
-from api.models import User, Product, Category
+from api.models import User, Product, Category, ProductImage, Mesh, Color, ShoeSize, Review
 import colorama
+import os
 
 class GetProductsTest(TestCase):
+    # count + products + images, meshes, colors, sizes, reviews
+    QUERY_BUDGET = 7
+
     def setUp(self):
         self.client = APIClient()
         Product.objects.all().delete()
@@ -100,3 +105,266 @@ class GetProductsTest(TestCase):
         print(colorama.Fore.MAGENTA + "Response Data:", response.json())
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.json()['products']), 0)
+
+    def _create_detailed_product(self, index, meshes=3, colors=4):
+        product = Product.objects.create(name=f"Detailed {index}", price=20.00, visible=True)
+        # bulk_create skips ProductImage.save, which expects a real file on disk
+        ProductImage.objects.bulk_create(
+            [ProductImage(product=product, image=f"products/{index}-{i}.jpg") for i in range(2)]
+        )
+        for m in range(meshes):
+            mesh = Mesh.objects.create(product=product, name=f"mesh {m}")
+            Color.objects.bulk_create(
+                [Color(mesh=mesh, color_name=f"color {c}", hex_code="#000000") for c in range(colors)]
+            )
+        size, created = ShoeSize.objects.get_or_create(size=40 + index)
+        product.sizes.add(size)
+        Review.objects.create(product=product, user=self.regular_user, rating=4, comment="Nice")
+        return product
+
+    def test_query_budget_is_constant(self):
+        Product.objects.all().delete()
+        self._create_detailed_product(0, meshes=1, colors=1)
+
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            response = self.client.get(reverse('products'))
+        self.assertEqual(len(response.json()['products']), 1)
+
+        for i in range(1, 6):
+            self._create_detailed_product(i)
+
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            response = self.client.get(reverse('products'))
+        products = response.json()['products']
+        self.assertEqual(len(products), 4)
+        self.assertEqual(len(products[1]['meshes']), 3)
+        self.assertEqual(len(products[1]['meshes'][0]['colors']), 4)
+
+    def test_summary_view(self):
+        Product.objects.all().delete()
+        category = Category.objects.create(name="Sneakers")
+        product = self._create_detailed_product(0)
+        product.category = category
+        product.save()
+
+        # count + products + images
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('products'), {'view': 'summary'})
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        item = response.json()['products'][0]
+        self.assertEqual(set(item), {'id', 'name', 'price', 'rating', 'num_reviews', 'image', 'srcset', 'webp_srcset', 'category'})
+        self.assertEqual(item['category'], {'id': category.id, 'name': 'Sneakers'})
+        self.assertTrue(item['image'].endswith('products/0-0.jpg'))
+
+    def test_sparse_fields(self):
+        Product.objects.all().delete()
+        self._create_detailed_product(0)
+
+        # count + products, no relation is prefetched
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('products'), {'fields': 'id,name,price'})
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.json()['products'][0]), {'id', 'name', 'price'})
+
+        response = self.client.get(reverse('products'), {'fields': 'id,meshes'})
+        self.assertEqual(set(response.json()['products'][0]), {'id', 'meshes'})
+        self.assertEqual(len(response.json()['products'][0]['meshes']), 3)
+
+    def test_unknown_view_or_fields(self):
+        response = self.client.get(reverse('products'), {'view': 'tiny'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(reverse('products'), {'fields': 'id,password'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cursor_pagination(self):
+        for i in range(10):
+            self._create_detailed_product(i, meshes=1, colors=1)
+
+        self.client.force_authenticate(user=self.regular_user)
+
+        # Same plan as page mode minus the COUNT(*)
+        with self.assertNumQueries(self.QUERY_BUDGET - 1):
+            response = self.client.get(reverse('products'), {'cursor': ''})
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertNotIn('pages', data)
+        self.assertEqual(len(data['products']), 4)
+        self.assertIsNone(data['prev'])
+
+        seen = [p['id'] for p in data['products']]
+        next_link = data['next']
+        while next_link:
+            data = self.client.get(next_link).json()
+            seen.extend(p['id'] for p in data['products'])
+            next_link = data['next']
+
+        expected = list(Product.objects.filter(visible=True).order_by('id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_cursor_page_size_is_capped(self):
+        response = self.client.get(reverse('products'), {'cursor': '', 'page_size': 1})
+        self.assertEqual(len(response.json()['products']), 1)
+
+        response = self.client.get(reverse('products'), {'cursor': '', 'page_size': 100000})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('products'), {'cursor': 'not-a-cursor'})
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_keyword_search_description_and_category(self):
+        category = Category.objects.create(name="Hiking")
+        Product.objects.create(name="Trail Runner", description="Waterproof leather upper", price=90.00, visible=True)
+        Product.objects.create(name="Mountain Boot", category=category, price=120.00, visible=True)
+
+        response = self.client.get(reverse('products'), {'keyword': 'waterproof'})
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual([p['name'] for p in response.json()['products']], ['Trail Runner'])
+
+        response = self.client.get(reverse('products'), {'keyword': 'hik'})
+        self.assertEqual([p['name'] for p in response.json()['products']], ['Mountain Boot'])
+
+        # Every word has to match
+        response = self.client.get(reverse('products'), {'keyword': 'mountain waterproof'})
+        self.assertEqual(response.json()['products'], [])
+
+    def test_keyword_search_ranks_name_matches_first(self):
+        Product.objects.create(name="Classic Sneaker", description="Suede", price=50.00, visible=True)
+        Product.objects.create(name="Suede Loafer", description="Not a sneaker", price=70.00, visible=True)
+
+        response = self.client.get(reverse('products'), {'keyword': 'suede'})
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual([p['name'] for p in response.json()['products']], ['Suede Loafer', 'Classic Sneaker'])
+
+    def test_keyword_search_follows_category_rename(self):
+        category = Category.objects.create(name="Winter")
+        Product.objects.create(name="Snow Boot", category=category, price=80.00, visible=True)
+
+        category.name = "Arctic"
+        category.save()
+
+        self.assertEqual(len(self.client.get(reverse('products'), {'keyword': 'arctic'}).json()['products']), 1)
+        self.assertEqual(len(self.client.get(reverse('products'), {'keyword': 'winter'}).json()['products']), 0)
+
+    def test_keyword_search_respects_visibility(self):
+        response = self.client.get(reverse('products'), {'keyword': 'hidden'})
+        self.assertEqual(response.json()['products'], [])
+
+        self.client.force_authenticate(user=self.staff_user)
+        response = self.client.get(reverse('products'), {'keyword': 'hidden'})
+        self.assertEqual([p['name'] for p in response.json()['products']], ['Hidden Product'])
+
+    def test_rebuild_search_index_command(self):
+        Product.objects.filter(id=self.visible_product.id).update(name="Renamed Without Signals")
+        self.assertEqual(len(self.client.get(reverse('products'), {'keyword': 'renamed'}).json()['products']), 0)
+
+        call_command('rebuild_search_index', stdout=open(os.devnull, 'w'))
+        self.assertEqual(len(self.client.get(reverse('products'), {'keyword': 'renamed'}).json()['products']), 1)
+
+    def _create_faceted_catalog(self):
+        Product.objects.all().delete()
+        boots = Category.objects.create(name="Boots")
+        sneakers = Category.objects.create(name="Sneakers")
+        size_40, created = ShoeSize.objects.get_or_create(size=40)
+        size_42, created = ShoeSize.objects.get_or_create(size=42)
+
+        catalog = [
+            ("Boot A", boots, 40.00, 4.5, [size_40, size_42], ["black", "brown"]),
+            ("Boot B", boots, 120.00, 3.0, [size_42], ["black"]),
+            ("Sneaker A", sneakers, 80.00, 5.0, [size_40], ["white"]),
+            ("Sneaker B", sneakers, 250.00, None, [], ["white", "black"]),
+        ]
+        for name, category, price, rating, sizes, colors in catalog:
+            product = Product.objects.create(name=name, category=category, price=price, rating=rating, visible=True)
+            product.sizes.add(*sizes)
+            mesh = Mesh.objects.create(product=product, name="upper")
+            for color in colors:
+                Color.objects.create(mesh=mesh, color_name=color, hex_code="#000000")
+        return boots, sneakers, size_40, size_42
+
+    def test_faceted_filters(self):
+        boots, sneakers, size_40, size_42 = self._create_faceted_catalog()
+
+        def names(params):
+            response = self.client.get(reverse('products'), params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return sorted(p['name'] for p in response.json()['products'])
+
+        self.assertEqual(names({'price_min': 50, 'price_max': 150}), ['Boot B', 'Sneaker A'])
+        self.assertEqual(names({'rating_min': 4}), ['Boot A', 'Sneaker A'])
+        self.assertEqual(names({'sizes': f'{size_40.id}'}), ['Boot A', 'Sneaker A'])
+        self.assertEqual(names({'sizes': f'{size_40.id},{size_42.id}'}), ['Boot A', 'Boot B', 'Sneaker A'])
+        self.assertEqual(names({'colors': 'brown,white'}), ['Boot A', 'Sneaker A', 'Sneaker B'])
+        self.assertEqual(names({'colors': 'black', 'category_id': sneakers.id}), ['Sneaker B'])
+
+    def test_facet_counts(self):
+        boots, sneakers, size_40, size_42 = self._create_faceted_catalog()
+
+        # count + products + 5 relations + 4 facet aggregates
+        with self.assertNumQueries(self.QUERY_BUDGET + 4):
+            response = self.client.get(reverse('products'), {'facets': 'true', 'colors': 'black'})
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        facets = response.json()['facets']
+
+        self.assertEqual(
+            facets['sizes'],
+            [{'id': size_40.id, 'size': 40, 'count': 1}, {'id': size_42.id, 'size': 42, 'count': 2}],
+        )
+        self.assertEqual(
+            facets['colors'],
+            [{'color_name': 'black', 'count': 3}, {'color_name': 'brown', 'count': 1}, {'color_name': 'white', 'count': 1}],
+        )
+        self.assertEqual(
+            facets['categories'],
+            [{'id': boots.id, 'name': 'Boots', 'count': 2}, {'id': sneakers.id, 'name': 'Sneakers', 'count': 1}],
+        )
+        self.assertEqual([bucket['count'] for bucket in facets['prices']], [1, 0, 1, 0, 1])
+
+    def test_facets_are_opt_in(self):
+        response = self.client.get(reverse('products'))
+        self.assertNotIn('facets', response.json())
+
+    def test_invalid_filter_values(self):
+        response = self.client.get(reverse('products'), {'price_min': 'cheap'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        for value in ('NaN', 'Infinity', '-inf'):
+            response = self.client.get(reverse('products'), {'price_min': value})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(reverse('products'), {'sizes': 'large'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_conditional_get(self):
+        response = self.client.get(reverse('products'))
+        etag = response['ETag']
+
+        # One aggregate query instead of a full render
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('products'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Another page or filter is another representation
+        response = self.client.get(reverse('products'), {'page': 2}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        Product.objects.create(name="New Product", price=10.00, visible=True)
+        response = self.client.get(reverse('products'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # Changing a color of a listed product invalidates the page
+        etag = response['ETag']
+        mesh = Mesh.objects.create(product=self.visible_product, name="upper")
+        response = self.client.get(reverse('products'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        etag = response['ETag']
+        Color.objects.create(mesh=mesh, color_name="red", hex_code="#ff0000")
+        response = self.client.get(reverse('products'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
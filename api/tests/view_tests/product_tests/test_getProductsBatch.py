@@ -0,0 +1,72 @@
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from api.models import User, Product, ProductImage, Mesh, Color, ShoeSize, Review
+from api.views.product_views import MAX_BATCH_IDS
+import colorama
+
+class GetProductsBatchTest(TestCase):
+    # products with category + images, meshes, colors, sizes, reviews
+    QUERY_BUDGET = 6
+
+    def setUp(self):
+        self.client = APIClient()
+        self.staff_user = User.objects.create_user('staffuser', 'staff@example.com', 'password123', is_staff=True)
+        self.user = User.objects.create_user('user', 'user@example.com', 'password123')
+        self.products = [
+            Product.objects.create(name=f"Product {i}", price=10 + i, visible=True) for i in range(4)
+        ]
+        self.hidden_product = Product.objects.create(name="Hidden Product", price=40.00, visible=False)
+
+    def _ids(self, *ids):
+        return ','.join(str(pk) for pk in ids)
+
+    def test_batch_keeps_requested_order(self):
+        ids = [self.products[2].id, self.products[0].id, self.products[3].id]
+        response = self.client.get(reverse('products-batch'), {'ids': self._ids(*ids)})
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([product['id'] for product in response.json()['products']], ids)
+        self.assertEqual(response.json()['missing'], [])
+
+    def test_batch_reports_missing_ids(self):
+        ids = [self.products[1].id, 999, self.hidden_product.id, self.products[1].id]
+        response = self.client.get(reverse('products-batch'), {'ids': self._ids(*ids)})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([product['id'] for product in response.json()['products']], [self.products[1].id])
+        self.assertEqual(response.json()['missing'], [999, self.hidden_product.id])
+
+        self.client.force_authenticate(user=self.staff_user)
+        response = self.client.get(reverse('products-batch'), {'ids': self._ids(*ids)})
+        self.assertEqual(response.json()['missing'], [999])
+
+    def test_batch_summary_view(self):
+        response = self.client.get(
+            reverse('products-batch'), {'ids': self._ids(self.products[0].id), 'view': 'summary'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('description', response.json()['products'][0])
+
+    def test_batch_invalid_ids(self):
+        for ids in ('', 'a,b', self._ids(*range(1, MAX_BATCH_IDS + 2))):
+            response = self.client.get(reverse('products-batch'), {'ids': ids})
+            print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_query_budget_is_constant(self):
+        size, created = ShoeSize.objects.get_or_create(size=42)
+        ProductImage.objects.bulk_create(
+            [ProductImage(product=product, image="products/image.jpg") for product in self.products]
+        )
+        for product in self.products:
+            mesh = Mesh.objects.create(product=product, name="sole")
+            Color.objects.create(mesh=mesh, color_name="black", hex_code="#000000")
+            product.sizes.add(size)
+            Review.objects.create(product=product, user=self.user, rating=4, comment="Good")
+
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            response = self.client.get(
+                reverse('products-batch'), {'ids': self._ids(*(product.id for product in self.products))}
+            )
+        self.assertEqual(len(response.json()['products']), len(self.products))
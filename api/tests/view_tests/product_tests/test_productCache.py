@@ -0,0 +1,88 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from api.models import User, Product, Category, Mesh, Color, ShoeSize, Review
+import colorama
+
+
+class ProductCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.superuser = User.objects.create_superuser('admin', 'admin@example.com', 'admin123')
+        self.staff_user = User.objects.create_user('staffuser', 'staff@example.com', 'password123', is_staff=True)
+        self.category = Category.objects.create(name="Boots")
+        self.product = Product.objects.create(name="Cached Product", price=30.00, category=self.category, visible=True)
+        self.mesh = Mesh.objects.create(product=self.product, name="sole")
+        self.color = Color.objects.create(mesh=self.mesh, color_name="black", hex_code="#000000")
+
+    def get_product(self):
+        return self.client.get(reverse('product', kwargs={'pk': self.product.id}))
+
+    def test_second_request_is_served_from_cache(self):
+        self.get_product()
+        with self.assertNumQueries(0):
+            response = self.get_product()
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['name'], 'Cached Product')
+
+    def test_staff_and_public_are_cached_separately(self):
+        self.product.visible = False
+        self.product.save()
+
+        self.client.force_authenticate(user=self.staff_user)
+        self.assertEqual(self.get_product().status_code, status.HTTP_200_OK)
+
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.get_product().status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_invalidated_by_related_changes(self):
+        self.get_product()
+
+        self.color.color_name = "white"
+        self.color.save()
+        self.assertEqual(self.get_product().json()['meshes'][0]['colors'][0]['color_name'], 'white')
+
+        self.category.name = "Sandals"
+        self.category.save()
+        self.assertEqual(self.get_product().json()['category']['name'], 'Sandals')
+
+        size, created = ShoeSize.objects.get_or_create(size=44)
+        self.product.sizes.add(size)
+        self.assertEqual(len(self.get_product().json()['sizes']), 1)
+
+        self.product.sizes.clear()
+        self.assertEqual(len(self.get_product().json()['sizes']), 0)
+
+        Review.objects.create(product=self.product, user=self.superuser, rating=5, comment="Great")
+        self.assertEqual(len(self.get_product().json()['reviews']), 1)
+
+        self.mesh.delete()
+        self.assertEqual(self.get_product().json()['meshes'], [])
+
+        self.category.delete()
+        self.assertIsNone(self.get_product().json()['category'])
+
+    def test_cache_stats(self):
+        self.get_product()
+        self.get_product()
+        self.get_product()
+
+        self.client.force_authenticate(user=self.superuser)
+        response = self.client.get(reverse('product-cache-stats'))
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['hits'], 2)
+        self.assertEqual(response.json()['misses'], 1)
+
+        response = self.client.delete(reverse('product-cache-stats'))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.client.get(reverse('product-cache-stats')).json()['hits'], 0)
+
+    def test_cache_stats_requires_superuser(self):
+        self.client.force_authenticate(user=self.staff_user)
+        response = self.client.get(reverse('product-cache-stats'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -2,7 +2,7 @@ from django.test import TestCase
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
-from api.models import User, Product, Category
+from api.models import User, Product, ProductSizeStock, ShoeSize, Category
 import colorama
 
 class UpdateProductTest(TestCase):
@@ -40,6 +40,24 @@ class UpdateProductTest(TestCase):
         self.product.refresh_from_db()
         self.assertEqual(self.product.price, data['price'])
 
+    def test_update_sized_product_stock(self):
+        size, created = ShoeSize.objects.get_or_create(size=42)
+        ProductSizeStock.objects.create(product=self.product, size=size, count_in_stock=4)
+        self.client.force_authenticate(user=self.admin_user)
+
+        response = self.client.put(reverse('product-update', kwargs={'pk': self.product.id}), {"count_in_stock": 50})
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Other fields can be updated, the stock is recomputed from the sizes
+        response = self.client.put(
+            reverse('product-update', kwargs={'pk': self.product.id}), {"price": 40.00, "count_in_stock": 10}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['count_in_stock'], 4)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.count_in_stock, 4)
+
     def test_update_product_with_invalid_category(self):
         self.client.force_authenticate(user=self.admin_user)
         data = {"category": "999"}
@@ -0,0 +1,128 @@
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from api.models import User, Product, Category, ShoeSize, Order, OrderItem, ShippingAddress, DailySales, DailyProductSales, DailyCategorySales
+from decimal import Decimal
+from io import StringIO
+import colorama
+
+class GetSalesReportTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.superuser = User.objects.create_superuser('admin', 'admin@example.com', 'admin123')
+        self.user = User.objects.create_user('user', 'user@example.com', 'user123')
+
+        self.category = Category.objects.create(name='Running')
+        self.size = ShoeSize.objects.get_or_create(size=42)[0]
+        self.product1 = Product.objects.create(name='Shoe 1', price=50, count_in_stock=10, category=self.category)
+        self.product2 = Product.objects.create(name='Shoe 2', price=30, count_in_stock=10)
+
+        self.order1 = self._order([(self.product1, 50), (self.product1, 50), (self.product2, 30)], 130)
+        self.order2 = self._order([(self.product2, 30)], 30)
+
+    def _order(self, items, total):
+        order = Order.objects.create(user=self.user, total_price=total)
+        ShippingAddress.objects.create(order=order, address="1 Test St", city="Test City", postal_code="12345", country="Testland")
+        OrderItem.objects.bulk_create(
+            [OrderItem(order=order, product=product, price=price, size=self.size) for product, price in items]
+        )
+        return order
+
+    def _pay(self, order):
+        self.client.force_authenticate(user=self.user)
+        return self.client.put(reverse('pay', kwargs={'pk': order.id}))
+
+    def _report(self, **params):
+        self.client.force_authenticate(user=self.superuser)
+        return self.client.get(reverse('reports-sales'), params)
+
+    def test_paying_updates_rollups_once(self):
+        self._pay(self.order1)
+        self._pay(self.order1)
+        self._pay(self.order2)
+
+        today = DailySales.objects.get(day=timezone.localdate())
+        self.assertEqual(today.paid_orders, 2)
+        self.assertEqual(today.revenue, Decimal('160.00'))
+        self.assertEqual(today.units, 4)
+        self.assertEqual(DailyProductSales.objects.get(product_id=self.product1.id).revenue, Decimal('100.00'))
+        self.assertEqual(DailyProductSales.objects.get(product_id=self.product2.id).units, 2)
+
+    def test_report_reads_rollups(self):
+        self._pay(self.order1)
+        self._pay(self.order2)
+
+        # days, totals, products, categories, sizes
+        with self.assertNumQueries(5):
+            response = self._report(top=1)
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data['totals']['paid_orders'], 2)
+        self.assertEqual(Decimal(data['totals']['revenue']), Decimal('160.00'))
+        self.assertEqual(len(data['days']), 1)
+        self.assertEqual(data['products'], [{'id': self.product1.id, 'name': 'Shoe 1', 'units': 2, 'revenue': '100.00'}])
+        self.assertEqual(data['sizes'][0]['name'], 42)
+
+    def test_backfill_matches_incremental(self):
+        self._pay(self.order1)
+        self._pay(self.order2)
+        # Orders created without going through the API are not counted yet
+        incremental = list(DailySales.objects.values('paid_orders', 'revenue', 'units'))
+        incremental_products = sorted(DailyProductSales.objects.values_list('product_id', 'product_name', 'units', 'revenue'))
+        incremental_categories = sorted(DailyCategorySales.objects.values_list('category_id', 'category_name', 'units', 'revenue'))
+
+        DailySales.objects.all().delete()
+        call_command('backfill_sales_rollups', '--chunk-days', '1', stdout=StringIO())
+
+        self.assertEqual(list(DailySales.objects.values('paid_orders', 'revenue', 'units')), incremental)
+        self.assertEqual(DailySales.objects.get().orders, 2)
+        self.assertEqual(sorted(DailyProductSales.objects.values_list('product_id', 'product_name', 'units', 'revenue')), incremental_products)
+        self.assertEqual(
+            sorted(DailyCategorySales.objects.values_list('category_id', 'category_name', 'units', 'revenue')),
+            incremental_categories,
+        )
+
+    def test_category_rollups_without_null_keys(self):
+        # product2 has no category, its orders land on the one NO_CATEGORY row
+        self._pay(self.order1)
+        self._pay(self.order2)
+        self.assertEqual(
+            sorted(DailyCategorySales.objects.values_list('category_id', 'category_name', 'units')),
+            [(DailyCategorySales.NO_CATEGORY, '', 2), (self.category.id, 'Running', 2)],
+        )
+
+        # A deleted category keeps its own row instead of merging with NO_CATEGORY
+        category_id = self.category.id
+        self.category.delete()
+        categories = self._report().json()['categories']
+        print(colorama.Fore.MAGENTA + "Response Data:", categories)
+        self.assertEqual(
+            sorted((row['id'] or 0, row['name'], row['units']) for row in categories),
+            [(0, None, 2), (category_id, 'Running', 2)],
+        )
+
+    def test_product_rollups_outlive_the_product(self):
+        self._pay(self.order1)
+        self._pay(self.order2)
+        product_id = self.product1.id
+        self.product1.delete()
+
+        data = self._report(top=1).json()
+        print(colorama.Fore.MAGENTA + "Response Data:", data)
+        self.assertEqual(Decimal(data['totals']['revenue']), Decimal('160.00'))
+        self.assertEqual(data['products'], [{'id': product_id, 'name': 'Shoe 1', 'units': 2, 'revenue': '100.00'}])
+
+    def test_report_invalid_range(self):
+        for params in ({'from': 'yesterday'}, {'from': '2024-02-01', 'to': '2024-01-01'}, {'from': '2020-01-01', 'to': '2024-01-01'}, {'top': 'x'}):
+            response = self._report(**params)
+            print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_report_not_superuser(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('reports-sales'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -31,3 +31,21 @@ class GetSizesTest(TestCase):
         sizes = response.json()
         self.assertEqual(len(sizes), 0)
 
+    def test_conditional_get(self):
+        etag = self.client.get(reverse('sizes'))['ETag']
+
+        response = self.client.get(reverse('sizes'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        ShoeSize.objects.filter(size=42).update(size=43)
+        response = self.client.get(reverse('sizes'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_conditional_get_size_swap(self):
+        # Changes keeping the count, the last id and the sum of sizes the same
+        etag = self.client.get(reverse('sizes'))['ETag']
+
+        ShoeSize.objects.filter(size=40).update(size=39)
+        ShoeSize.objects.filter(size=42).update(size=43)
+        response = self.client.get(reverse('sizes'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
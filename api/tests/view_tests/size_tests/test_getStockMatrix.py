@@ -0,0 +1,70 @@
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from datetime import timedelta
+from django.utils import timezone
+from api.models import User, Product, ShoeSize, ProductSizeStock, StockHold
+import colorama
+
+class GetStockMatrixTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.staff_user = User.objects.create_user('staff', 'staff@example.com', 'password123', is_staff=True)
+        self.user = User.objects.create_user('buyer', 'buyer@example.com', 'password123')
+        size_40, created = ShoeSize.objects.get_or_create(size=40)
+        size_42, created = ShoeSize.objects.get_or_create(size=42)
+        self.size_42 = size_42
+        self.products = [Product.objects.create(name=f"Product {i}", price=50.00, visible=True) for i in range(3)]
+        self.hidden_product = Product.objects.create(name="Hidden", price=50.00, visible=False)
+        for product in self.products[:2] + [self.hidden_product]:
+            ProductSizeStock.objects.create(product=product, size=size_42, count_in_stock=2)
+            ProductSizeStock.objects.create(product=product, size=size_40, count_in_stock=0)
+
+    def _ids(self, *products):
+        return ','.join(str(product.id) for product in products)
+
+    def test_get_stock_matrix(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('sizes-stock'), {'products': self._ids(*self.products, self.hidden_product)})
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        stock = response.json()['stock']
+        self.assertEqual([entry['product'] for entry in stock], [product.id for product in self.products] + [self.hidden_product.id])
+        self.assertEqual([(size['size'], size['available']) for size in stock[0]['sizes']], [(40, False), (42, True)])
+        self.assertNotIn('count_in_stock', stock[0]['sizes'][0])
+        # Not stocked per size, and hidden
+        self.assertEqual(stock[2]['sizes'], [])
+        self.assertEqual(stock[3]['sizes'], [])
+
+    def test_get_stock_matrix_with_holds(self):
+        product = self.products[0]
+        StockHold.objects.create(user=self.user, product=product, size=self.size_42, quantity=2, expires_at=timezone.now() + timedelta(minutes=10))
+        other = User.objects.create_user('other', 'other@example.com', 'password123')
+
+        # Held by another user
+        self.client.force_authenticate(user=other)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('sizes-stock'), {'products': self._ids(product)})
+        self.assertEqual([size['available'] for size in response.json()['stock'][0]['sizes']], [False, False])
+
+        # The user's own hold leaves the size available to them
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('sizes-stock'), {'products': self._ids(product)})
+        self.assertEqual([size['available'] for size in response.json()['stock'][0]['sizes']], [False, True])
+
+        # Expired holds are ignored
+        StockHold.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+        self.client.force_authenticate(user=other)
+        response = self.client.get(reverse('sizes-stock'), {'products': self._ids(product)})
+        self.assertEqual([size['available'] for size in response.json()['stock'][0]['sizes']], [False, True])
+
+    def test_get_stock_matrix_as_staff(self):
+        self.client.force_authenticate(user=self.staff_user)
+        response = self.client.get(reverse('sizes-stock'), {'products': self._ids(self.hidden_product)})
+        self.assertEqual([size['count_in_stock'] for size in response.json()['stock'][0]['sizes']], [0, 2])
+
+    def test_get_stock_matrix_invalid_ids(self):
+        for products in ('', 'a', ','.join(str(i) for i in range(1, 102))):
+            response = self.client.get(reverse('sizes-stock'), {'products': products})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,59 @@
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from api.models import User, Product, ShoeSize, ProductSizeStock, ActionLog
+import colorama
+
+class UpdateSizeStockTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user('user', 'user@example.com', 'password123')
+        self.admin_user = User.objects.create_user('admin', 'admin@example.com', 'password123', is_staff=True)
+        self.product = Product.objects.create(name="Sized Product", price=50.00, count_in_stock=99)
+        self.size_40, created = ShoeSize.objects.get_or_create(size=40)
+        self.size_42, created = ShoeSize.objects.get_or_create(size=42)
+
+    def _update(self, stock):
+        return self.client.put(reverse('sizes-stock-update'), {'stock': stock}, format='json')
+
+    def test_update_size_stock(self):
+        self.client.force_authenticate(user=self.admin_user)
+        response = self._update([
+            {'product': self.product.id, 'size': self.size_40.id, 'count_in_stock': 3},
+            {'product': self.product.id, 'size': self.size_42.id, 'count_in_stock': 0},
+        ])
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        sizes = response.json()['stock'][0]['sizes']
+        self.assertEqual([(size['size'], size['count_in_stock'], size['available']) for size in sizes], [(40, 3, True), (42, 0, False)])
+
+        # The product stock is the sum of its sizes
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.count_in_stock, 3)
+        self.assertTrue(ActionLog.objects.exists())
+
+        # Upserting again updates the existing rows
+        self._update([{'product': self.product.id, 'size': self.size_42.id, 'count_in_stock': 7}])
+        self.assertEqual(ProductSizeStock.objects.count(), 2)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.count_in_stock, 10)
+
+    def test_update_size_stock_invalid_rows(self):
+        self.client.force_authenticate(user=self.admin_user)
+        for stock in (
+            [],
+            [{'product': self.product.id, 'size': self.size_40.id}],
+            [{'product': self.product.id, 'size': self.size_40.id, 'count_in_stock': -1}],
+            [{'product': 999, 'size': self.size_40.id, 'count_in_stock': 1}],
+            [{'product': self.product.id, 'size': 999, 'count_in_stock': 1}],
+        ):
+            response = self._update(stock)
+            print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(ProductSizeStock.objects.exists())
+
+    def test_update_size_stock_not_admin(self):
+        self.client.force_authenticate(user=self.user)
+        response = self._update([{'product': self.product.id, 'size': self.size_40.id, 'count_in_stock': 3}])
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,62 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from api.models import Product, User
+from api.uploads import read_token
+from unittest import mock
+import colorama
+
+
+class CreateUploadUrlTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'admin123')
+        self.user = User.objects.create_user('user', 'user@example.com', 'user123')
+        self.client.force_authenticate(user=self.admin_user)
+        self.product = Product.objects.create(name="Test Product", price=10.99)
+
+    def _create(self, **data):
+        response = self.client.post(reverse('upload-create'), data, format='json')
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        return response
+
+    def test_local_upload_target(self):
+        response = self._create(kind='image', product_id=self.product.id, content_type='image/png')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        data = response.json()
+        self.assertEqual(data['upload']['method'], 'PUT')
+        self.assertIn('/api/uploads/local/', data['upload']['url'])
+        upload = read_token(data['token'], user=self.admin_user)
+        self.assertEqual((upload['kind'], upload['product']), ('image', self.product.id))
+        self.assertTrue(upload['key'].startswith('uploads/images/') and upload['key'].endswith('.png'))
+
+    @override_settings(USE_LOCAL=False)
+    def test_s3_presigned_post(self):
+        client = mock.Mock()
+        client.generate_presigned_post.return_value = {'url': 'https://bucket.s3.amazonaws.com/', 'fields': {'key': 'k'}}
+        storage = mock.Mock(bucket_name='bucket')
+        storage.connection.meta.client = client
+        with mock.patch('api.uploads.default_storage', storage):
+            response = self._create(kind='model', product_id=self.product.id, content_type='model/gltf-binary')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['upload'], {'method': 'POST', 'url': 'https://bucket.s3.amazonaws.com/', 'fields': {'key': 'k'}})
+        kwargs = client.generate_presigned_post.call_args.kwargs
+        self.assertEqual(kwargs['Bucket'], 'bucket')
+        self.assertTrue(kwargs['Key'].startswith('uploads/models/') and kwargs['Key'].endswith('.glb'))
+        self.assertIn(['content-length-range', 1, 50 * 1024 * 1024], kwargs['Conditions'])
+
+    def test_invalid_requests(self):
+        for data in (
+            {'kind': 'video', 'product_id': self.product.id, 'content_type': 'video/mp4'},
+            {'kind': 'image', 'product_id': self.product.id, 'content_type': 'image/gif'},
+            {'kind': 'model', 'product_id': self.product.id, 'content_type': 'image/png'},
+        ):
+            self.assertEqual(self._create(**data).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self._create(kind='image', product_id=999, content_type='image/png').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_not_superuser(self):
+        self.client.force_authenticate(user=self.user)
+        response = self._create(kind='image', product_id=self.product.id, content_type='image/png')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
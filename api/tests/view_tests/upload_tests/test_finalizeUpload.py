@@ -0,0 +1,178 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework.test import APIClient
+from rest_framework import status
+from api.models import Product, ProductImage, ImageBlob, Mesh, MeshJob, User
+from api.jobs import run_image_jobs, run_mesh_jobs
+from api.uploads import read_token, read_header, copy_object
+from django.conf import settings
+from io import BytesIO
+from PIL import Image
+from unittest import mock
+import hashlib
+import os
+import shutil
+import tempfile
+import colorama
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class FinalizeUploadTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'admin123')
+        self.client.force_authenticate(user=self.admin_user)
+        self.product = Product.objects.create(name="Test Product", price=10.99)
+
+        buffer = BytesIO()
+        Image.new("RGB", (200, 100), (0, 128, 0)).save(buffer, format="PNG")
+        self.png = buffer.getvalue()
+
+    def tearDown(self):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+
+    def _presign(self, kind, content_type):
+        response = self.client.post(reverse('upload-create'), {'kind': kind, 'product_id': self.product.id, 'content_type': content_type}, format='json')
+        return response.json()
+
+    def _put(self, target, content, content_type=None):
+        client = APIClient()
+        return client.generic('PUT', target['url'], content, content_type=content_type or target['headers']['Content-Type'])
+
+    def _finalize(self, token):
+        response = self.client.post(reverse('upload-finalize'), {'token': token}, format='json')
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        return response
+
+    def test_image_upload(self):
+        upload = self._presign('image', 'image/png')
+        self.assertEqual(self._put(upload['upload'], self.png).status_code, status.HTTP_204_NO_CONTENT)
+        key = read_token(upload['token'])['key']
+        self.assertTrue(default_storage.exists(key))
+
+        # Finalizing only reads the first bytes, the file stays where it is
+        with mock.patch.object(default_storage, 'open', wraps=default_storage.open) as opened:
+            response = self._finalize(upload['token'])
+        self.assertEqual(opened.call_count, 1)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['status'], 'pending')
+        image = ProductImage.objects.get(product=self.product)
+        self.assertEqual(image.image.name, key)
+        self.assertIsNone(image.blob.sha256)
+
+        # The job hashes it and copies it to its content addressed name
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(run_image_jobs(), (1, 0))
+        image.refresh_from_db()
+        self.assertEqual(image.status, ProductImage.READY)
+        self.assertEqual(image.blob.sha256, hashlib.sha256(self.png).hexdigest())
+        self.assertEqual(image.image.name, image.blob.name)
+        self.assertTrue(default_storage.exists(image.image.name))
+        self.assertFalse(default_storage.exists(key))
+
+    def test_image_upload_finalized_twice(self):
+        upload = self._presign('image', 'image/png')
+        self._put(upload['upload'], self.png)
+        first = self._finalize(upload['token'])
+        second = self._finalize(upload['token'])
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.json()['id'], first.json()['id'])
+        self.assertEqual(ImageBlob.objects.count(), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(run_image_jobs(), (1, 0))
+        # The upload is gone once processed
+        self.assertEqual(self._finalize(upload['token']).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_image_upload_of_known_content(self):
+        existing = ProductImage.objects.create(
+            product=self.product, image=SimpleUploadedFile("photo.png", self.png, content_type="image/png")
+        )
+        upload = self._presign('image', 'image/png')
+        self._put(upload['upload'], self.png)
+        self._finalize(upload['token'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(run_image_jobs(), (2, 0))
+        # Handed over to the blob of the same content
+        blob = ImageBlob.objects.get()
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual(set(ProductImage.objects.values_list('image', flat=True)), {existing.image.name})
+        self.assertFalse(default_storage.exists(read_token(upload['token'])['key']))
+
+    def test_model_upload(self):
+        with open(os.path.join(settings.BASE_DIR, 'api', 'tests', 'test_files', 'sample_model.glb'), 'rb') as f:
+            model = f.read()
+
+        names = []
+        for _ in range(2):
+            upload = self._presign('model', 'model/gltf-binary')
+            self._put(upload['upload'], model)
+            # The model is only read by its mesh job
+            with mock.patch.object(default_storage, 'open', wraps=default_storage.open) as opened:
+                response = self._finalize(upload['token'])
+            self.assertEqual(opened.call_count, 2)  # The header, and the local copy to models/
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertFalse(Mesh.objects.filter(product=self.product).exists())
+            self.assertTrue(MeshJob.objects.filter(product=self.product).exists())
+            self.product.refresh_from_db()
+            names.append(self.product.model_3d.name)
+
+            # Copied out of uploads/, replaying the upload can't change it
+            key = read_token(upload['token'])['key']
+            self.assertTrue(names[-1].startswith('models/'))
+            self.assertFalse(default_storage.exists(key))
+            self._put(upload['upload'], self.png)
+            with default_storage.open(names[-1]) as f:
+                self.assertEqual(f.read(), model)
+
+        self.assertEqual(run_mesh_jobs(), (1, 0))
+        self.assertTrue(Mesh.objects.filter(product=self.product).exists())
+        self.assertFalse(MeshJob.objects.exists())
+        # The replaced model is deleted
+        self.assertFalse(default_storage.exists(names[0]))
+        self.assertTrue(default_storage.exists(names[1]))
+
+    @override_settings(USE_LOCAL=False)
+    def test_s3_reads_are_bounded_and_copies_server_side(self):
+        client = mock.Mock()
+        client.get_object.return_value = {'Body': BytesIO(b'glTF\x02\x00\x00\x00')}
+        storage = mock.Mock(bucket_name='bucket')
+        storage.connection.meta.client = client
+
+        self.assertEqual(read_header('uploads/models/a.glb', storage), b'glTF\x02\x00\x00\x00')
+        self.assertEqual(client.get_object.call_args.kwargs['Range'], 'bytes=0-15')
+        self.assertEqual(copy_object('uploads/models/a.glb', 'models/b.glb', storage), 'models/b.glb')
+        client.copy_object.assert_called_once_with(
+            Bucket='bucket', Key='models/b.glb', CopySource={'Bucket': 'bucket', 'Key': 'uploads/models/a.glb'}
+        )
+        storage.open.assert_not_called()
+
+    def test_invalid_uploads(self):
+        upload = self._presign('image', 'image/png')
+        # Not uploaded yet
+        self.assertEqual(self._finalize(upload['token']).status_code, status.HTTP_400_BAD_REQUEST)
+        # Not the announced content type
+        self.assertEqual(self._put(upload['upload'], self.png, 'image/jpeg').status_code, status.HTTP_400_BAD_REQUEST)
+        # Not an image
+        self._put(upload['upload'], b'not an image')
+        self.assertEqual(self._finalize(upload['token']).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(ImageBlob.objects.exists())
+
+        upload = self._presign('model', 'model/gltf-binary')
+        self._put(upload['upload'], self.png)
+        self.assertEqual(self._finalize(upload['token']).status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.assertEqual(self._finalize('forged').status_code, status.HTTP_400_BAD_REQUEST)
+        response = APIClient().generic('PUT', reverse('upload-local', kwargs={'token': 'forged'}), b'x', content_type='image/png')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_token_of_another_superuser(self):
+        upload = self._presign('image', 'image/png')
+        self._put(upload['upload'], self.png)
+        other = User.objects.create_superuser('other', 'other@example.com', 'other123')
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self._finalize(upload['token']).status_code, status.HTTP_400_BAD_REQUEST)
@@ -61,4 +61,16 @@ class GetUsersTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data['users']), 5)
 
+    def test_get_users_cursor_pagination(self):
+        for i in range(6):
+            User.objects.create_user(username=f'user{i}', password='12345')
 
+        self.api_authentication(self.admin_token)
+        response = self.client.get(reverse('users'), {'cursor': ''})
+        print(colorama.Fore.MAGENTA + "Response Data:", response.json())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['users']), 5)
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['users']), 3)
+        self.assertIsNone(response.data['next'])
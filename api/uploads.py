@@ -0,0 +1,182 @@
+import os
+import uuid
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.storage import default_storage
+from django.urls import reverse
+
+from api.images import store_file
+
+# Direct-to-storage uploads of product images and 3D models.
+#
+# presign() hands out an upload target and a signed token naming the object
+# key, the client sends the file straight to the storage (an S3 presigned POST,
+# or the upload endpoint of this API with USE_LOCAL) and then posts the token
+# to the finalize endpoint, which checks the first bytes of the object and
+# attaches it. The API never downloads the file: models are copied to models/
+# by the storage, images are hashed and copied to their content addressed name
+# by their image job. Uploads only ever live under uploads/, a token replayed
+# after finalize can't touch the attached file, and uploads that are never
+# finalized can be expired with a bucket lifecycle rule on that prefix.
+
+UPLOAD_URL_TTL = getattr(settings, "UPLOAD_URL_TTL", 15 * 60)
+UPLOAD_TOKEN_SALT = "api.uploads"
+
+UPLOAD_KINDS = {
+    "image": {
+        "content_types": {"image/jpeg": ".jpg", "image/png": ".png", "image/webp": ".webp"},
+        "max_size": 20 * 1024 * 1024,
+    },
+    "model": {
+        "content_types": {"model/gltf-binary": ".glb"},
+        "max_size": 50 * 1024 * 1024,
+    },
+}
+
+# Bytes read from an upload to check its type
+UPLOAD_HEADER_SIZE = 16
+
+
+class InvalidUpload(Exception):
+    """
+    Raised for an upload token or object that can't be used.
+    """
+
+
+def _upload_key(kind, ext):
+    return f"uploads/{kind}s/{uuid.uuid4()}{ext}"
+
+
+def presign(request, kind, product_id, content_type):
+    """
+    Issue an upload target for a file of `kind` for a product.
+
+    Returns:
+        A dict with the signed token to finalize the upload with, the target
+        to send the file to and how long it is valid.
+
+    Raises:
+        InvalidUpload: If the kind or the content type is not accepted.
+    """
+    if kind not in UPLOAD_KINDS:
+        raise InvalidUpload(f"kind must be one of {', '.join(UPLOAD_KINDS)}")
+    spec = UPLOAD_KINDS[kind]
+    if content_type not in spec["content_types"]:
+        raise InvalidUpload(f"content_type must be one of {', '.join(spec['content_types'])}")
+
+    key = _upload_key(kind, spec["content_types"][content_type])
+    token = signing.dumps(
+        {"kind": kind, "key": key, "product": product_id, "user": request.user.id, "type": content_type},
+        salt=UPLOAD_TOKEN_SALT,
+    )
+    if settings.USE_LOCAL:
+        target = {
+            "method": "PUT",
+            "url": request.build_absolute_uri(reverse("upload-local", kwargs={"token": token})),
+            "headers": {"Content-Type": content_type},
+        }
+    else:
+        target = _presigned_post(key, content_type, spec["max_size"])
+    return {"token": token, "upload": target, "expires_in": UPLOAD_URL_TTL}
+
+
+def _presigned_post(key, content_type, max_size):
+    # S3 enforces the size and the content type, the credentials are the storage's
+    client = default_storage.connection.meta.client
+    post = client.generate_presigned_post(
+        Bucket=default_storage.bucket_name,
+        Key=key,
+        Fields={"Content-Type": content_type},
+        Conditions=[{"Content-Type": content_type}, ["content-length-range", 1, max_size]],
+        ExpiresIn=UPLOAD_URL_TTL,
+    )
+    return {"method": "POST", "url": post["url"], "fields": post["fields"]}
+
+
+def read_token(token, user=None):
+    """
+    Check an upload token, optionally that it was issued to `user`.
+
+    Returns:
+        The dict signed by presign().
+
+    Raises:
+        InvalidUpload: If the token is invalid, expired or someone else's.
+    """
+    try:
+        upload = signing.loads(token, salt=UPLOAD_TOKEN_SALT, max_age=UPLOAD_URL_TTL)
+    except signing.SignatureExpired:
+        raise InvalidUpload("Upload token expired")
+    except signing.BadSignature:
+        raise InvalidUpload("Invalid upload token")
+    if user is not None and upload["user"] != user.id:
+        raise InvalidUpload("Invalid upload token")
+    return upload
+
+
+def check_object(upload, storage=default_storage):
+    """
+    Check that the uploaded object exists and is within the size limit.
+
+    Raises:
+        InvalidUpload: If it is missing, empty or too large.
+    """
+    key = upload["key"]
+    if not storage.exists(key):
+        raise InvalidUpload("Upload not found, send the file before finalizing")
+    size = storage.size(key)
+    if not 0 < size <= UPLOAD_KINDS[upload["kind"]]["max_size"]:
+        storage.delete(key)
+        raise InvalidUpload("Uploaded file is empty or too large")
+
+
+def upload_name(upload):
+    return os.path.basename(upload["key"])
+
+
+def read_header(key, storage=default_storage):
+    """
+    The first UPLOAD_HEADER_SIZE bytes of an object, with a ranged GET on S3
+    (opening an S3 file downloads all of it).
+    """
+    if settings.USE_LOCAL:
+        with storage.open(key) as f:
+            return f.read(UPLOAD_HEADER_SIZE)
+    client = storage.connection.meta.client
+    response = client.get_object(
+        Bucket=storage.bucket_name, Key=key, Range=f"bytes=0-{UPLOAD_HEADER_SIZE - 1}"
+    )
+    return response["Body"].read()
+
+
+def matches_content_type(header, content_type):
+    """
+    Whether the first bytes of a file are those of `content_type`.
+    """
+    if content_type == "image/jpeg":
+        return header.startswith(b"\xff\xd8\xff")
+    if content_type == "image/png":
+        return header.startswith(b"\x89PNG\r\n\x1a\n")
+    if content_type == "image/webp":
+        return header[:4] == b"RIFF" and header[8:12] == b"WEBP"
+    if content_type == "model/gltf-binary":
+        return header[:4] == b"glTF"
+    return False
+
+
+def copy_object(source, name, storage=default_storage):
+    """
+    Copy a stored object to exactly `name`, inside the bucket on S3 (the bytes
+    never leave the storage).
+    """
+    if settings.USE_LOCAL:
+        with storage.open(source) as f:
+            return store_file(storage, name, f)
+    client = storage.connection.meta.client
+    client.copy_object(
+        Bucket=storage.bucket_name,
+        Key=name,
+        CopySource={"Bucket": storage.bucket_name, "Key": source},
+    )
+    return name
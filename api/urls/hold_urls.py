@@ -0,0 +1,9 @@
+from django.urls import path
+from api.views import hold_views as views
+
+
+urlpatterns = [
+    path("", views.getMyHolds, name="holds"),
+    path("create/", views.createHold, name="hold-create"),
+    path("delete/<str:pk>/", views.deleteHold, name="hold-delete"),
+]
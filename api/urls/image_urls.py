@@ -5,4 +5,5 @@ from api.views import image_views as views
 urlpatterns = [
     path("create/", views.createImage, name="image-create"),
     path("delete/<str:pk>/", views.deleteImage, name="image-delete"),
+    path("<str:pk>/file/", views.getImageFile, name="image-file"),
 ]
\ No newline at end of file
@@ -6,6 +6,8 @@ urlpatterns = [
     path('', views.getOrders, name='orders'),
     path('add/', views.addOrder, name='orders-add'),
     path('myorders/', views.getMyOrders, name='myorders'),
+    path('status/', views.updateOrdersStatus, name='orders-status'),
+    path('export/', views.exportOrders, name='orders-export'),
     
     path('<str:pk>/shipped/', views.updateOrderToShipped, name='order-shipped'),
     path('<str:pk>/unshipped/', views.resetOrderToUnshipped, name='order-unshipped'),
@@ -6,9 +6,12 @@ urlpatterns = [
     path("", views.getProducts, name="products"),
 
     path("create/", views.createProduct, name="product-create"),
+    path("batch/", views.getProductsBatch, name="products-batch"),
+    path("cache/stats/", views.getProductCacheStats, name="product-cache-stats"),
 
     path("<str:pk>/reviews/<str:review_id>/delete/", views.deleteProductReview, name="delete-review"),
-    path("<str:pk>/reviews", views.createProductReview, name="create-review"),
+    path("<str:pk>/reviews/", views.productReviews, name="product-reviews"),
+    path("<str:pk>/reviews", views.productReviews, name="create-review"),
     path("<str:pk>/", views.getProduct, name="product"),
 
     path("update/<str:pk>/", views.updateProduct, name="product-update"),
@@ -0,0 +1,7 @@
+from django.urls import path
+from api.views import report_views as views
+
+
+urlpatterns = [
+    path("sales/", views.getSalesReport, name="reports-sales"),
+]
@@ -4,5 +4,7 @@ from api.views import size_views as views
 urlpatterns = [
     path("", views.getSizes, name="sizes"),
     path("update/", views.updateProductSizes, name="sizes-update"),
+    path("stock/", views.getStockMatrix, name="sizes-stock"),
+    path("stock/update/", views.updateSizeStock, name="sizes-stock-update"),
 
 ]
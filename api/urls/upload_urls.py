@@ -0,0 +1,9 @@
+from django.urls import path
+from api.views import upload_views as views
+
+
+urlpatterns = [
+    path("", views.createUploadUrl, name="upload-create"),
+    path("finalize/", views.finalizeUpload, name="upload-finalize"),
+    path("local/<str:token>/", views.uploadLocalFile, name="upload-local"),
+]
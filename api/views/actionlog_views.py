@@ -10,6 +10,8 @@ from rest_framework import status
 from api.permissions import IsSuperUser
 
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from rest_framework.exceptions import NotFound
+from api.pagination import is_cursor_request, paginate_by_cursor
 
 import logging
 
@@ -24,6 +26,10 @@ def getActionLogs(request):
     Args:
         request: The HTTP request object.
 
+    Query params:
+        cursor: Opt in to cursor pagination, an empty value asks for the first page.
+        page_size: Number of action logs per page in cursor mode.
+
     Returns:
         A Response object containing the serialized data of all action logs.
         If an exception occurs, a Response object with an error message and
@@ -32,6 +38,11 @@ def getActionLogs(request):
     try:
         actionLogs = ActionLog.objects.all().order_by('-id')
 
+        if is_cursor_request(request):
+            actionLogs, next_link, prev_link = paginate_by_cursor(request, actionLogs, '-id', 10)
+            serializer = ActionLogSerializer(actionLogs, many=True)
+            return Response({'actionLogs': serializer.data, 'next': next_link, 'prev': prev_link}, status=status.HTTP_200_OK)
+
         page = request.query_params.get("page")
         paginator = Paginator(actionLogs, 10) # n items per page
 
@@ -49,6 +60,8 @@ def getActionLogs(request):
 
         serializer = ActionLogSerializer(actionLogs, many=True)
         return Response({'actionLogs': serializer.data, 'page': page, 'pages': paginator.num_pages}, status=status.HTTP_200_OK)
+    except NotFound:
+        return Response({"error": "Invalid cursor"}, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
         logger.error(e)
         return Response(
@@ -9,6 +9,8 @@ from api.models import Category
 
 from rest_framework import status
 from api.permissions import IsSuperUser
+from api.conditional import make_etag, timestamp, get_not_modified_response, set_validators
+from django.db.models import Count, Max
 
 import logging
 
@@ -24,14 +26,21 @@ def getCategories(request):
         request: The HTTP request object.
 
     Returns:
-        A Response object containing the serialized data of all categories.
+        A Response object containing the serialized data of all categories,
+        or 304 when the client's ETag/Last-Modified is still current.
         If an exception occurs, a Response object with an error message and
         status code 500 will be returned.
     """
     try:
+        stats = Category.objects.aggregate(count=Count('id'), latest=Max('updated_at'))
+        etag = make_etag('categories', stats['count'], timestamp(stats['latest']))
+        not_modified = get_not_modified_response(request, etag, stats['latest'])
+        if not_modified is not None:
+            return not_modified
+
         categories = Category.objects.all()
         serializer = CategorySerializer(categories, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return set_validators(Response(serializer.data, status=status.HTTP_200_OK), etag, stats['latest'])
     except Exception as e:
         logger.error(e)
         return Response(
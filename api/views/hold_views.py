@@ -0,0 +1,157 @@
+from datetime import timedelta
+
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+
+from api.serializers import StockHoldSerializer
+from api.models import Product, ProductSizeStock, StockHold, InsufficientStock
+
+from rest_framework import status
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+STOCK_HOLD_TTL = getattr(settings, "STOCK_HOLD_TTL", 15 * 60)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def getMyHolds(request):
+    """
+    Retrieve the live stock holds of the authenticated user.
+
+    Args:
+        request: The HTTP request object.
+
+    Returns:
+        A Response object containing the serialized holds.
+    """
+    try:
+        holds = StockHold.objects.filter(user=request.user, expires_at__gt=timezone.now()).order_by("id")
+        serializer = StockHoldSerializer(holds, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+    except Exception as e:
+        logger.error(e)
+        return Response(
+            {"error": "Internal server error"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def createHold(request):
+    """
+    Reserve stock of a product for the user's cart, for STOCK_HOLD_TTL seconds.
+
+    Products stocked per size are held per size: the hold is checked against
+    and serialized on that ProductSizeStock row only, so holds and checkouts
+    of other sizes never wait for it. Posting again for the same product (and
+    size) replaces the quantity and restarts the timer. The hold is converted
+    into an order by addOrder.
+
+    Args:
+        request: The HTTP request object, with `product`, `size` (a ShoeSize
+            id, required for products stocked per size) and `quantity` (default 1).
+
+    Returns:
+        A Response object containing the serialized hold.
+
+    Raises:
+        Product.DoesNotExist: If the product does not exist or is not visible.
+        InsufficientStock: If the stock not held by others is too low.
+    """
+    try:
+        data = request.data
+        try:
+            product_id = int(data.get("product"))
+            size_id = int(data["size"]) if data.get("size") not in (None, "") else None
+            quantity = int(data.get("quantity", 1))
+        except (TypeError, ValueError):
+            return Response({"error": "Invalid product, size or quantity"}, status=status.HTTP_400_BAD_REQUEST)
+        if quantity < 1:
+            return Response({"error": "Quantity must be at least 1"}, status=status.HTTP_400_BAD_REQUEST)
+
+        visibility = {} if request.user.is_staff else {"visible": True}
+        product = Product.objects.only("id").get(id=product_id, **visibility)
+        sized = ProductSizeStock.objects.filter(product=product).exists()
+        if sized and size_id is None:
+            return Response({"error": "Please select a size"}, status=status.HTTP_400_BAD_REQUEST)
+        if not sized and size_id is not None:
+            return Response({"error": "This product is not stocked per size"}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            # Holds of one size (or of one product without sizes) are placed
+            # one at a time, the lock is only held for these few statements
+            if sized:
+                row = (
+                    ProductSizeStock.objects.select_for_update()
+                    .filter(product=product, size_id=size_id)
+                    .first()
+                )
+                if row is None:
+                    return Response(
+                        {"error": "Size not available for this product"}, status=status.HTTP_400_BAD_REQUEST
+                    )
+                stock = ProductSizeStock.objects.filter(id=row.id).with_available()
+            else:
+                product = Product.objects.select_for_update().get(id=product.id)
+                stock = Product.objects.filter(id=product.id).with_available()
+
+            hold, created = StockHold.objects.update_or_create(
+                user=request.user,
+                product=product,
+                size_id=size_id,
+                defaults={
+                    "quantity": quantity,
+                    "expires_at": timezone.now() + timedelta(seconds=STOCK_HOLD_TTL),
+                },
+            )
+            if stock.values_list("available", flat=True).get() < 0:
+                raise InsufficientStock()
+
+        serializer = StockHoldSerializer(hold, many=False)
+        return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+    except Product.DoesNotExist:
+        return Response({"error": "Product not found."}, status=status.HTTP_404_NOT_FOUND)
+    except InsufficientStock:
+        return Response({"error": "Insufficient stock"}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        logger.error(e)
+        return Response(
+            {"error": "Internal server error"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
+
+
+@api_view(["DELETE"])
+@permission_classes([IsAuthenticated])
+def deleteHold(request, pk):
+    """
+    Release one of the user's stock holds.
+
+    Args:
+        request: The HTTP request object.
+        pk: The ID of the hold.
+
+    Returns:
+        An empty response with status 204, or 404 if the user has no such hold.
+    """
+    try:
+        deleted, _ = StockHold.objects.filter(id=pk, user=request.user).delete()
+        if not deleted:
+            return Response({"error": "Hold not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    except ValueError:
+        return Response({"error": "Hold not found."}, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        logger.error(e)
+        return Response(
+            {"error": "Internal server error"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
@@ -6,14 +6,14 @@ from rest_framework.permissions import IsAdminUser
 
 from api.serializers import ProductImageSerializer
 from api.models import ProductImage, Product
+from api.images import accepts_webp, pick_width
+from django.http import HttpResponseRedirect
+from django.utils.cache import patch_cache_control, patch_vary_headers
 
 from rest_framework import status
+from rest_framework.negotiation import BaseContentNegotiation
 from api.permissions import IsSuperUser
 
-import os
-from django.conf import settings
-from django.core.files.storage import default_storage
-
 import logging
 
 logger = logging.getLogger(__name__)
@@ -26,6 +26,10 @@ def createImage(request):
     """
     Create a new image for a product.
 
+    The upload is stored as is and the image is returned in the pending
+    status, the process_image_jobs workers convert it and generate its
+    variants.
+
     Args:
         request (HttpRequest): The HTTP request object.
 
@@ -79,18 +83,7 @@ def deleteImage(request, pk):
     try:
         image_for_deletion = ProductImage.objects.get(id=pk)
 
-        # Delete the image from the associated product
-        product = image_for_deletion.product
-        if product and product.model_3d:
-            if settings.USE_LOCAL:
-                # Local storage logic
-                image_file_path = os.path.join(settings.MEDIA_ROOT, image_for_deletion.image.name)
-                if os.path.exists(image_file_path):
-                    os.remove(image_file_path)
-            else:
-                # S3
-                default_storage.delete(image_for_deletion.image.name)
-
+        # The file is only deleted once no other image uses it, see ImageBlob
         image_for_deletion.delete()
 
         return Response(status=status.HTTP_204_NO_CONTENT)
@@ -103,3 +96,76 @@ def deleteImage(request, pk):
             {"error": "An error occurred while deleting the image"},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR,
         )
+
+
+class IgnoreAcceptNegotiation(BaseContentNegotiation):
+    # getImageFile reads Accept itself, an image Accept header must not be a 406
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return (renderers[0], renderers[0].media_type)
+
+
+def ignore_accept(view):
+    # Goes above @api_view, which has no setting for it
+    view.cls.content_negotiation_class = IgnoreAcceptNegotiation
+    return view
+
+
+@ignore_accept
+@api_view(["GET"])
+def getImageFile(request, pk):
+    """
+    Redirect to the best file of an image for the client.
+
+    Args:
+        request (HttpRequest): The HTTP request object, its Accept header
+            picks WebP over JPEG.
+        pk (int): The primary key of the image.
+
+    Query params:
+        width: The width the image is displayed at, the smallest file at least
+            that wide is picked.
+
+    Returns:
+        A 302 redirect to the file, varying on Accept, 400 for an invalid width
+        or 404 if the image is not found.
+    """
+    try:
+        width = request.query_params.get("width")
+        if width is not None:
+            try:
+                width = int(width)
+            except ValueError:
+                return Response({"error": "width must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        images = ProductImage.objects.only(
+            "id", "image", "width", "variants", "webp_variants"
+        )
+        if not request.user.is_staff:
+            images = images.filter(product__visible=True)
+        image = images.get(id=int(pk))
+
+        storage = image.image.storage
+        if accepts_webp(request) and image.webp_variants:
+            url = storage.url(image.webp_variants[pick_width(image.webp_variants, width)])
+        else:
+            files = dict(image.variants)
+            if image.width:
+                files[str(image.width)] = image.image.name
+            url = storage.url(files[pick_width(files, width)]) if files else image.image.url
+
+        response = HttpResponseRedirect(url)
+        patch_vary_headers(response, ["Accept"])
+        patch_cache_control(response, private=True, max_age=3600)
+        return response
+
+    except (ProductImage.DoesNotExist, ValueError):
+        return Response({"error": "Image not found"}, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        logger.error(e)
+        return Response(
+            {"error": "Internal server error"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
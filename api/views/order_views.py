@@ -2,21 +2,57 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.contrib.auth.models import User
-from api.models import Product, Order, OrderItem, ShippingAddress, ShoeSize, ActionLog
-from api.serializers import ProductSerializer, OrderSerializer
+from api.models import (
+    Product,
+    Order,
+    OrderItem,
+    ShippingAddress,
+    ShoeSize,
+    ActionLog,
+    StockHold,
+    ProductSizeStock,
+    InsufficientStock,
+)
+from api.serializers import ProductSerializer, OrderSerializer, OrderSummarySerializer
 from rest_framework import status
 from django.utils import timezone
 from rest_framework.permissions import IsAdminUser
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import transaction
-from django.http import JsonResponse
+from django.db.models import Q
+from django.http import JsonResponse, StreamingHttpResponse
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from rest_framework.exceptions import NotFound
+from api.pagination import is_cursor_request, paginate_by_cursor
+from api.cache import invalidate_products
+from api.idempotency import idempotent
+from api.reports import record_order_placed, record_order_paid
+from api.exports import EXPORT_OUTPUTS, export_orders
+from api.permissions import IsSuperUser
+from api.filters import apply_order_filters, apply_all_order_filters
 
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+ORDER_VIEWS = {
+    "full": OrderSerializer,
+    "summary": OrderSummarySerializer,
+}
+
+# Target states of updateOrdersStatus: (flag, its value, timestamp field)
+ORDER_TRANSITIONS = {
+    "shipped": ("is_shipped", True, "shipped_at"),
+    "unshipped": ("is_shipped", False, "shipped_at"),
+    "delivered": ("is_delivered", True, "delivered_at"),
+    "undelivered": ("is_delivered", False, "delivered_at"),
+}
+
+# Most orders updateOrdersStatus takes in one request
+MAX_BULK_ORDERS = 200
+# Orders getMyOrders returns without ?cursor=, the newest ones
+MY_ORDERS_LIMIT = 50
 
 # get all orders
 @api_view(["GET"])
@@ -28,13 +64,34 @@ def getOrders(request):
     Args:
         request: The HTTP request object.
 
+    Query params:
+        cursor: Opt in to cursor pagination, an empty value asks for the first page.
+        page_size: Number of orders per page in cursor mode.
+        email: The customer's email, case insensitive.
+        name: The start of the customer's name, case insensitive.
+        city, country: The shipping address, case insensitive.
+        paid, shipped, delivered: true or false.
+        created_from, created_to, paid_from, paid_to: Dates or datetimes (ISO 8601), both inclusive.
+        min_total: Lowest total price.
+
     Returns:
         A Response object containing the serialized data of all orders.
+        If a filter is invalid, a Response object with an error message and a
+        status code of 400 will be returned.
         If an exception occurs, a Response object with an error message and
         a status code of 500 will be returned.
     """
     try:
-        orders = Order.objects.all().order_by("-id")
+        try:
+            orders = apply_all_order_filters(Order.objects.with_details(), request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        orders = orders.order_by("-id")
+
+        if is_cursor_request(request):
+            orders, next_link, prev_link = paginate_by_cursor(request, orders, "-id", 5)
+            serializer = OrderSerializer(orders, many=True)
+            return Response({'orders': serializer.data, 'next': next_link, 'prev': prev_link}, status=status.HTTP_200_OK)
 
         page = request.query_params.get("page")
         paginator = Paginator(orders, 5) # n orders per page
@@ -56,7 +113,50 @@ def getOrders(request):
         serializer = OrderSerializer(orders, many=True)
 
         return Response({'orders': serializer.data, 'page': page, 'pages': paginator.num_pages}, status=status.HTTP_200_OK)
-        
+
+    except NotFound:
+        return Response({"error": "Invalid cursor"}, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        logger.error(e)
+        return Response(
+            {"error": "Internal server error"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
+
+
+# export orders
+@api_view(["GET"])
+@permission_classes([IsSuperUser])
+def exportOrders(request):
+    """
+    Stream all orders with their items and shipping address.
+
+    Args:
+        request: The HTTP request object.
+
+    Query params:
+        output: csv (default, one line per item) or ndjson (one order per line).
+        The getOrders filters.
+
+    Returns:
+        A StreamingHttpResponse with the export as an attachment, or 400 when
+        a param is invalid.
+    """
+    try:
+        output = request.query_params.get("output", "csv")
+        if output not in EXPORT_OUTPUTS:
+            return Response(
+                {"error": f"output must be one of {', '.join(EXPORT_OUTPUTS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            orders = apply_all_order_filters(Order.objects.all(), request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(export_orders(orders, output), content_type=EXPORT_OUTPUTS[output])
+        response["Content-Disposition"] = f'attachment; filename="orders.{output}"'
+        return response
     except Exception as e:
         logger.error(e)
         return Response(
@@ -85,7 +185,7 @@ def getOrderById(request, pk):
     """
     try:
         user = request.user
-        order = Order.objects.get(id=pk)
+        order = Order.objects.with_details().get(id=pk)
 
         if user.is_staff or order.user == user:
             serializer = OrderSerializer(order, many=False)
@@ -109,6 +209,7 @@ def getOrderById(request, pk):
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
+@idempotent
 def addOrder(request):
     """
     Add an order to the system.
@@ -119,6 +220,16 @@ def addOrder(request):
     Returns:
         Response: The HTTP response object containing the serialized order data.
 
+    Products and sizes are read with one query each, the order items are
+    inserted in bulk and the stock is decremented with a single conditional
+    UPDATE that rolls the whole order back when a concurrent checkout took
+    the last items. Products stocked per size (see ProductSizeStock) are
+    checked and decremented per size only, their product row is not locked by
+    the order and its total is refreshed from the sizes after the commit.
+    Items held for other users (see StockHold) are not available, the user's
+    own holds are converted into the order. Retries sent with the same
+    Idempotency-Key header replay the first response.
+
     Raises:
         JsonResponse: If there are no order items, or if there is insufficient stock for a product,
             or if a product with a given ID does not exist.
@@ -132,28 +243,73 @@ def addOrder(request):
                 {"error": "No Order Items"}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        with transaction.atomic():
-            # Step 1: Aggregate Product Quantities
-            product_quantities = {}
-            for item_data in data["orderItems"]:
-                product_id = item_data["product"]
-                product_quantities[product_id] = product_quantities.get(product_id, 0) + 1
-
-            # Step 2: Check Stock Availability
-            for product_id, quantity in product_quantities.items():
-                try:
-                    product = Product.objects.get(id=product_id)
-                    if quantity > product.count_in_stock:
-                        return JsonResponse(
-                            {"error": f"Insufficient stock for product '{product.name}'"},
-                            status=status.HTTP_400_BAD_REQUEST,
-                        )
-                except Product.DoesNotExist:
-                    return JsonResponse(
-                        {"error": f"Product with ID {product_id} does not exist"},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
+        # Step 1: Aggregate Product Quantities
+        product_quantities = {}
+        items = []
+        for item_data in data["orderItems"]:
+            try:
+                product_id = int(item_data["product"])
+                size_id = int(item_data["size"]["id"]) if "size" in item_data else None
+            except (TypeError, ValueError):
+                return Response(
+                    {"error": "Invalid order item"}, status=status.HTTP_400_BAD_REQUEST
+                )
+            product_quantities[product_id] = product_quantities.get(product_id, 0) + 1
+            items.append((product_id, size_id, item_data))
+        size_ids = {size_id for product_id, size_id, item_data in items if size_id is not None}
+
+        # Step 2: Fetch products and sizes in one query each
+        products = Product.objects.with_available(user).in_bulk(list(product_quantities))
+        sizes = ShoeSize.objects.in_bulk(list(size_ids))
+
+        # Products with per-size stock are checked per size instead
+        size_stock = {
+            (product_id, size_id): available
+            for product_id, size_id, available in ProductSizeStock.objects.filter(
+                product_id__in=list(product_quantities)
+            )
+            .with_available(user)
+            .values_list("product_id", "size_id", "available")
+        }
+        sized_products = {product_id for product_id, size_id in size_stock}
+
+        for product_id, quantity in product_quantities.items():
+            product = products.get(product_id)
+            if product is None:
+                return Response(
+                    {"error": f"Product with ID {product_id} does not exist"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            if product_id not in sized_products and quantity > product.available:
+                return Response(
+                    {"error": f"Insufficient stock for product '{product.name}'"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+        missing_sizes = size_ids - set(sizes)
+        if missing_sizes:
+            return Response(
+                {"error": f"Size with ID {missing_sizes.pop()} does not exist"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        size_quantities = {}
+        for product_id, size_id, item_data in items:
+            if product_id in sized_products:
+                key = (product_id, size_id)
+                size_quantities[key] = size_quantities.get(key, 0) + 1
+        for (product_id, size_id), quantity in size_quantities.items():
+            if size_id is None:
+                return Response(
+                    {"error": f"Please select a size for product '{products[product_id].name}'"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            if quantity > size_stock.get((product_id, size_id), 0):
+                return Response(
+                    {"error": f"Insufficient stock for product '{products[product_id].name}' in size {sizes[size_id].size}"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
 
+        with transaction.atomic():
             # Create order
             order = Order.objects.create(
                 user=user,
@@ -173,33 +329,58 @@ def addOrder(request):
             )
 
             # Create order items
-            for item_data in data["orderItems"]:
-                product = Product.objects.get(id=item_data["product"])
-                size = (
-                    ShoeSize.objects.get(id=item_data["size"]["id"])
-                    if "size" in item_data
-                    else None
-                )
-                colors = item_data.get("colors", {})
-
-                OrderItem.objects.create(
-                    product=product,
-                    order=order,
-                    name=item_data["name"],
-                    price=item_data["price"],
-                    image=item_data["image"],
-                    size=size,
-                    colors=colors,
-                )
+            OrderItem.objects.bulk_create(
+                [
+                    OrderItem(
+                        product=products[product_id],
+                        order=order,
+                        name=item_data["name"],
+                        price=item_data["price"],
+                        image=item_data["image"],
+                        size=sizes.get(size_id),
+                        colors=item_data.get("colors", {}),
+                    )
+                    for product_id, size_id, item_data in items
+                ]
+            )
 
-            # Step 3: Update Stock
-            for product_id, quantity in product_quantities.items():
-                product = Product.objects.get(id=product_id)
-                product.count_in_stock -= quantity
-                product.save()
+            # Step 3: Update Stock, the check above may be stale by now so the
+            # decrement is conditional and rolls the order back if it fails
+            Product.objects.decrement_stock(
+                {
+                    product_id: quantity
+                    for product_id, quantity in product_quantities.items()
+                    if product_id not in sized_products
+                },
+                user=user,
+            )
+            ProductSizeStock.objects.decrement(size_quantities, user=user)
+
+            # The user's holds on these products (and sizes) are now part of the order
+            converted = Q(product_id__in=list(set(product_quantities) - sized_products), size__isnull=True)
+            for product_id, size_id in size_quantities:
+                converted |= Q(product_id=product_id, size_id=size_id)
+            StockHold.objects.filter(converted, user=user).delete()
+
+            record_order_placed(order)
+
+        if sized_products:
+            # Outside of the order's transaction, the product rows are only
+            # locked for this one statement
+            def sync_products():
+                Product.objects.filter(id__in=list(sized_products)).sync_size_stock()
+                invalidate_products(list(sized_products))
+
+            transaction.on_commit(sync_products)
+        invalidate_products(list(product_quantities))
 
         serializer = OrderSerializer(order, many=False)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
+    except InsufficientStock:
+        return Response(
+            {"error": "Insufficient stock for one of the products"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
     except Exception as e:
         logger.error(e)
         return Response(
@@ -213,13 +394,24 @@ def addOrder(request):
 @permission_classes([IsAuthenticated])
 def getMyOrders(request):
     """
-    Retrieve all orders associated with the authenticated user.
+    Retrieve the orders of the authenticated user, newest first.
 
     Args:
         request (HttpRequest): The HTTP request object.
 
+    Query params:
+        paid, shipped, delivered: "true" or "false" to filter on the order status.
+        created_from, created_to, paid_from, paid_to: Dates or datetimes (ISO 8601), both inclusive.
+        view: "full" (default) or "summary", which leaves out the items,
+            the shipping address and the user.
+        cursor: Opt in to cursor pagination, an empty value asks for the first page.
+        page_size: Number of orders per page.
+
     Returns:
         Response: The HTTP response object containing the serialized order data.
+        Without a cursor it is a plain list of the newest MY_ORDERS_LIMIT
+        orders, with a Link header (rel="next") to the next cursor page when
+        there are more.
 
     Raises:
         Exception: If there is an internal server error.
@@ -228,11 +420,32 @@ def getMyOrders(request):
     try:
         user = request.user
 
-        orders = user.orders.all()
-
-        serializer = OrderSerializer(orders, many=True)
+        view = request.query_params.get("view", "full")
+        if view not in ORDER_VIEWS:
+            return Response({"error": f"Unknown view '{view}'"}, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        try:
+            orders = apply_order_filters(user.orders.all(), request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        orders = orders.summary() if view == "summary" else orders.with_details()
+        orders = orders.order_by("-created_at", "-id")
+
+        if is_cursor_request(request):
+            orders, next_link, prev_link = paginate_by_cursor(request, orders, ("-created_at", "-id"), 10)
+            serializer = ORDER_VIEWS[view](orders, many=True)
+            return Response({'orders': serializer.data, 'next': next_link, 'prev': prev_link}, status=status.HTTP_200_OK)
+
+        # Older clients get the first page in the old list format
+        orders, next_link, prev_link = paginate_by_cursor(request, orders, ("-created_at", "-id"), MY_ORDERS_LIMIT)
+        serializer = ORDER_VIEWS[view](orders, many=True)
+        response = Response(serializer.data, status=status.HTTP_200_OK)
+        if next_link is not None:
+            response["Link"] = f'<{next_link}>; rel="next"'
+        return response
+    except NotFound:
+        return Response({"error": "Invalid cursor"}, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
         logger.error(e)
         return Response(
@@ -243,6 +456,7 @@ def getMyOrders(request):
 # update order to paid
 @api_view(["PUT"])
 @permission_classes([IsAuthenticated])
+@idempotent
 def updateOrderToPaid(request, pk):
     """
     Update the order status to paid.
@@ -251,20 +465,29 @@ def updateOrderToPaid(request, pk):
         request (HttpRequest): The HTTP request object.
         pk (int): The primary key of the order.
 
+    Retries sent with the same Idempotency-Key header replay the first response.
+
     Returns:
         Response: The HTTP response containing the serialized order data if successful,
         or an error response if the order does not exist or an internal server error occurs.
     """
     try:
-        order = Order.objects.get(id=pk)
+        order = Order.objects.with_details().get(id=pk)
 
         if not request.user.is_staff and order.user != request.user:
             return Response({"error": "Not authorized to update this order"}, status=status.HTTP_403_FORBIDDEN)
 
-        order.is_paid = True
-        order.paid_at = timezone.now()
+        # Only the request that actually flips is_paid adds the order to the sales rollups
+        now = timezone.now()
+        with transaction.atomic():
+            if Order.objects.filter(id=order.id, is_paid=False).update(
+                is_paid=True, paid_at=now, updated_at=now
+            ):
+                order.is_paid = True
+                order.paid_at = now
+                order.updated_at = now
+                record_order_paid(order)
 
-        order.save()
         serializer = OrderSerializer(order, many=False)
 
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -301,7 +524,7 @@ def updateOrderToDelivered(request, pk):
         Exception: If there is an internal server error.
     """
     try:
-        order = Order.objects.get(id=pk)
+        order = Order.objects.with_details().get(id=pk)
         user = request.user
 
         # Create a new ActionLog record
@@ -346,7 +569,7 @@ def updateOrderToShipped(request, pk):
         Exception: If there is an internal server error.
     """
     try:
-        order = Order.objects.get(id=pk)
+        order = Order.objects.with_details().get(id=pk)
 
         if not request.user.is_staff and order.user != request.user:
             return Response({"error": "Not authorized to update this order"}, status=status.HTTP_403_FORBIDDEN)
@@ -388,7 +611,7 @@ def resetOrderToUnshipped(request, pk):
         A Response object with the serialized data of the updated order or an error message.
     """
     try:
-        order = Order.objects.get(id=pk)
+        order = Order.objects.with_details().get(id=pk)
 
         if not request.user.is_staff and order.user != request.user:
             return Response({"error": "Not authorized to update this order"}, status=status.HTTP_403_FORBIDDEN)
@@ -430,7 +653,7 @@ def resetOrderToUndelivered(request, pk):
         A Response object with the serialized data of the updated order or an error message.
     """
     try:
-        order = Order.objects.get(id=pk)
+        order = Order.objects.with_details().get(id=pk)
 
         ActionLog.objects.create(
             user=request.user,
@@ -455,3 +678,83 @@ def resetOrderToUndelivered(request, pk):
             {"error": "Internal server error"},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR,
         )
+
+
+@api_view(["PUT"])
+@permission_classes([IsAdminUser])
+def updateOrdersStatus(request):
+    """
+    Move many orders to the same state (shipped, unshipped, delivered or
+    undelivered) at once.
+
+    The orders are updated with a single UPDATE and the action logs are
+    written with one bulk insert.
+
+    Args:
+        request: The HTTP request object, with `ids` (at most MAX_BULK_ORDERS
+            order IDs) and the target `state`.
+
+    Returns:
+        A Response object with one {"id", "result"} entry per requested ID,
+        result being "updated", "unchanged" (already in that state) or
+        "not_found".
+    """
+    try:
+        data = request.data
+        state = data.get("state")
+        if state not in ORDER_TRANSITIONS:
+            return Response(
+                {"error": f"state must be one of {', '.join(ORDER_TRANSITIONS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        ids = data.get("ids")
+        try:
+            if not isinstance(ids, list) or not ids:
+                raise ValueError
+            ids = list(dict.fromkeys(int(pk) for pk in ids))
+        except (TypeError, ValueError):
+            return Response({"error": "ids must be a non empty list of order ids"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > MAX_BULK_ORDERS:
+            return Response(
+                {"error": f"At most {MAX_BULK_ORDERS} orders per request"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        field, value, timestamp_field = ORDER_TRANSITIONS[state]
+        now = timezone.now()
+        with transaction.atomic():
+            # Lock the orders so the results match what the UPDATE did
+            current = dict(
+                Order.objects.select_for_update().filter(id__in=ids).values_list("id", field)
+            )
+            changed = [pk for pk in ids if pk in current and current[pk] != value]
+            if changed:
+                Order.objects.filter(id__in=changed).update(
+                    **{field: value, timestamp_field: now if value else None, "updated_at": now}
+                )
+                ActionLog.objects.bulk_create(
+                    [
+                        ActionLog(
+                            user=request.user,
+                            action=f"User {request.user.first_name} updated order {pk} to {state}",
+                        )
+                        for pk in changed
+                    ]
+                )
+
+        changed = set(changed)
+        results = [
+            {
+                "id": pk,
+                "result": "updated" if pk in changed else "unchanged" if pk in current else "not_found",
+            }
+            for pk in ids
+        ]
+        return Response({"results": results}, status=status.HTTP_200_OK)
+    except Exception as e:
+        logger.error(e)
+        return Response(
+            {"error": "Internal server error"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
@@ -3,20 +3,73 @@ from rest_framework.response import Response
 from decimal import Decimal
 
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly, IsAdminUser
+from rest_framework.exceptions import NotFound
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 
-from api.serializers import ProductSerializer
-from api.models import Product, Category, Review, ActionLog
+from api.serializers import ProductSerializer, ProductSummarySerializer, ReviewSerializer
+from api.models import Product, ProductSizeStock, Category, Review, ActionLog
 
 from rest_framework import status
 from api.permissions import IsSuperUser
+from api.pagination import is_cursor_request, paginate_by_cursor
+from api.search import search_products
+from api.facets import apply_product_filters, get_product_facets
+from api.conditional import make_etag, timestamp, get_not_modified_response, set_validators
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max
+from django.utils.dateparse import parse_datetime
+from api.cache import (
+    get_cached_product,
+    set_cached_product,
+    get_product_cache_stats,
+    reset_product_cache_stats,
+)
 
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+# Most products getProductsBatch returns in one request
+MAX_BATCH_IDS = 50
+
+PRODUCT_VIEWS = {
+    "full": ProductSerializer,
+    "summary": ProductSummarySerializer,
+}
+
+
+def _get_product_representation(request):
+    """
+    Read the `view` and `fields` query params.
+
+    Returns:
+        A (view, fields) tuple, where fields is None when every field of the view
+        was requested.
+
+    Raises:
+        ValueError: If the view or one of the fields is unknown.
+    """
+    view = request.query_params.get("view", "full")
+    if view not in PRODUCT_VIEWS:
+        raise ValueError(f"Unknown view '{view}'")
+
+    fields = request.query_params.get("fields")
+    if not fields:
+        return view, None
+
+    fields = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = set(fields) - set(PRODUCT_VIEWS[view]().fields)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return view, fields
+
+
+def _get_product_queryset(view, fields):
+    if view == "summary":
+        return Product.objects.summary()
+    return Product.objects.with_details(fields)
 
 
 @api_view(["GET"])
@@ -27,32 +80,91 @@ def getProducts(request):
     Args:
         request: The HTTP request object.
 
+    Query params:
+        keyword: Full-text search over name, description and category name,
+            results are ordered by relevance (except in cursor mode).
+        category_id: Only products of this category.
+        price_min, price_max: Price range, inclusive.
+        rating_min: Minimum average rating.
+        sizes: Comma separated ShoeSize ids, products available in any of them.
+        colors: Comma separated color names, products with a mesh in any of them.
+        facets: "true" to add product counts per size, color, category and
+            price bucket for the current filters.
+        view: "full" (default) or "summary" for the slim catalog representation.
+        fields: Comma separated list of fields to return, e.g. "id,name,price".
+        cursor: Opt in to cursor pagination, an empty value asks for the first page.
+        page_size: Number of products per page in cursor mode.
+
+    In page mode the response carries ETag/Last-Modified validators and
+    If-None-Match/If-Modified-Since are answered with 304.
+
     Returns:
         A Response object containing the serialized data of all products.
         If an error occurs, a Response object with an error message and status code 500 is returned.
     """
     try:
+        try:
+            view, fields = _get_product_representation(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         keyword = request.query_params.get('keyword', None)
         category_id = request.query_params.get('category_id', None)
 
         filters = {'visible': True} if not request.user.is_staff else {}
-        if keyword:
-            filters['name__icontains'] = keyword
         if category_id:
             filters['category_id'] = category_id
 
-        products = Product.objects.filter(**filters).order_by('id')
+        products = _get_product_queryset(view, fields).filter(**filters)
+        try:
+            products = apply_product_filters(products, request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if keyword:
+            products = search_products(products, keyword).order_by('-rank', 'id')
+        else:
+            products = products.order_by('id')
+
+        with_facets = request.query_params.get('facets') == 'true'
+
+        if is_cursor_request(request):
+            facets = get_product_facets(products) if with_facets else None
+            products, next_link, prev_link = paginate_by_cursor(request, products, 'id', 4)
+            serializer = PRODUCT_VIEWS[view](products, many=True, fields=fields)
+            data = {'products': serializer.data, 'next': next_link, 'prev': prev_link}
+            if facets is not None:
+                data['facets'] = facets
+            return Response(data, status=status.HTTP_200_OK)
+
+        # Page mode needs COUNT(*) anyway, max(updated_at) for the validators comes with it
+        stats = products.order_by().aggregate(count=Count('id'), latest=Max('updated_at'))
+        etag = make_etag(
+            'products', request.user.is_staff, request.get_full_path(),
+            stats['count'], timestamp(stats['latest']),
+        )
+        not_modified = get_not_modified_response(request, etag, stats['latest'])
+        if not_modified is not None:
+            return not_modified
+
+        facets = get_product_facets(products) if with_facets else None
 
         page = int(request.query_params.get('page', 1))
         paginator = Paginator(products, 4)  # n products per page
+        paginator.count = stats['count']
 
         try:
             products = paginator.page(page)
         except (PageNotAnInteger, EmptyPage):
             products = paginator.page(1)
 
-        serializer = ProductSerializer(products, many=True)
-        return Response({'products': serializer.data, 'page': page, 'pages': paginator.num_pages}, status=status.HTTP_200_OK)
+        serializer = PRODUCT_VIEWS[view](products, many=True, fields=fields)
+        data = {'products': serializer.data, 'page': page, 'pages': paginator.num_pages}
+        if facets is not None:
+            data['facets'] = facets
+        return set_validators(Response(data, status=status.HTTP_200_OK), etag, stats['latest'])
+    except NotFound:
+        return Response({"error": "Invalid cursor"}, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
         logger.error(e)
         return Response(
@@ -70,6 +182,13 @@ def getProduct(request, pk):
         request (HttpRequest): The HTTP request object.
         pk (int): The ID of the product to retrieve.
 
+    Query params:
+        view: "full" (default) or "summary".
+        fields: Comma separated list of fields to return.
+
+    The full representation is served from the product cache when possible,
+    see api/cache.py.
+
     Returns:
         Response: The HTTP response containing the serialized product data.
 
@@ -78,13 +197,47 @@ def getProduct(request, pk):
         Exception: If there is an internal server error.
     """
     try:
-        if request.user.is_staff:
-            product = Product.objects.get(id=pk)
+        try:
+            view, fields = _get_product_representation(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            pk = int(pk)
+        except ValueError:
+            return Response(
+                {"error": "Product not available."}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        staff = request.user.is_staff
+        visibility = {} if staff else {'visible': True}
+        cacheable = view == "full" and fields is None
+        data = get_cached_product(pk, staff) if cacheable else None
+
+        # Validators come from the cached copy, or from one indexed lookup
+        if data is not None:
+            last_modified = parse_datetime(data['updated_at'])
         else:
-            product = Product.objects.get(id=pk, visible=True)
+            last_modified = (
+                Product.objects.filter(id=pk, **visibility)
+                .values_list('updated_at', flat=True)
+                .first()
+            )
+            if last_modified is None:
+                raise Product.DoesNotExist
 
-        serializer = ProductSerializer(product, many=False)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        etag = make_etag('product', pk, staff, view, fields, timestamp(last_modified))
+        not_modified = get_not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        if data is None:
+            product = _get_product_queryset(view, fields).get(id=pk, **visibility)
+            data = PRODUCT_VIEWS[view](product, many=False, fields=fields).data
+            if cacheable:
+                set_cached_product(pk, staff, data)
+
+        return set_validators(Response(data, status=status.HTTP_200_OK), etag, last_modified)
     except Product.DoesNotExist:
         return Response(
             {"error": "Product not available."}, status=status.HTTP_404_NOT_FOUND
@@ -97,6 +250,85 @@ def getProduct(request, pk):
         )
 
 
+@api_view(["GET"])
+def getProductsBatch(request):
+    """
+    Retrieve several products by ID in one request, e.g. for a cart or a wishlist.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Query params:
+        ids: Comma separated product IDs, at most MAX_BATCH_IDS.
+        view: "full" (default) or "summary".
+        fields: Comma separated list of fields to return.
+
+    Returns:
+        Response: The products in the requested order and the IDs that do not
+            exist or are not available.
+    """
+    try:
+        try:
+            view, fields = _get_product_representation(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            ids = [int(pk) for pk in request.query_params.get('ids', '').split(',') if pk.strip()]
+        except ValueError:
+            return Response(
+                {"error": "ids must be a list of product ids"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return Response({"error": "No product ids"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > MAX_BATCH_IDS:
+            return Response(
+                {"error": f"At most {MAX_BATCH_IDS} products per request"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        products = _get_product_queryset(view, fields)
+        if not request.user.is_staff:
+            products = products.filter(visible=True)
+        products, missing = products.in_id_order(ids)
+
+        serializer = PRODUCT_VIEWS[view](products, many=True, fields=fields)
+        return Response({'products': serializer.data, 'missing': missing}, status=status.HTTP_200_OK)
+    except Exception as e:
+        logger.error(e)
+        return Response(
+            {"error": "Internal server error"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
+
+
+@api_view(["GET", "DELETE"])
+@permission_classes([IsSuperUser])
+def getProductCacheStats(request):
+    """
+    Report the product cache hit/miss counters, DELETE resets them.
+
+    Args:
+        request: The HTTP request object.
+
+    Returns:
+        A Response object with the hits, misses and hit rate of the product cache.
+    """
+    try:
+        if request.method == "DELETE":
+            reset_product_cache_stats()
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        return Response(get_product_cache_stats(), status=status.HTTP_200_OK)
+    except Exception as e:
+        logger.error(e)
+        return Response(
+            {"error": "Internal server error"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
+
+
 # delete product
 @api_view(["DELETE"])
 @permission_classes([IsSuperUser])
@@ -184,7 +416,15 @@ def updateProduct(request, pk):
             changes.append(f"Description: '{product.description}' => '{data.get('description')}'")
             product.description = data.get("description")
 
-        if data.get("count_in_stock") is not None and data.get("count_in_stock") != product.count_in_stock:
+        # The stock of a product stocked per size is the sum of its sizes, see updateSizeStock
+        sized = ProductSizeStock.objects.filter(product=product).exists()
+        if sized and data.get("count_in_stock") not in (None, "", product.count_in_stock, str(product.count_in_stock)):
+            return Response(
+                {"error": "This product is stocked per size, update the stock of its sizes instead"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        if not sized and data.get("count_in_stock") is not None and data.get("count_in_stock") != product.count_in_stock:
             changes.append(f"Count in Stock: {product.count_in_stock} => {data.get('count_in_stock')}")
             product.count_in_stock = data.get("count_in_stock")
 
@@ -207,6 +447,10 @@ def updateProduct(request, pk):
                 return Response({"error": "Category not found"}, status=404)
 
         product.save()
+        if sized:
+            # save() wrote back the total read above, checkouts may have changed the sizes since
+            Product.objects.filter(id=product.id).sync_size_stock()
+            product.refresh_from_db(fields=["count_in_stock", "updated_at"])
 
         # Log the changes
         for change in changes:
@@ -230,9 +474,84 @@ def updateProduct(request, pk):
         )
 
 
-@api_view(["POST"])
-@permission_classes([IsAuthenticated])
-def createProductReview(request, pk):
+@api_view(["GET", "POST"])
+@permission_classes([IsAuthenticatedOrReadOnly])
+def productReviews(request, pk):
+    """
+    List the reviews of a product (GET) or review it (POST, authenticated).
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        pk (int): The ID of the product.
+
+    Returns:
+        Response: See _list_reviews() and _create_review().
+    """
+    if request.method == "POST":
+        return _create_review(request, pk)
+    return _list_reviews(request, pk)
+
+
+def _list_reviews(request, pk):
+    """
+    List the reviews of a product, with cursor pagination.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        pk (int): The ID of the product.
+
+    Query params:
+        sort: "newest" (default), "highest" or "lowest".
+        cursor: The cursor of the page to fetch, from a previous `next`/`prev`.
+        page_size: The number of reviews per page (default 10, at most 100).
+
+    Returns:
+        Response: The reviews of the page, the next/prev links and the total count.
+
+    Raises:
+        Product.DoesNotExist: If the product with the given ID does not exist.
+        Exception: If there is an internal server error.
+    """
+    try:
+        sort = request.query_params.get('sort', 'newest')
+        if sort not in Review.SORT_ORDERS:
+            return Response(
+                {"error": f"sort must be one of {', '.join(Review.SORT_ORDERS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        visibility = {} if request.user.is_staff else {'visible': True}
+        product = Product.objects.only('id', 'num_reviews').get(id=pk, **visibility)
+
+        reviews, next_link, prev_link = paginate_by_cursor(
+            request, Review.objects.filter(product=product), Review.SORT_ORDERS[sort], 10
+        )
+
+        serializer = ReviewSerializer(reviews, many=True)
+        return Response(
+            {
+                'reviews': serializer.data,
+                'count': product.num_reviews,
+                'next': next_link,
+                'prev': prev_link,
+            },
+            status=status.HTTP_200_OK,
+        )
+    except NotFound:
+        return Response({"error": "Invalid cursor"}, status=status.HTTP_404_NOT_FOUND)
+    except (Product.DoesNotExist, ValueError):
+        return Response(
+            {"error": "Product not available."}, status=status.HTTP_404_NOT_FOUND
+        )
+    except Exception as e:
+        logger.error(e)
+        return Response(
+            {"error": "Internal server error"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
+
+
+def _create_review(request, pk):
     """
     Create a new review for a product.
 
@@ -252,40 +571,38 @@ def createProductReview(request, pk):
         product = Product.objects.get(id=pk)
         data = request.data
 
-        # 1 - Review already exists
-        alreadyExists = product.reviews.filter(user=user).exists()
-        if alreadyExists:
-            content = {"error": "Product already reviewed"}
-            return Response(content, status=status.HTTP_400_BAD_REQUEST)
-
-        # 2 - No Rating or 0
-        rating = int(data.get("rating", 0))  # Convert rating to an integer
-        if rating == 0:
+        # 1 - No Rating or out of range
+        try:
+            rating = int(data.get("rating", 0))  # Convert rating to an integer
+        except (TypeError, ValueError):
+            rating = 0
+        if rating not in Product.RATING_STARS:
             content = {"error": "Please select a valid rating"}
             return Response(content, status=status.HTTP_400_BAD_REQUEST)
 
-        # 2.5 - No Comment
+        # 2 - No Comment
         comment = data.get("comment", "").strip()
         if comment == "":
             content = {"error": "Please enter a comment"}
             return Response(content, status=status.HTTP_400_BAD_REQUEST)
 
-        # 3 - Create review
-        review = Review.objects.create(
-            user=user,
-            product=product,
-            name=user.first_name,
-            rating=rating,
-            comment=comment,
-        )
-
-        reviews = product.reviews.all()
-        product.num_reviews = len(reviews)
+        # 3 - Create review and update the aggregates, the unique constraint
+        # on (product, user) rejects a second review
+        try:
+            with transaction.atomic():
+                Review.objects.create(
+                    user=user,
+                    product=product,
+                    name=user.first_name,
+                    rating=rating,
+                    comment=comment,
+                )
+                Product.objects.filter(id=product.id).add_rating(rating)
+        except IntegrityError:
+            content = {"error": "Product already reviewed"}
+            return Response(content, status=status.HTTP_400_BAD_REQUEST)
 
-        total = sum(i.rating for i in reviews)
-        product.rating = total / len(reviews) if reviews else 0
-        product.save()
-        
+        product = Product.objects.with_details().get(id=product.id)
         serializer = ProductSerializer(product, many=False)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -318,25 +635,16 @@ def deleteProductReview(request, pk, review_id):
     try:
         user = request.user
         product = Product.objects.get(id=pk)
-        review = Review.objects.get(id=review_id)
+        review = Review.objects.get(id=review_id, product=product)
         if not user.is_superuser and review.user != user:
             content = {"error": "You are not authorized to delete this review"}
             return Response(content, status=status.HTTP_401_UNAUTHORIZED)
         else:
-            review.delete()
-            reviews = product.reviews.all()
-            product.num_reviews = len(reviews)
-
-            total = 0
-            for i in reviews:
-                total += i.rating
-            
-            if len(reviews) > 0:
-                product.rating = total / len(reviews)
-            else:
-                product.rating = 0
-            
-            product.save()
+            with transaction.atomic():
+                # Only the request that actually deletes the row updates the aggregates
+                deleted, _ = Review.objects.filter(id=review.id).delete()
+                if deleted:
+                    Product.objects.filter(id=product.id).add_rating(review.rating or 0, -1)
 
             return Response(status=status.HTTP_204_NO_CONTENT)
     except Product.DoesNotExist:
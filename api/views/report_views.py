@@ -0,0 +1,78 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+from rest_framework import status
+from api.permissions import IsSuperUser
+from api.reports import get_sales_report
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from datetime import timedelta
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Days reported when no range is given
+DEFAULT_REPORT_DAYS = 30
+# Longest range getSalesReport returns daily rows for
+MAX_REPORT_DAYS = 366
+# Most products, categories and sizes listed in the report
+MAX_REPORT_TOP = 100
+
+
+@api_view(["GET"])
+@permission_classes([IsSuperUser])
+def getSalesReport(request):
+    """
+    Retrieve the sales of a date range from the daily rollups.
+
+    Args:
+        request: The HTTP request object. The optional `from` and `to` query
+            parameters (YYYY-MM-DD, both included) default to the last 30 days,
+            `top` limits the products, categories and sizes listed (10).
+
+    Returns:
+        A Response object with the daily totals, the totals of the range and
+        the best selling products, categories and sizes, or 400 when the range
+        is invalid.
+    """
+    try:
+        day_to = timezone.localdate()
+        day_from = day_to - timedelta(days=DEFAULT_REPORT_DAYS - 1)
+        for name in ("from", "to"):
+            value = request.query_params.get(name)
+            if value is None:
+                continue
+            day = parse_date(value)
+            if day is None:
+                return Response(
+                    {"error": f"Invalid {name} date, expected YYYY-MM-DD"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            if name == "from":
+                day_from = day
+            else:
+                day_to = day
+
+        if day_from > day_to:
+            return Response({"error": "from must not be after to"}, status=status.HTTP_400_BAD_REQUEST)
+        if (day_to - day_from).days >= MAX_REPORT_DAYS:
+            return Response(
+                {"error": f"Range must not exceed {MAX_REPORT_DAYS} days"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            top = int(request.query_params.get("top", 10))
+        except ValueError:
+            return Response({"error": "top must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        top = max(1, min(top, MAX_REPORT_TOP))
+
+        report = get_sales_report(day_from, day_to, top=top)
+        return Response({"from": day_from, "to": day_to, **report}, status=status.HTTP_200_OK)
+    except Exception as e:
+        logger.error(e)
+        return Response(
+            {"error": "Internal server error"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
@@ -5,14 +5,50 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 
 from api.serializers import ShoeSizeSerializer, ProductSerializer
-from api.models import ShoeSize, Product, ActionLog
+from api.models import ShoeSize, Product, ProductSizeStock, ActionLog
 
 from rest_framework import status
+from api.conditional import make_etag, get_not_modified_response, set_validators
+from api.cache import invalidate_products
+from django.db import transaction
+from django.utils import timezone
 
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Most products getStockMatrix reports on in one request
+MAX_MATRIX_PRODUCTS = 100
+# Most rows updateSizeStock takes in one request
+MAX_STOCK_ROWS = 1000
+
+
+def _get_stock_matrix(product_ids, staff, user=None):
+    """
+    The size stock of the given products, in one query.
+
+    A size is available when its stock is not all held by the live holds of
+    other users (all users when `user` is None), as addOrder checks it.
+
+    Returns:
+        A list of {"product", "sizes"} dicts in the order of `product_ids`,
+        exact counts are only included for staff.
+    """
+    rows = ProductSizeStock.objects.filter(product_id__in=product_ids)
+    if not staff:
+        rows = rows.filter(product__visible=True)
+    rows = rows.with_available(user).order_by("product_id", "size__size").values_list(
+        "product_id", "size_id", "size__size", "count_in_stock", "available"
+    )
+
+    matrix = {product_id: [] for product_id in product_ids}
+    for product_id, size_id, size, count, available in rows:
+        entry = {"id": size_id, "size": size, "available": available > 0}
+        if staff:
+            entry["count_in_stock"] = count
+        matrix[product_id].append(entry)
+    return [{"product": product_id, "sizes": sizes} for product_id, sizes in matrix.items()]
+
 
 
 @api_view(["GET"])
@@ -24,15 +60,22 @@ def getSizes(request):
         request: The HTTP request object.
 
     Returns:
-        A Response object containing the serialized shoe sizes data.
+        A Response object containing the serialized shoe sizes data,
+        or 304 when the client's ETag is still current.
 
     Raises:
         Exception: If there is an internal server error.
     """
     try:
-        sizes = ShoeSize.objects.all()
+        # ShoeSize has no updated_at and only a handful of rows, the ETag hashes them all
+        sizes = list(ShoeSize.objects.order_by('id'))
+        etag = make_etag('sizes', *(f"{size.id}={size.size}" for size in sizes))
+        not_modified = get_not_modified_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+
         serializer = ShoeSizeSerializer(sizes, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return set_validators(Response(serializer.data, status=status.HTTP_200_OK), etag)
     except Exception as e:
         logger.error(e)
         return Response(
@@ -113,4 +156,124 @@ def updateProductSizes(request):
         return Response(
             {"error": "Internal server error"},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
\ No newline at end of file
+        )
+
+
+@api_view(["GET"])
+def getStockMatrix(request):
+    """
+    Report which sizes of several products are in stock, in one query.
+
+    Args:
+        request: The HTTP request object.
+
+    Query params:
+        products: Comma separated product IDs, at most MAX_MATRIX_PRODUCTS.
+
+    Returns:
+        A Response object with the sizes of each product and whether they are
+        available, live holds of other users included. Products that are not
+        stocked per size have no sizes.
+    """
+    try:
+        try:
+            product_ids = [int(pk) for pk in request.query_params.get("products", "").split(",") if pk.strip()]
+        except ValueError:
+            return Response(
+                {"error": "products must be a list of product ids"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        product_ids = list(dict.fromkeys(product_ids))
+        if not product_ids:
+            return Response({"error": "No product ids"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(product_ids) > MAX_MATRIX_PRODUCTS:
+            return Response(
+                {"error": f"At most {MAX_MATRIX_PRODUCTS} products per request"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        matrix = _get_stock_matrix(
+            product_ids, request.user.is_staff, request.user if request.user.is_authenticated else None
+        )
+        return Response({"stock": matrix}, status=status.HTTP_200_OK)
+    except Exception as e:
+        logger.error(e)
+        return Response(
+            {"error": "Internal server error"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
+
+
+@api_view(["PUT"])
+@permission_classes([IsAdminUser])
+def updateSizeStock(request):
+    """
+    Set the stock of many (product, size) pairs at once.
+
+    The rows are upserted in one statement and the stock of each product
+    becomes the sum of its sizes.
+
+    Args:
+        request: The HTTP request object, with a `stock` list of
+            {"product", "size", "count_in_stock"} objects.
+
+    Returns:
+        A Response object with the stock matrix of the updated products.
+    """
+    try:
+        stock = request.data.get("stock")
+        if not isinstance(stock, list) or not stock:
+            return Response({"error": "stock must be a non empty list."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(stock) > MAX_STOCK_ROWS:
+            return Response(
+                {"error": f"At most {MAX_STOCK_ROWS} rows per request"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        counts = {}
+        try:
+            for row in stock:
+                count = int(row["count_in_stock"])
+                if count < 0:
+                    raise ValueError
+                counts[(int(row["product"]), int(row["size"]))] = count
+        except (KeyError, TypeError, ValueError):
+            return Response(
+                {"error": "Each row needs a product, a size and a count_in_stock of at least 0."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        product_ids = list(dict.fromkeys(product_id for product_id, size_id in counts))
+        size_ids = {size_id for product_id, size_id in counts}
+        if Product.objects.filter(id__in=product_ids).count() != len(product_ids):
+            return Response({"error": "One or more products do not exist."}, status=status.HTTP_400_BAD_REQUEST)
+        if ShoeSize.objects.filter(id__in=size_ids).count() != len(size_ids):
+            return Response({"error": "One or more sizes do not exist."}, status=status.HTTP_400_BAD_REQUEST)
+
+        now = timezone.now()
+        with transaction.atomic():
+            ProductSizeStock.objects.bulk_create(
+                [
+                    ProductSizeStock(product_id=product_id, size_id=size_id, count_in_stock=count, updated_at=now)
+                    for (product_id, size_id), count in counts.items()
+                ],
+                update_conflicts=True,
+                unique_fields=["product", "size"],
+                update_fields=["count_in_stock", "updated_at"],
+            )
+            Product.objects.filter(id__in=product_ids).sync_size_stock()
+
+            ActionLog.objects.create(
+                user=request.user,
+                action=f"User {request.user.first_name} updated the size stock of {len(product_ids)} products.",
+            )
+        invalidate_products(product_ids)
+
+        matrix = _get_stock_matrix(product_ids, staff=True)
+        return Response({"stock": matrix}, status=status.HTTP_200_OK)
+    except Exception as e:
+        logger.error(e)
+        return Response(
+            {"error": "Internal server error"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
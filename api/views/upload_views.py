@@ -0,0 +1,191 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+from rest_framework import status
+from rest_framework.permissions import AllowAny
+from api.permissions import IsSuperUser
+from api.models import Product, ProductImage, ImageBlob, ImageJob, MeshJob, product_model_upload_path
+from api.serializers import ProductSerializer, ProductImageSerializer
+from api.images import store_file
+from api.uploads import (
+    UPLOAD_KINDS,
+    InvalidUpload,
+    presign,
+    read_token,
+    check_object,
+    read_header,
+    matches_content_type,
+    copy_object,
+    upload_name,
+)
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+import tempfile
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bytes of the local uploads kept in memory before spilling to disk
+LOCAL_UPLOAD_MEMORY = 1024 * 1024
+
+
+@api_view(["POST"])
+@permission_classes([IsSuperUser])
+def createUploadUrl(request):
+    """
+    Issue a direct-to-storage upload target for a product image or 3D model.
+
+    Args:
+        request (HttpRequest): The HTTP request object, with the kind ("image"
+            or "model"), product_id and content_type of the file.
+
+    Returns:
+        Response: The token to finalize the upload with and the upload target
+        ({method, url, fields or headers}), 400 for an invalid request or 404
+        if the product does not exist.
+    """
+    try:
+        data = request.data
+        product_id = data.get("product_id")
+        if not Product.objects.filter(id=product_id).exists():
+            return Response({"error": "Product not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        upload = presign(request, data.get("kind"), int(product_id), data.get("content_type"))
+        return Response(upload, status=status.HTTP_201_CREATED)
+
+    except (InvalidUpload, ValueError) as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        logger.error(e)
+        return Response(
+            {"error": "Internal server error"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
+
+
+@api_view(["PUT"])
+@permission_classes([AllowAny])
+def uploadLocalFile(request, token):
+    """
+    Receive the body of a direct upload, the USE_LOCAL stand-in for S3.
+
+    Args:
+        request (HttpRequest): The HTTP request object, the body is the file.
+        token (str): The upload token, it authorizes the upload like a presigned URL.
+
+    Returns:
+        Response: 204 once stored, 400 for an invalid token, content type or
+        size, 404 when not running with local storage.
+    """
+    if not settings.USE_LOCAL:
+        return Response({"error": "Not found"}, status=status.HTTP_404_NOT_FOUND)
+    try:
+        upload = read_token(token)
+        if request.content_type != upload["type"]:
+            return Response({"error": f"Content-Type must be {upload['type']}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        max_size = UPLOAD_KINDS[upload["kind"]]["max_size"]
+        with tempfile.SpooledTemporaryFile(max_size=LOCAL_UPLOAD_MEMORY) as buffer:
+            size = 0
+            while chunk := request.stream.read(64 * 1024):
+                size += len(chunk)
+                if size > max_size:
+                    return Response({"error": "File too large"}, status=status.HTTP_400_BAD_REQUEST)
+                buffer.write(chunk)
+            buffer.seek(0)
+            store_file(default_storage, upload["key"], File(buffer, name=upload_name(upload)))
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    except InvalidUpload as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        logger.error(e)
+        return Response(
+            {"error": "Internal server error"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
+
+
+@api_view(["POST"])
+@permission_classes([IsSuperUser])
+def finalizeUpload(request):
+    """
+    Validate a direct upload and attach it to its product.
+
+    Only the first bytes of the object are read. An image is attached as a
+    pending ProductImage and its image job hashes, copies and processes it, a
+    model is copied to models/ inside the storage and replaces the product's
+    previous one, a MeshJob extracts its meshes. Finalizing an image upload
+    again returns its image.
+
+    Args:
+        request (HttpRequest): The HTTP request object, with the token issued
+            by createUploadUrl.
+
+    Returns:
+        Response: The created ProductImage (kind "image", queued for processing
+        like createImage, 200 when it was finalized already) or the product
+        with its new model (kind "model"), 400 if the token or the uploaded file is invalid, 404 if the product
+        is gone.
+    """
+    try:
+        upload = read_token(request.data.get("token", ""), user=request.user)
+        product = Product.objects.get(id=upload["product"])
+        check_object(upload)
+        key = upload["key"]
+
+        if not matches_content_type(read_header(key), upload["type"]):
+            default_storage.delete(key)
+            raise InvalidUpload(f"Uploaded file is not a valid {upload['type']} file")
+
+        if upload["kind"] == "image":
+            try:
+                with transaction.atomic():
+                    # Keeps its upload key until the job gives it its content
+                    # addressed name, the unique name makes a replay fail
+                    blob = ImageBlob.objects.create(name=key, ref_count=1)
+                    image = ProductImage.objects.create(
+                        product=product, image=key, blob=blob, status=ProductImage.PENDING
+                    )
+                    ImageJob.enqueue(image.id)
+            except IntegrityError:
+                # Finalized already by a replay of the token, the image is returned again
+                image = ProductImage.objects.filter(blob__name=key).first()
+                if image is None:
+                    raise InvalidUpload("Upload already finalized")
+                serializer = ProductImageSerializer(image, many=False)
+                return Response(serializer.data, status=status.HTTP_200_OK)
+
+            serializer = ProductImageSerializer(image, many=False)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+        # Attached under a name the upload token can't write to, the meshes
+        # are extracted by a job rather than downloading the model here
+        previous = product.model_3d.name if product.model_3d else None
+        name = copy_object(key, product_model_upload_path(product, upload_name(upload)))
+        with transaction.atomic():
+            product.model_3d = name
+            product.save(update_fields=["model_3d", "updated_at"], extract_meshes=False)
+            MeshJob.enqueue(product.id)
+        default_storage.delete(key)
+        if previous and previous != name:
+            default_storage.delete(previous)
+
+        serializer = ProductSerializer(product, many=False)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    except InvalidUpload as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except Product.DoesNotExist:
+        return Response({"error": "Product not found"}, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        logger.error(e)
+        return Response(
+            {"error": "Internal server error"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
@@ -8,7 +8,9 @@ from django.contrib.auth.models import User
 from django.contrib.auth.hashers import make_password
 from rest_framework import status
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from rest_framework.exceptions import NotFound
 from api.permissions import IsSuperUser
+from api.pagination import is_cursor_request, paginate_by_cursor
 
 import logging
 
@@ -152,6 +154,11 @@ def getUsers(request):
     try:
         users = User.objects.all().order_by('id')
 
+        if is_cursor_request(request):
+            users, next_link, prev_link = paginate_by_cursor(request, users, 'id', 5)
+            serializer = UserSerializer(users, many=True)
+            return Response({'users': serializer.data, 'next': next_link, 'prev': prev_link}, status=status.HTTP_200_OK)
+
         # Pagination
         page = request.query_params.get("page") or 1
         paginator = Paginator(users, 5)
@@ -167,6 +174,8 @@ def getUsers(request):
         serializer = UserSerializer(users, many=True)
         return Response({'users': serializer.data, 'page': page, 'pages': paginator.num_pages}, status=status.HTTP_200_OK)
 
+    except NotFound:
+        return Response({"error": "Invalid cursor"}, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
         logger.error(e)
         return Response(
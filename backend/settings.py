@@ -136,6 +136,36 @@ else:
     }
 
 
+# Cache
+
+# The product cache is invalidated by signals in the worker that made the change,
+# so with several gunicorn workers a shared backend is needed (file based, redis...)
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("CACHE_LOCATION", ""),
+    }
+}
+
+PRODUCT_CACHE_TIMEOUT = int(os.environ.get("PRODUCT_CACHE_TIMEOUT", 60 * 60))
+
+# Seconds a response stored for an Idempotency-Key header is replayed
+IDEMPOTENCY_KEY_TTL = int(os.environ.get("IDEMPOTENCY_KEY_TTL", 24 * 60 * 60))
+
+# Seconds stock stays reserved for a cart, see api.models.StockHold
+STOCK_HOLD_TTL = int(os.environ.get("STOCK_HOLD_TTL", 15 * 60))
+
+# Image processing jobs, see api/jobs.py: tries before an image is marked
+# failed, and seconds before the job of a dead worker is picked again
+IMAGE_JOB_MAX_ATTEMPTS = int(os.environ.get("IMAGE_JOB_MAX_ATTEMPTS", 5))
+IMAGE_JOB_LEASE = int(os.environ.get("IMAGE_JOB_LEASE", 5 * 60))
+
+# Seconds a direct upload target stays valid, see api/uploads.py
+UPLOAD_URL_TTL = int(os.environ.get("UPLOAD_URL_TTL", 15 * 60))
+
+
 # Password validation
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -14,6 +14,9 @@ urlpatterns = [
     path("api/models/", include("api.urls.model_urls")),
     path("api/sizes/", include("api.urls.size_urls")),
     path("api/orders/", include("api.urls.order_urls")),
+    path("api/holds/", include("api.urls.hold_urls")),
+    path("api/reports/", include("api.urls.report_urls")),
+    path("api/uploads/", include("api.urls.upload_urls")),
     path("api/actionlogs/", include("api.urls.actionlog_urls")),
 ]
 